@@ -17,6 +17,10 @@ from plotly.subplots import make_subplots
 import requests
 import streamlit as st
 
+from src.integrations.supabase_client import SupabaseError, SupabaseSyncClient
+from src.services.dashboard_data import DashboardDataStore
+from src.services.downsampling import chart_buckets, minmax_downsample
+
 
 # Configuração da página
 st.set_page_config(
@@ -167,31 +171,63 @@ tariff = st.sidebar.number_input(
 
 
 # Funções para obter dados do Supabase
-def get_supabase_data(endpoint, params=None):
-    """Obter dados diretamente do Supabase"""
+@st.cache_resource
+def get_supabase_client() -> SupabaseSyncClient:
+    """Cliente Supabase com pool de conexões, compartilhado entre reruns"""
+    return SupabaseSyncClient(url=SUPABASE_URL, key=SUPABASE_KEY)
+
+
+@st.cache_resource
+def get_data_store() -> DashboardDataStore:
+    """Dados em cache, atualizados em background e compartilhados entre sessões"""
+    return DashboardDataStore(get_supabase_client()).start()
+
+
+def get_devices_data():
+    """Dispositivos cadastrados no Supabase (cache em memória)"""
     try:
-        url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-        }
+        return get_data_store().devices()
+    except SupabaseError as e:
+        st.error(f"Erro ao obter dados do Supabase: {str(e)}")
+        return None
 
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Erro ao obter dados do Supabase: {response.status_code}")
-            return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão com Supabase: {str(e)}")
+
+def get_latest_daily_data():
+    """Dia mais recente de cada dispositivo (view energy_daily_latest)"""
+    try:
+        return get_data_store().latest_daily()
+    except SupabaseError as e:
+        st.error(f"Erro ao obter agregado diário do Supabase: {str(e)}")
         return None
 
 
+def get_recent_readings():
+    """Leituras brutas recentes (atualizadas de forma incremental)"""
+    try:
+        return get_data_store().recent_readings()
+    except SupabaseError as e:
+        st.error(f"Erro ao obter leituras do Supabase: {str(e)}")
+        return pd.DataFrame()
+
+
+def get_rollup_history(days):
+    """
+    Histórico de todos os dispositivos a partir de energy_rollups
+
+    Usa a resolução mais grossa que ainda tem um bucket por intervalo do
+    gráfico (ver ``chart_buckets``). Retorna (resolução, DataFrame) ou
+    (None, None) se indisponível.
+    """
+    try:
+        return get_data_store().rollup_history(days, min_points=chart_buckets())
+    except SupabaseError:
+        return None, None
+
+
 def get_api_data(endpoint):
     """Obter dados da API local"""
     try:
-        response = requests.get(f"{API_BASE_URL}{endpoint}")
+        response = requests.get(f"{API_BASE_URL}{endpoint}", timeout=10)
         if response.status_code == 200:
             return response.json()
         else:
@@ -287,6 +323,9 @@ def create_single_device_line(
     if df.empty:
         return go.Figure()
 
+    # Mínimo e máximo por intervalo: preserva os picos com poucos pontos
+    df = minmax_downsample(df, y_col)
+
     fig = px.line(
         df,
         x="timestamp",
@@ -403,6 +442,8 @@ def create_consumption_chart(
 ):
     """Criar gráfico de consumo"""
 
+    df = minmax_downsample(df, "power_watts", by=color_field or None)
+
     if color_field:
         fig = px.line(
             df,
@@ -507,10 +548,9 @@ def render_tapo_dashboard():
     """Renderizar dashboard principal TP-Link Tapo"""
 
     # Obter dados do Supabase
-    devices_data = get_supabase_data("devices")
-    readings_data = get_supabase_data(
-        "energy_readings", params={"order": "timestamp.desc", "limit": "100"}
-    )
+    devices_data = get_devices_data()
+    daily_data = get_latest_daily_data()
+    readings_df = get_recent_readings()
 
     if not devices_data:
         st.error("❌ Não foi possível carregar os dispositivos do Supabase")
@@ -568,52 +608,54 @@ def render_tapo_dashboard():
     if "current_power_watts" not in devices_df.columns:
         devices_df["current_power_watts"] = 0.0
 
-    # Se existirem leituras, utilizar última leitura por dispositivo
-    if readings_data:
-        readings_df_latest = (
-            pd.DataFrame(readings_data)
-            .sort_values("timestamp")
-            .drop_duplicates("device_id", keep="last")
+    # Última leitura e energia de hoje por dispositivo (agregado energy_daily)
+    devices_df["energy_today_kwh"] = 0.0
+    if daily_data:
+        daily_df = pd.DataFrame(daily_data)
+        daily_df["day"] = pd.to_datetime(daily_df["day"], errors="coerce").dt.date
+        daily_df["today_energy_kwh"] = daily_df["energy_kwh"].where(
+            daily_df["day"] == datetime.utcnow().date(), 0.0
         )
 
-        if not readings_df_latest.empty:
-            readings_df_latest["timestamp"] = pd.to_datetime(
-                readings_df_latest["timestamp"], errors="coerce"
-            )
-
-            readings_df_latest = readings_df_latest.rename(
-                columns={
-                    "device_id": "reading_device_id",
-                    "power_watts": "reading_power_watts",
-                }
-            )
-
-            devices_df = devices_df.merge(
-                readings_df_latest[["reading_device_id", "reading_power_watts"]],
-                how="left",
-                left_on="id",
-                right_on="reading_device_id",
-            )
-
-            devices_df["current_power_watts"] = devices_df[
-                "reading_power_watts"
-            ].fillna(devices_df["current_power_watts"])
+        devices_df = devices_df.merge(
+            daily_df[
+                [
+                    "device_id",
+                    "last_power_watts",
+                    "last_timestamp",
+                    "today_energy_kwh",
+                ]
+            ].rename(columns={"device_id": "reading_device_id"}),
+            how="left",
+            left_on="id",
+            right_on="reading_device_id",
+        )
 
-            devices_df.drop(
-                columns=[
-                    col
-                    for col in ["reading_device_id", "reading_power_watts"]
-                    if col in devices_df.columns
-                ],
-                inplace=True,
-            )
+        devices_df["current_power_watts"] = devices_df["last_power_watts"].fillna(
+            devices_df["current_power_watts"]
+        )
+        devices_df["energy_today_kwh"] = devices_df["today_energy_kwh"].fillna(0.0)
+        devices_df["last_reading"] = devices_df["last_timestamp"]
+
+        devices_df.drop(
+            columns=[
+                "reading_device_id",
+                "last_power_watts",
+                "last_timestamp",
+                "today_energy_kwh",
+            ],
+            inplace=True,
+        )
 
     devices_df["current_power_watts"] = pd.to_numeric(
         devices_df["current_power_watts"], errors="coerce"
     ).fillna(0.0)
 
     # Cards de resumo
-    build_summary_cards(tapo_devices, readings_data or [])
+    build_summary_cards(
+        tapo_devices,
+        [{"timestamp": row["last_timestamp"]} for row in daily_data or []],
+    )
 
     st.markdown("---")
 
@@ -646,28 +688,32 @@ def render_tapo_dashboard():
     st.markdown("### 📊 Histórico de Consumo")
 
     history_df = pd.DataFrame()
-    if readings_data:
-        tapo_ids = {device["id"] for device in tapo_devices}
-        tapo_readings = [
-            reading for reading in readings_data if reading.get("device_id") in tapo_ids
-        ]
-
-        if tapo_readings:
-            history_df = pd.DataFrame(tapo_readings)
-            history_df["timestamp"] = pd.to_datetime(
-                history_df["timestamp"], errors="coerce"
-            )
-            history_df = history_df.dropna(subset=["timestamp"])
-            history_df = history_df.sort_values("timestamp")
-
-            start_time = datetime.now() - timedelta(days=time_range_days)
-            history_df = history_df[history_df["timestamp"] >= start_time]
+    tapo_ids = {device["id"] for device in tapo_devices}
+    resolution, rollup_df = get_rollup_history(time_range_days)
+    if rollup_df is not None and not rollup_df.empty:
+        rollup_df = rollup_df[rollup_df["device_id"].isin(tapo_ids)]
+
+    if rollup_df is not None and not rollup_df.empty:
+        # Um ponto por bucket: potência média e energia acumulada no dia
+        history_df = rollup_df.rename(
+            columns={"bucket_start": "timestamp", "avg_power_watts": "power_watts"}
+        )
+        history_df["energy_today_kwh"] = history_df.groupby(
+            [history_df["device_id"], history_df["timestamp"].dt.date]
+        )["energy_delta_kwh"].cumsum()
+        st.caption(f"Resolução do histórico: {resolution}")
+    elif not readings_df.empty:
+        # Agregados indisponíveis: usar as leituras brutas recentes
+        history_df = readings_df[readings_df["device_id"].isin(tapo_ids)]
+        start_time = datetime.utcnow() - timedelta(days=time_range_days)
+        history_df = history_df[history_df["timestamp"] >= start_time].copy()
 
-            display_map = {d["id"]: d["display_name"] for d in tapo_devices}
-            profile_map = {d["id"]: d["profile_key"] for d in tapo_devices}
-            history_df["display_label"] = history_df["device_id"].map(display_map)
-            history_df["profile_key"] = history_df["device_id"].map(profile_map)
-            history_df = history_df.dropna(subset=["display_label"])
+    if not history_df.empty:
+        display_map = {d["id"]: d["display_name"] for d in tapo_devices}
+        profile_map = {d["id"]: d["profile_key"] for d in tapo_devices}
+        history_df["display_label"] = history_df["device_id"].map(display_map)
+        history_df["profile_key"] = history_df["device_id"].map(profile_map)
+        history_df = history_df.dropna(subset=["display_label"])
 
     if not history_df.empty:
         fig_history = create_consumption_chart(
@@ -688,6 +734,7 @@ def render_tapo_dashboard():
     display_df = devices_df.copy()
     display_df["Dispositivo"] = display_df["display_label"]
     display_df["Consumo Atual"] = display_df["current_power_watts"].apply(format_power)
+    display_df["Energia Hoje"] = display_df["energy_today_kwh"].apply(format_energy)
     display_df["Status"] = display_df["is_active"].apply(
         lambda x: "🟢 Ativo" if x else "🔴 Inativo"
     )
@@ -703,6 +750,8 @@ def render_tapo_dashboard():
         "location",
         "equipment_connected",
         "Consumo Atual",
+        "Energia Hoje",
+        "Última Leitura",
         "Status",
     ]
     available_columns = [col for col in table_columns if col in display_df.columns]
@@ -0,0 +1,22 @@
+-- Migração 001: chave única para upserts idempotentes em energy_readings
+-- Permite que o spool do coletor reenvie leituras sem criar duplicatas
+-- Execute no Supabase SQL Editor
+
+-- Leituras do coletor passam a identificar a origem
+ALTER TABLE energy_readings
+    ALTER COLUMN data_source SET DEFAULT 'tapo_local';
+
+UPDATE energy_readings
+SET data_source = 'tapo_local'
+WHERE data_source IS NULL;
+
+-- Remover duplicatas existentes (mantém a leitura mais antiga)
+DELETE FROM energy_readings a
+USING energy_readings b
+WHERE a.device_id = b.device_id
+  AND a.timestamp = b.timestamp
+  AND a.data_source = b.data_source
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_readings_device_ts_source
+    ON energy_readings (device_id, timestamp, data_source);
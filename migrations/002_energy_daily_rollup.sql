@@ -0,0 +1,106 @@
+-- Migração 002: agregado diário por dispositivo (energy_daily)
+-- Mantido por trigger a cada insert em energy_readings, para que o LLM e o
+-- dashboard leiam uma linha por dispositivo em vez de milhares de leituras
+-- Execute no Supabase SQL Editor (após a migração 001)
+
+CREATE TABLE IF NOT EXISTS energy_daily (
+    device_id INTEGER NOT NULL REFERENCES devices(id),
+    day DATE NOT NULL,
+    readings_count INTEGER NOT NULL DEFAULT 0,
+    power_sum_watts DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_power_watts DOUBLE PRECISION,
+    last_timestamp TIMESTAMP NOT NULL,
+    last_power_watts DOUBLE PRECISION,
+    -- energy_today_kwh é o acumulado do dia informado pela tomada
+    energy_kwh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (device_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_energy_daily_day ON energy_daily(day);
+CREATE INDEX IF NOT EXISTS idx_energy_daily_last_timestamp ON energy_daily(last_timestamp);
+
+-- Aplicar uma leitura nova ao agregado do seu dia
+CREATE OR REPLACE FUNCTION energy_daily_apply_reading()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.device_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO energy_daily AS d (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    VALUES (
+        NEW.device_id, NEW.timestamp::date, 1, NEW.power_watts, NEW.power_watts,
+        NEW.timestamp, NEW.power_watts, COALESCE(NEW.energy_today_kwh, 0),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        readings_count = d.readings_count + 1,
+        power_sum_watts = d.power_sum_watts + EXCLUDED.power_sum_watts,
+        max_power_watts = GREATEST(d.max_power_watts, EXCLUDED.max_power_watts),
+        last_power_watts = CASE
+            WHEN EXCLUDED.last_timestamp >= d.last_timestamp
+                THEN EXCLUDED.last_power_watts
+            ELSE d.last_power_watts
+        END,
+        last_timestamp = GREATEST(d.last_timestamp, EXCLUDED.last_timestamp),
+        energy_kwh = GREATEST(d.energy_kwh, EXCLUDED.energy_kwh),
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Só INSERT: upserts que mesclam uma leitura repetida não alteram o agregado
+DROP TRIGGER IF EXISTS trg_energy_daily_apply_reading ON energy_readings;
+CREATE TRIGGER trg_energy_daily_apply_reading
+    AFTER INSERT ON energy_readings
+    FOR EACH ROW EXECUTE FUNCTION energy_daily_apply_reading();
+
+-- Recalcular o agregado a partir das leituras (carga inicial ou correções)
+CREATE OR REPLACE FUNCTION refresh_energy_daily(p_since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_daily WHERE p_since IS NULL OR day >= p_since;
+
+    INSERT INTO energy_daily (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    SELECT
+        device_id,
+        timestamp::date,
+        COUNT(*),
+        SUM(power_watts),
+        MAX(power_watts),
+        MAX(timestamp),
+        (ARRAY_AGG(power_watts ORDER BY timestamp DESC))[1],
+        COALESCE(MAX(energy_today_kwh), 0),
+        CURRENT_TIMESTAMP
+    FROM energy_readings
+    WHERE device_id IS NOT NULL
+      AND (p_since IS NULL OR timestamp >= p_since)
+    GROUP BY device_id, timestamp::date;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Dia mais recente de cada dispositivo (última leitura + agregados do dia)
+CREATE OR REPLACE VIEW energy_daily_latest AS
+SELECT DISTINCT ON (device_id) *
+FROM energy_daily
+ORDER BY device_id, day DESC;
+
+ALTER TABLE energy_daily ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Enable all access for service role" ON energy_daily;
+CREATE POLICY "Enable all access for service role" ON energy_daily FOR ALL USING (true);
+
+-- Carga inicial com o histórico existente
+SELECT refresh_energy_daily();
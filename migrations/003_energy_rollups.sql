@@ -0,0 +1,211 @@
+-- Migração 003: agregados de energy_readings em várias resoluções (energy_rollups)
+-- Buckets de 15 min, 1 h, 1 dia e 1 mês por dispositivo, com potência
+-- mínima/máxima/média, energia consumida no bucket e número de amostras
+-- Execute no Supabase SQL Editor (após a migração 002)
+
+CREATE TABLE IF NOT EXISTS energy_rollups (
+    device_id INTEGER NOT NULL REFERENCES devices(id),
+    resolution VARCHAR(8) NOT NULL,  -- '15m', '1h', '1d' ou '1mo'
+    bucket_start TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    min_power_watts DOUBLE PRECISION,
+    max_power_watts DOUBLE PRECISION,
+    avg_power_watts DOUBLE PRECISION,
+    energy_delta_kwh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (device_id, resolution, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_energy_rollups_resolution_bucket
+    ON energy_rollups(resolution, bucket_start);
+
+-- Marca d'água do processamento incremental: leituras anteriores já agregadas
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_run_at TIMESTAMP
+);
+
+INSERT INTO rollup_state (name) VALUES ('energy_rollups') ON CONFLICT DO NOTHING;
+
+-- Início do bucket que contém p_ts na resolução informada
+CREATE OR REPLACE FUNCTION energy_bucket(p_resolution TEXT, p_ts TIMESTAMP)
+RETURNS TIMESTAMP AS $$
+    SELECT CASE p_resolution
+        WHEN '15m' THEN date_trunc('hour', p_ts)
+            + floor(extract(minute FROM p_ts) / 15) * interval '15 minutes'
+        WHEN '1h' THEN date_trunc('hour', p_ts)
+        WHEN '1d' THEN date_trunc('day', p_ts)
+        WHEN '1mo' THEN date_trunc('month', p_ts)
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recalcular uma resolução a partir da resolução imediatamente mais fina
+CREATE OR REPLACE FUNCTION rebuild_energy_rollup_level(
+    p_target TEXT, p_source TEXT, p_from TIMESTAMP, p_to TIMESTAMP
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_first TIMESTAMP := energy_bucket(p_target, p_from);
+    v_last TIMESTAMP := energy_bucket(p_target, p_to - interval '1 microsecond');
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_rollups
+    WHERE resolution = p_target
+      AND bucket_start BETWEEN v_first AND v_last;
+
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        p_target,
+        energy_bucket(p_target, bucket_start),
+        SUM(samples),
+        MIN(min_power_watts),
+        MAX(max_power_watts),
+        SUM(avg_power_watts * samples) / NULLIF(SUM(samples), 0),
+        SUM(energy_delta_kwh)
+    FROM energy_rollups
+    WHERE resolution = p_source
+      AND energy_bucket(p_target, bucket_start) BETWEEN v_first AND v_last
+    GROUP BY device_id, energy_bucket(p_target, bucket_start);
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular todas as resoluções para as leituras em [p_from, p_to)
+CREATE OR REPLACE FUNCTION rebuild_energy_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER AS $$
+DECLARE
+    v_from TIMESTAMP := energy_bucket('15m', p_from);
+    v_to TIMESTAMP := energy_bucket('15m', p_to - interval '1 microsecond')
+        + interval '15 minutes';
+    affected INTEGER;
+    total INTEGER;
+BEGIN
+    DELETE FROM energy_rollups
+    WHERE resolution = '15m'
+      AND bucket_start >= v_from
+      AND bucket_start < v_to;
+
+    -- energy_today_kwh é um acumulado que zera à meia-noite: a energia de
+    -- cada leitura é a diferença para a anterior do mesmo dia
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        '15m',
+        energy_bucket('15m', timestamp),
+        COUNT(*),
+        MIN(power_watts),
+        MAX(power_watts),
+        AVG(power_watts),
+        COALESCE(SUM(energy_increment), 0)
+    FROM (
+        SELECT
+            device_id,
+            timestamp,
+            power_watts,
+            CASE
+                WHEN prev_timestamp IS NULL
+                  OR prev_timestamp::date <> timestamp::date
+                    THEN energy_today_kwh
+                ELSE GREATEST(energy_today_kwh - prev_energy, 0)
+            END AS energy_increment
+        FROM (
+            SELECT
+                device_id,
+                timestamp,
+                power_watts,
+                energy_today_kwh,
+                LAG(timestamp) OVER w AS prev_timestamp,
+                LAG(energy_today_kwh) OVER w AS prev_energy
+            FROM energy_readings
+            WHERE device_id IS NOT NULL
+              AND timestamp >= v_from - interval '1 day'
+              AND timestamp < v_to
+            WINDOW w AS (PARTITION BY device_id ORDER BY timestamp)
+        ) AS with_previous
+        WHERE timestamp >= v_from
+    ) AS increments
+    GROUP BY device_id, energy_bucket('15m', timestamp);
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+
+    total := total + rebuild_energy_rollup_level('1h', '15m', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1d', '1h', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1mo', '1d', v_from, v_to);
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Processar as leituras a partir da marca d'água (chamado periodicamente)
+CREATE OR REPLACE FUNCTION run_energy_rollups()
+RETURNS INTEGER AS $$
+DECLARE
+    v_watermark TIMESTAMP;
+    v_max TIMESTAMP;
+    total INTEGER := 0;
+BEGIN
+    -- O lock faz inserts concorrentes de leituras antigas aguardarem e
+    -- rebaixarem a marca d'água depois desta execução
+    SELECT watermark INTO v_watermark
+    FROM rollup_state
+    WHERE name = 'energy_rollups'
+    FOR UPDATE;
+
+    SELECT MAX(timestamp) INTO v_max FROM energy_readings;
+    IF v_max IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    IF v_watermark IS NULL THEN
+        SELECT MIN(timestamp) INTO v_watermark FROM energy_readings;
+    END IF;
+
+    IF v_watermark <= v_max THEN
+        total := rebuild_energy_rollups(v_watermark, v_max + interval '1 microsecond');
+    END IF;
+
+    -- O último bucket pode estar incompleto: é recalculado na próxima execução
+    UPDATE rollup_state
+    SET watermark = v_max, last_run_at = CURRENT_TIMESTAMP
+    WHERE name = 'energy_rollups';
+
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Leituras inseridas com timestamp anterior à marca d'água (spool, importações)
+-- rebaixam a marca para que a próxima execução as inclua
+CREATE OR REPLACE FUNCTION energy_rollups_mark_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE rollup_state
+    SET watermark = (SELECT MIN(timestamp) FROM new_rows)
+    WHERE name = 'energy_rollups'
+      AND watermark > (SELECT MIN(timestamp) FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_energy_rollups_mark_dirty ON energy_readings;
+CREATE TRIGGER trg_energy_rollups_mark_dirty
+    AFTER INSERT ON energy_readings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION energy_rollups_mark_dirty();
+
+ALTER TABLE energy_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_state ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Enable all access for service role" ON energy_rollups;
+CREATE POLICY "Enable all access for service role" ON energy_rollups FOR ALL USING (true);
+DROP POLICY IF EXISTS "Enable all access for service role" ON rollup_state;
+CREATE POLICY "Enable all access for service role" ON rollup_state FOR ALL USING (true);
+
+-- Carga inicial com o histórico existente
+SELECT run_energy_rollups();
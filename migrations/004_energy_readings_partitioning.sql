@@ -0,0 +1,366 @@
+-- Migração 004: energy_readings particionada por mês + retenção das leituras brutas
+-- Partições mensais (energy_readings_pAAAA_MM) com índice composto por
+-- dispositivo/tempo e BRIN no tempo; partições antigas já cobertas pelos
+-- agregados (migração 003) podem ser descartadas por maintain_energy_readings
+-- Execute no Supabase SQL Editor (após a migração 003)
+--
+-- A tabela original é mantida como energy_readings_legacy para comparação
+-- (scripts/benchmark_energy_readings.py). Depois de validar:
+--     DROP TABLE energy_readings_legacy;
+
+-- 1. Tirar a tabela atual do caminho
+ALTER TABLE energy_readings RENAME TO energy_readings_legacy;
+DROP TRIGGER IF EXISTS trg_energy_daily_apply_reading ON energy_readings_legacy;
+DROP TRIGGER IF EXISTS trg_energy_rollups_mark_dirty ON energy_readings_legacy;
+ALTER INDEX IF EXISTS energy_readings_pkey RENAME TO energy_readings_legacy_pkey;
+ALTER INDEX IF EXISTS uq_energy_readings_device_ts_source
+    RENAME TO uq_energy_readings_legacy_device_ts_source;
+ALTER INDEX IF EXISTS idx_energy_readings_device_id
+    RENAME TO idx_energy_readings_legacy_device_id;
+ALTER INDEX IF EXISTS idx_energy_readings_timestamp
+    RENAME TO idx_energy_readings_legacy_timestamp;
+
+-- 2. Tabela particionada (a chave primária precisa incluir a chave de partição)
+CREATE TABLE energy_readings (
+    id BIGINT NOT NULL DEFAULT nextval('energy_readings_id_seq'),
+    device_id INTEGER REFERENCES devices(id),
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    power_watts FLOAT NOT NULL,
+    voltage FLOAT,
+    current FLOAT,
+    energy_today_kwh FLOAT,
+    energy_total_kwh FLOAT,
+    device_on BOOLEAN,
+    data_source VARCHAR(50) DEFAULT 'tapo_local',
+    reading_at TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+ALTER SEQUENCE energy_readings_id_seq OWNED BY energy_readings.id;
+
+-- Leituras fora das partições mensais existentes (ex.: importações antigas)
+CREATE TABLE IF NOT EXISTS energy_readings_default
+    PARTITION OF energy_readings DEFAULT;
+
+-- 3. Criar (se preciso) a partição do mês que contém p_month
+-- Leituras desse mês que estejam na partição default são movidas para ela
+CREATE OR REPLACE FUNCTION ensure_energy_readings_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+    v_name TEXT := format('energy_readings_p%s', to_char(v_start, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    CREATE TEMP TABLE IF NOT EXISTS energy_readings_moving
+        (LIKE energy_readings) ON COMMIT DROP;
+    TRUNCATE energy_readings_moving;
+
+    WITH moved AS (
+        DELETE FROM energy_readings_default
+        WHERE timestamp >= v_start AND timestamp < v_end
+        RETURNING *
+    )
+    INSERT INTO energy_readings_moving SELECT * FROM moved;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF energy_readings FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+
+    -- Leituras apenas mudam de partição: os agregados não devem contá-las de novo
+    PERFORM set_config('casa.skip_rollup_triggers', 'on', true);
+    INSERT INTO energy_readings SELECT * FROM energy_readings_moving;
+    PERFORM set_config('casa.skip_rollup_triggers', 'off', true);
+
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. Copiar o histórico (antes de criar os triggers, para não recontar)
+DO $$
+DECLARE
+    v_month DATE;
+BEGIN
+    FOR v_month IN
+        SELECT DISTINCT date_trunc('month', timestamp)::date
+        FROM energy_readings_legacy
+    LOOP
+        PERFORM ensure_energy_readings_partition(v_month);
+    END LOOP;
+END;
+$$;
+
+INSERT INTO energy_readings (
+    id, device_id, timestamp, power_watts, voltage, current, energy_today_kwh,
+    energy_total_kwh, device_on, data_source, reading_at
+)
+SELECT
+    id, device_id, timestamp, power_watts, voltage, current, energy_today_kwh,
+    energy_total_kwh, device_on, data_source, reading_at
+FROM energy_readings_legacy;
+
+-- 5. Índices (criados na tabela-mãe e propagados a cada partição)
+-- A chave única começa por (device_id, timestamp) e atende às consultas por
+-- dispositivo e período; BRIN cobre varreduras por período em todos os dispositivos
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_readings_device_ts_source
+    ON energy_readings (device_id, timestamp, data_source);
+CREATE INDEX IF NOT EXISTS brin_energy_readings_timestamp
+    ON energy_readings USING BRIN (timestamp);
+
+-- 6. Triggers dos agregados (002 e 003), agora ignorando movimentações internas
+CREATE OR REPLACE FUNCTION energy_daily_apply_reading()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.device_id IS NULL
+       OR current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO energy_daily AS d (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    VALUES (
+        NEW.device_id, NEW.timestamp::date, 1, NEW.power_watts, NEW.power_watts,
+        NEW.timestamp, NEW.power_watts, COALESCE(NEW.energy_today_kwh, 0),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        readings_count = d.readings_count + 1,
+        power_sum_watts = d.power_sum_watts + EXCLUDED.power_sum_watts,
+        max_power_watts = GREATEST(d.max_power_watts, EXCLUDED.max_power_watts),
+        last_power_watts = CASE
+            WHEN EXCLUDED.last_timestamp >= d.last_timestamp
+                THEN EXCLUDED.last_power_watts
+            ELSE d.last_power_watts
+        END,
+        last_timestamp = GREATEST(d.last_timestamp, EXCLUDED.last_timestamp),
+        energy_kwh = GREATEST(d.energy_kwh, EXCLUDED.energy_kwh),
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION energy_rollups_mark_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE rollup_state
+    SET watermark = (SELECT MIN(timestamp) FROM new_rows)
+    WHERE name = 'energy_rollups'
+      AND watermark > (SELECT MIN(timestamp) FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_energy_daily_apply_reading
+    AFTER INSERT ON energy_readings
+    FOR EACH ROW EXECUTE FUNCTION energy_daily_apply_reading();
+
+CREATE TRIGGER trg_energy_rollups_mark_dirty
+    AFTER INSERT ON energy_readings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION energy_rollups_mark_dirty();
+
+ALTER TABLE energy_readings ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Enable all access for service role" ON energy_readings;
+CREATE POLICY "Enable all access for service role" ON energy_readings FOR ALL USING (true);
+
+-- 7. Retenção: leituras brutas anteriores a este instante foram descartadas
+INSERT INTO rollup_state (name) VALUES ('energy_readings_retention')
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION energy_readings_retained_from()
+RETURNS TIMESTAMP AS $$
+    SELECT watermark FROM rollup_state WHERE name = 'energy_readings_retention'
+$$ LANGUAGE sql STABLE;
+
+-- Recalcular agregados nunca apaga o que veio de partições já descartadas
+CREATE OR REPLACE FUNCTION refresh_energy_daily(p_since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_since DATE := GREATEST(p_since, energy_readings_retained_from()::date);
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_daily WHERE v_since IS NULL OR day >= v_since;
+
+    INSERT INTO energy_daily (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    SELECT
+        device_id,
+        timestamp::date,
+        COUNT(*),
+        SUM(power_watts),
+        MAX(power_watts),
+        MAX(timestamp),
+        (ARRAY_AGG(power_watts ORDER BY timestamp DESC))[1],
+        COALESCE(MAX(energy_today_kwh), 0),
+        CURRENT_TIMESTAMP
+    FROM energy_readings
+    WHERE device_id IS NOT NULL
+      AND (v_since IS NULL OR timestamp >= v_since)
+    GROUP BY device_id, timestamp::date;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_energy_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER AS $$
+DECLARE
+    v_from TIMESTAMP := energy_bucket(
+        '15m', GREATEST(p_from, energy_readings_retained_from())
+    );
+    v_to TIMESTAMP := energy_bucket('15m', p_to - interval '1 microsecond')
+        + interval '15 minutes';
+    total INTEGER;
+BEGIN
+    IF v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM energy_rollups
+    WHERE resolution = '15m'
+      AND bucket_start >= v_from
+      AND bucket_start < v_to;
+
+    -- energy_today_kwh é um acumulado que zera à meia-noite: a energia de
+    -- cada leitura é a diferença para a anterior do mesmo dia
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        '15m',
+        energy_bucket('15m', timestamp),
+        COUNT(*),
+        MIN(power_watts),
+        MAX(power_watts),
+        AVG(power_watts),
+        COALESCE(SUM(energy_increment), 0)
+    FROM (
+        SELECT
+            device_id,
+            timestamp,
+            power_watts,
+            CASE
+                WHEN prev_timestamp IS NULL
+                  OR prev_timestamp::date <> timestamp::date
+                    THEN energy_today_kwh
+                ELSE GREATEST(energy_today_kwh - prev_energy, 0)
+            END AS energy_increment
+        FROM (
+            SELECT
+                device_id,
+                timestamp,
+                power_watts,
+                energy_today_kwh,
+                LAG(timestamp) OVER w AS prev_timestamp,
+                LAG(energy_today_kwh) OVER w AS prev_energy
+            FROM energy_readings
+            WHERE device_id IS NOT NULL
+              AND timestamp >= v_from - interval '1 day'
+              AND timestamp < v_to
+            WINDOW w AS (PARTITION BY device_id ORDER BY timestamp)
+        ) AS with_previous
+        WHERE timestamp >= v_from
+    ) AS increments
+    GROUP BY device_id, energy_bucket('15m', timestamp);
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+
+    total := total + rebuild_energy_rollup_level('1h', '15m', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1d', '1h', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1mo', '1d', v_from, v_to);
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Descartar partições inteiras anteriores a p_retention_months meses, desde
+-- que os agregados já cubram todo o período (marca d'água de energy_rollups)
+CREATE OR REPLACE FUNCTION drop_expired_energy_partitions(p_retention_months INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_cutoff TIMESTAMP;
+    v_rolled_up TIMESTAMP;
+    v_end TIMESTAMP;
+    partition_name TEXT;
+BEGIN
+    IF p_retention_months IS NULL OR p_retention_months <= 0 THEN
+        RETURN;
+    END IF;
+
+    SELECT watermark INTO v_rolled_up
+    FROM rollup_state
+    WHERE name = 'energy_rollups';
+    IF v_rolled_up IS NULL THEN
+        RETURN;
+    END IF;
+
+    v_cutoff := LEAST(
+        date_trunc('month', CURRENT_TIMESTAMP)
+            - make_interval(months => p_retention_months),
+        energy_bucket('1d', v_rolled_up)
+    );
+
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'energy_readings'::regclass
+          AND c.relname ~ '^energy_readings_p[0-9]{4}_[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        v_end := to_date(right(partition_name, 7), 'YYYY_MM') + interval '1 month';
+        EXIT WHEN v_end > v_cutoff;
+
+        EXECUTE format('DROP TABLE %I', partition_name);
+        UPDATE rollup_state
+        SET watermark = GREATEST(COALESCE(watermark, v_end), v_end),
+            last_run_at = CURRENT_TIMESTAMP
+        WHERE name = 'energy_readings_retention';
+        RETURN NEXT partition_name;
+    END LOOP;
+
+    -- Leituras antigas que caíram na partição default
+    DELETE FROM energy_readings_default
+    WHERE timestamp < energy_readings_retained_from();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Manutenção periódica: partições dos próximos meses + retenção
+CREATE OR REPLACE FUNCTION maintain_energy_readings(
+    p_retention_months INTEGER DEFAULT 0,
+    p_months_ahead INTEGER DEFAULT 2
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_created TEXT[] := ARRAY[]::TEXT[];
+    v_dropped TEXT[];
+    i INTEGER;
+BEGIN
+    FOR i IN 0..GREATEST(p_months_ahead, 0) LOOP
+        v_created := v_created || ensure_energy_readings_partition(
+            (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date
+        );
+    END LOOP;
+
+    v_dropped := ARRAY(SELECT drop_expired_energy_partitions(p_retention_months));
+
+    RETURN jsonb_build_object('partitions', v_created, 'dropped', v_dropped);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT maintain_energy_readings();
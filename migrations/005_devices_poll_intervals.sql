@@ -0,0 +1,9 @@
+-- Migração 005: limites de intervalo de coleta por dispositivo
+-- O coletor ajusta o intervalo de cada dispositivo conforme a variação da
+-- potência; estas colunas restringem esse intervalo (NULL = padrão global
+-- collector_min_interval_seconds / collector_max_interval_seconds)
+-- Execute no Supabase SQL Editor (após a migração 004)
+
+ALTER TABLE devices
+    ADD COLUMN IF NOT EXISTS min_poll_seconds INTEGER,
+    ADD COLUMN IF NOT EXISTS max_poll_seconds INTEGER;
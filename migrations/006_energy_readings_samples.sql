@@ -0,0 +1,151 @@
+-- Migração 006: leituras comprimidas por banda morta (coluna samples)
+-- O coletor só grava uma leitura quando a potência sai da tolerância ou o
+-- heartbeat vence; samples é o número de leituras da tomada que a linha
+-- representa (desde a linha anterior do dispositivo, inclusive ela).
+-- Contagens e médias de energy_daily e energy_rollups passam a ser
+-- ponderadas por samples, então não mudam com a compressão
+-- Execute no Supabase SQL Editor (após a migração 005)
+
+ALTER TABLE energy_readings
+    ADD COLUMN IF NOT EXISTS samples INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION energy_daily_apply_reading()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.device_id IS NULL
+       OR current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO energy_daily AS d (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    VALUES (
+        NEW.device_id, NEW.timestamp::date, NEW.samples,
+        NEW.power_watts * NEW.samples, NEW.power_watts,
+        NEW.timestamp, NEW.power_watts, COALESCE(NEW.energy_today_kwh, 0),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        readings_count = d.readings_count + EXCLUDED.readings_count,
+        power_sum_watts = d.power_sum_watts + EXCLUDED.power_sum_watts,
+        max_power_watts = GREATEST(d.max_power_watts, EXCLUDED.max_power_watts),
+        last_power_watts = CASE
+            WHEN EXCLUDED.last_timestamp >= d.last_timestamp
+                THEN EXCLUDED.last_power_watts
+            ELSE d.last_power_watts
+        END,
+        last_timestamp = GREATEST(d.last_timestamp, EXCLUDED.last_timestamp),
+        energy_kwh = GREATEST(d.energy_kwh, EXCLUDED.energy_kwh),
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_energy_daily(p_since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_since DATE := GREATEST(p_since, energy_readings_retained_from()::date);
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_daily WHERE v_since IS NULL OR day >= v_since;
+
+    INSERT INTO energy_daily (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    SELECT
+        device_id,
+        timestamp::date,
+        SUM(samples),
+        SUM(power_watts * samples),
+        MAX(power_watts),
+        MAX(timestamp),
+        (ARRAY_AGG(power_watts ORDER BY timestamp DESC))[1],
+        COALESCE(MAX(energy_today_kwh), 0),
+        CURRENT_TIMESTAMP
+    FROM energy_readings
+    WHERE device_id IS NOT NULL
+      AND (v_since IS NULL OR timestamp >= v_since)
+    GROUP BY device_id, timestamp::date;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_energy_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER AS $$
+DECLARE
+    v_from TIMESTAMP := energy_bucket(
+        '15m', GREATEST(p_from, energy_readings_retained_from())
+    );
+    v_to TIMESTAMP := energy_bucket('15m', p_to - interval '1 microsecond')
+        + interval '15 minutes';
+    total INTEGER;
+BEGIN
+    IF v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM energy_rollups
+    WHERE resolution = '15m'
+      AND bucket_start >= v_from
+      AND bucket_start < v_to;
+
+    -- energy_today_kwh é um acumulado que zera à meia-noite: a energia de
+    -- cada leitura é a diferença para a anterior do mesmo dia
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        '15m',
+        energy_bucket('15m', timestamp),
+        SUM(samples),
+        MIN(power_watts),
+        MAX(power_watts),
+        SUM(power_watts * samples) / SUM(samples),
+        COALESCE(SUM(energy_increment), 0)
+    FROM (
+        SELECT
+            device_id,
+            timestamp,
+            power_watts,
+            samples,
+            CASE
+                WHEN prev_timestamp IS NULL
+                  OR prev_timestamp::date <> timestamp::date
+                    THEN energy_today_kwh
+                ELSE GREATEST(energy_today_kwh - prev_energy, 0)
+            END AS energy_increment
+        FROM (
+            SELECT
+                device_id,
+                timestamp,
+                power_watts,
+                samples,
+                energy_today_kwh,
+                LAG(timestamp) OVER w AS prev_timestamp,
+                LAG(energy_today_kwh) OVER w AS prev_energy
+            FROM energy_readings
+            WHERE device_id IS NOT NULL
+              AND timestamp >= v_from - interval '1 day'
+              AND timestamp < v_to
+            WINDOW w AS (PARTITION BY device_id ORDER BY timestamp)
+        ) AS with_previous
+        WHERE timestamp >= v_from
+    ) AS increments
+    GROUP BY device_id, energy_bucket('15m', timestamp);
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+
+    total := total + rebuild_energy_rollup_level('1h', '15m', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1d', '1h', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1mo', '1d', v_from, v_to);
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,122 @@
+-- Migração 007: energy_daily agregado só a partir de leituras ao vivo
+-- Linhas importadas do histórico (tapo_history_*) e de preenchimento de
+-- lacunas (tapo_backfill_*) são médias de uma hora ou de um dia: somá-las a
+-- readings_count e power_sum_watts como se fossem uma leitura distorcia a
+-- média e a contagem, e o GREATEST em energy_kwh misturava o contador da
+-- tomada com estimativas. Agora elas só alimentam dias sem nenhuma leitura
+-- ao vivo (readings_count = 0, apenas energy_kwh e last_timestamp)
+-- Execute no Supabase SQL Editor (após a migração 006)
+
+-- Leitura coletada ao vivo (não importada nem preenchida do histórico)
+CREATE OR REPLACE FUNCTION energy_reading_is_live(p_source TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_source IS NULL
+        OR (p_source NOT LIKE 'tapo\_history\_%'
+            AND p_source NOT LIKE 'tapo\_backfill\_%');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION energy_daily_apply_reading()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.device_id IS NULL
+       OR current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
+    IF NOT energy_reading_is_live(NEW.data_source) THEN
+        -- Histórico só vale para dias que o coletor não viu
+        INSERT INTO energy_daily AS d (
+            device_id, day, readings_count, power_sum_watts, max_power_watts,
+            last_timestamp, last_power_watts, energy_kwh, updated_at
+        )
+        VALUES (
+            NEW.device_id, NEW.timestamp::date, 0, 0, NULL,
+            NEW.timestamp, NULL, COALESCE(NEW.energy_today_kwh, 0),
+            CURRENT_TIMESTAMP
+        )
+        ON CONFLICT (device_id, day) DO UPDATE SET
+            last_timestamp = GREATEST(d.last_timestamp, EXCLUDED.last_timestamp),
+            energy_kwh = GREATEST(d.energy_kwh, EXCLUDED.energy_kwh),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE d.readings_count = 0;
+
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO energy_daily AS d (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    VALUES (
+        NEW.device_id, NEW.timestamp::date, NEW.samples,
+        NEW.power_watts * NEW.samples, NEW.power_watts,
+        NEW.timestamp, NEW.power_watts, COALESCE(NEW.energy_today_kwh, 0),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        readings_count = d.readings_count + EXCLUDED.readings_count,
+        power_sum_watts = d.power_sum_watts + EXCLUDED.power_sum_watts,
+        max_power_watts = GREATEST(d.max_power_watts, EXCLUDED.max_power_watts),
+        -- Num dia só com histórico, a primeira leitura ao vivo substitui tudo
+        last_power_watts = CASE
+            WHEN d.readings_count = 0
+                 OR EXCLUDED.last_timestamp >= d.last_timestamp
+                THEN EXCLUDED.last_power_watts
+            ELSE d.last_power_watts
+        END,
+        last_timestamp = CASE
+            WHEN d.readings_count = 0 THEN EXCLUDED.last_timestamp
+            ELSE GREATEST(d.last_timestamp, EXCLUDED.last_timestamp)
+        END,
+        energy_kwh = CASE
+            WHEN d.readings_count = 0 THEN EXCLUDED.energy_kwh
+            ELSE GREATEST(d.energy_kwh, EXCLUDED.energy_kwh)
+        END,
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_energy_daily(p_since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_since DATE := GREATEST(p_since, energy_readings_retained_from()::date);
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_daily WHERE v_since IS NULL OR day >= v_since;
+
+    INSERT INTO energy_daily (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    SELECT
+        device_id,
+        timestamp::date,
+        COALESCE(SUM(samples) FILTER (WHERE live), 0),
+        COALESCE(SUM(power_watts * samples) FILTER (WHERE live), 0),
+        MAX(power_watts) FILTER (WHERE live),
+        COALESCE(MAX(timestamp) FILTER (WHERE live), MAX(timestamp)),
+        (ARRAY_AGG(power_watts ORDER BY timestamp DESC)
+            FILTER (WHERE live))[1],
+        COALESCE(
+            MAX(energy_today_kwh) FILTER (WHERE live),
+            MAX(energy_today_kwh),
+            0
+        ),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT *, energy_reading_is_live(data_source) AS live
+        FROM energy_readings
+        WHERE device_id IS NOT NULL
+          AND (v_since IS NULL OR timestamp >= v_since)
+    ) r
+    GROUP BY device_id, timestamp::date;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular os dias já agregados com as regras novas
+SELECT refresh_energy_daily();
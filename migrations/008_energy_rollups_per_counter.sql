@@ -0,0 +1,108 @@
+-- Migração 008: deltas de energy_rollups calculados por contador
+-- O LAG de rebuild_energy_rollups era particionado só por dispositivo, então
+-- uma linha importada do histórico (com o seu próprio acumulado do dia)
+-- intercalada com leituras ao vivo gerava diferenças entre contadores
+-- distintos. As linhas de tapo_history_* passam a ter a sua própria
+-- sequência e só contam nos buckets sem leituras ao vivo ou de backfill;
+-- tapo_backfill_hourly continua o acumulado da tomada e segue junto com as
+-- leituras ao vivo
+-- Execute no Supabase SQL Editor (após a migração 007)
+
+CREATE OR REPLACE FUNCTION rebuild_energy_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER AS $$
+DECLARE
+    v_from TIMESTAMP := energy_bucket(
+        '15m', GREATEST(p_from, energy_readings_retained_from())
+    );
+    v_to TIMESTAMP := energy_bucket('15m', p_to - interval '1 microsecond')
+        + interval '15 minutes';
+    total INTEGER;
+BEGIN
+    IF v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM energy_rollups
+    WHERE resolution = '15m'
+      AND bucket_start >= v_from
+      AND bucket_start < v_to;
+
+    -- energy_today_kwh é um acumulado que zera à meia-noite: a energia de
+    -- cada leitura é a diferença para a anterior do mesmo dia e do mesmo
+    -- contador. Leituras ao vivo e de preenchimento de lacunas continuam o
+    -- contador da tomada; cada importação do histórico (tapo_history_*) tem
+    -- o seu, e só entra nos buckets sem nenhuma outra leitura
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        '15m',
+        bucket_start,
+        SUM(samples),
+        MIN(power_watts),
+        MAX(power_watts),
+        SUM(power_watts * samples) / SUM(samples),
+        COALESCE(SUM(energy_increment), 0)
+    FROM (
+        SELECT
+            *,
+            BOOL_AND(history) OVER (
+                PARTITION BY device_id, bucket_start
+            ) AS history_only
+        FROM (
+            SELECT
+                device_id,
+                energy_bucket('15m', timestamp) AS bucket_start,
+                power_watts,
+                samples,
+                history,
+                CASE
+                    WHEN prev_timestamp IS NULL
+                      OR prev_timestamp::date <> timestamp::date
+                        THEN energy_today_kwh
+                    ELSE GREATEST(energy_today_kwh - prev_energy, 0)
+                END AS energy_increment
+            FROM (
+                SELECT
+                    device_id,
+                    timestamp,
+                    power_watts,
+                    samples,
+                    energy_today_kwh,
+                    COALESCE(data_source LIKE 'tapo\_history\_%', false)
+                        AS history,
+                    LAG(timestamp) OVER w AS prev_timestamp,
+                    LAG(energy_today_kwh) OVER w AS prev_energy
+                FROM energy_readings
+                WHERE device_id IS NOT NULL
+                  AND timestamp >= v_from - interval '1 day'
+                  AND timestamp < v_to
+                WINDOW w AS (
+                    PARTITION BY device_id,
+                        CASE
+                            WHEN data_source LIKE 'tapo\_history\_%'
+                                THEN data_source
+                        END
+                    ORDER BY timestamp
+                )
+            ) AS with_previous
+            WHERE timestamp >= v_from
+        ) AS increments
+    ) AS by_bucket
+    WHERE history_only OR NOT history
+    GROUP BY device_id, bucket_start;
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+
+    total := total + rebuild_energy_rollup_level('1h', '15m', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1d', '1h', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1mo', '1d', v_from, v_to);
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular todos os agregados com as regras novas
+UPDATE rollup_state SET watermark = NULL WHERE name = 'energy_rollups';
+SELECT run_energy_rollups();
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Script para comparar a latência de consultas em energy_readings antes e depois
+do particionamento mensal (migrations/004_energy_readings_partitioning.sql)
+
+Executa as mesmas consultas via PostgREST na tabela original
+(energy_readings_legacy) e na tabela particionada (energy_readings).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adicionar a raiz do projeto ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.integrations.supabase_client import SupabaseSyncClient, readings_filters
+
+TABLES = ["energy_readings_legacy", "energy_readings"]
+COLUMNS = ["device_id", "timestamp", "power_watts", "energy_today_kwh"]
+
+
+def build_queries(client: SupabaseSyncClient, device_ids, now: datetime):
+    """Consultas representativas do coletor, do dashboard e do assistente"""
+
+    def latest_per_device(table):
+        for device_id in device_ids:
+            client.select(
+                table,
+                filters=readings_filters(device_id=device_id),
+                columns=COLUMNS,
+                order="timestamp.desc",
+                limit=1,
+                raise_errors=True,
+            )
+
+    def device_window(days):
+        def query(table):
+            client.select(
+                table,
+                filters=readings_filters(
+                    device_id=device_ids[0], since=now - timedelta(days=days)
+                ),
+                columns=COLUMNS,
+                order="timestamp.asc",
+                raise_errors=True,
+            )
+
+        return query
+
+    def all_devices_last_hour(table):
+        client.select(
+            table,
+            filters=readings_filters(since=now - timedelta(hours=1)),
+            columns=COLUMNS,
+            raise_errors=True,
+        )
+
+    return {
+        "última leitura por dispositivo": latest_per_device,
+        "dispositivo, últimas 24h": device_window(1),
+        "dispositivo, últimos 7 dias": device_window(7),
+        "todos os dispositivos, última hora": all_devices_last_hour,
+    }
+
+
+def measure(query, table: str, repeat: int):
+    """Executar a consulta ``repeat`` vezes (após um aquecimento) e medir em ms"""
+    query(table)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query(table)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mediana": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="Execuções por consulta")
+    parser.add_argument(
+        "--device-id",
+        type=int,
+        action="append",
+        help="Dispositivo(s) consultado(s) (padrão: todos os ativos)",
+    )
+    args = parser.parse_args()
+
+    client = SupabaseSyncClient()
+    try:
+        device_ids = args.device_id or [
+            d["id"]
+            for d in client.select("devices", raise_errors=True)
+            if d.get("is_active") is not False
+        ]
+        if not device_ids:
+            print("❌ Nenhum dispositivo encontrado")
+            return 1
+
+        print("\n⏱️  BENCHMARK energy_readings (antes x depois do particionamento)")
+        print(f"   Dispositivos: {device_ids} | execuções por consulta: {args.repeat}")
+        print("=" * 80)
+        print(f"{'consulta':<38}" + "".join(f"{t:>21}" for t in TABLES))
+
+        queries = build_queries(client, device_ids, datetime.utcnow())
+        for name, query in queries.items():
+            results = [measure(query, table, args.repeat) for table in TABLES]
+            print(
+                f"{name:<38}"
+                + "".join(
+                    f"{r['mediana']:>9.1f} / {r['p95']:>6.1f} ms" for r in results
+                )
+            )
+
+        print("=" * 80)
+        print("Valores: mediana / p95")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
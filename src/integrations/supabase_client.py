@@ -0,0 +1,658 @@
+"""
+Cliente compartilhado para a API REST (PostgREST) do Supabase
+Mantém conexões keep-alive em pool e usa HTTP/2 quando o pacote 'h2' está instalado
+"""
+
+import asyncio
+import importlib.util
+import logging
+import weakref
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, TypedDict, Union
+
+import httpx
+
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0
+)
+
+# Chave única de energy_readings (ver migrations/001_energy_readings_upsert_key.sql)
+READINGS_UNIQUE_KEY = ("device_id", "timestamp", "data_source")
+
+# Linhas por página em select_all (max-rows padrão do PostgREST no Supabase)
+PAGE_SIZE = 1000
+
+# Filtros PostgREST: {"id": "eq.1"} ou [("timestamp", "gte.X"), ("timestamp", "lt.Y")]
+Filters = Union[Mapping[str, Any], Sequence[Tuple[str, Any]]]
+
+
+class DeviceRow(TypedDict, total=False):
+    """Linha da tabela ``devices``"""
+
+    id: int
+    name: str
+    type: str
+    ip_address: str
+    model: Optional[str]
+    location: Optional[str]
+    equipment_connected: Optional[str]
+    is_active: Optional[bool]
+    device_id: Optional[str]
+    min_poll_seconds: Optional[int]
+    max_poll_seconds: Optional[int]
+
+
+class EnergyReadingRow(TypedDict, total=False):
+    """Linha da tabela ``energy_readings``"""
+
+    id: int
+    device_id: int
+    timestamp: str
+    power_watts: float
+    voltage: Optional[float]
+    current: Optional[float]
+    energy_today_kwh: Optional[float]
+    energy_total_kwh: Optional[float]
+    device_on: Optional[bool]
+    data_source: Optional[str]
+
+
+class EnergyDailyRow(TypedDict, total=False):
+    """Linha da tabela ``energy_daily`` (agregado diário por dispositivo)"""
+
+    device_id: int
+    day: str
+    readings_count: int
+    power_sum_watts: float
+    max_power_watts: Optional[float]
+    last_timestamp: str
+    last_power_watts: Optional[float]
+    energy_kwh: float
+    updated_at: str
+
+
+class EnergyRollupRow(TypedDict, total=False):
+    """Linha da tabela ``energy_rollups`` (agregado por resolução)"""
+
+    device_id: int
+    resolution: str
+    bucket_start: str
+    samples: int
+    min_power_watts: Optional[float]
+    max_power_watts: Optional[float]
+    avg_power_watts: Optional[float]
+    energy_delta_kwh: float
+
+
+class SupabaseError(Exception):
+    """Erro retornado pela API REST do Supabase"""
+
+
+def _format_value(value: Any) -> str:
+    """Converter valores Python para o formato esperado pelo PostgREST"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def build_query(
+    filters: Optional[Filters] = None,
+    columns: Optional[Sequence[str]] = None,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Montar os parâmetros de uma consulta PostgREST
+
+    Args:
+        filters: Filtros no formato PostgREST (coluna -> "op.valor")
+        columns: Colunas a retornar (padrão: todas)
+        order: Ordenação (ex: "timestamp.desc")
+        limit: Número máximo de linhas
+        offset: Linhas a pular (paginação)
+
+    Returns:
+        Lista de pares (parâmetro, valor) para a query string
+    """
+    items = filters.items() if isinstance(filters, Mapping) else (filters or [])
+    params = [(key, _format_value(value)) for key, value in items]
+
+    if columns:
+        params.append(("select", ",".join(columns)))
+    if order:
+        params.append(("order", order))
+    if limit is not None:
+        params.append(("limit", str(limit)))
+    if offset:
+        params.append(("offset", str(offset)))
+
+    return params
+
+
+def readings_filters(
+    device_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Tuple[str, Any]]:
+    """Filtros comuns para consultas em ``energy_readings``"""
+    filters: List[Tuple[str, Any]] = []
+    if device_id is not None:
+        filters.append(("device_id", f"eq.{device_id}"))
+    if since is not None:
+        filters.append(("timestamp", f"gte.{_format_value(since)}"))
+    if until is not None:
+        filters.append(("timestamp", f"lt.{_format_value(until)}"))
+    return filters
+
+
+def daily_filters(
+    device_id: Optional[int] = None,
+    day: Optional[date] = None,
+    updated_since: Optional[datetime] = None,
+) -> List[Tuple[str, Any]]:
+    """Filtros comuns para consultas em ``energy_daily``"""
+    filters: List[Tuple[str, Any]] = []
+    if device_id is not None:
+        filters.append(("device_id", f"eq.{device_id}"))
+    if day is not None:
+        filters.append(("day", f"eq.{day.isoformat()}"))
+    if updated_since is not None:
+        filters.append(("last_timestamp", f"gte.{_format_value(updated_since)}"))
+    return filters
+
+
+def rollup_filters(
+    resolution: str,
+    device_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Tuple[str, Any]]:
+    """Filtros comuns para consultas em ``energy_rollups``"""
+    filters: List[Tuple[str, Any]] = [("resolution", f"eq.{resolution}")]
+    if device_id is not None:
+        filters.append(("device_id", f"eq.{device_id}"))
+    if since is not None:
+        filters.append(("bucket_start", f"gte.{_format_value(since)}"))
+    if until is not None:
+        filters.append(("bucket_start", f"lt.{_format_value(until)}"))
+    return filters
+
+
+class _SupabaseBase:
+    """Configuração comum aos clientes síncrono e assíncrono"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+    ):
+        self.url = (url or settings.supabase_url).rstrip("/")
+        self.key = key if key is not None else settings.supabase_anon_key
+        self.timeout = timeout
+        self.limits = limits
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/rest/v1"
+
+    def _default_headers(self) -> Dict[str, str]:
+        return {
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _insert_request(
+        upsert: bool, on_conflict: Optional[Sequence[str]]
+    ) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+        """Cabeçalhos e parâmetros de um insert/upsert em lote"""
+        prefer = ["return=minimal"]
+        if upsert:
+            prefer.append("resolution=merge-duplicates")
+        params = [("on_conflict", ",".join(on_conflict))] if on_conflict else []
+        return {"Prefer": ",".join(prefer)}, params
+
+
+class SupabaseClient(_SupabaseBase):
+    """
+    Cliente assíncrono do Supabase com pool de conexões compartilhado
+
+    O ``httpx.AsyncClient`` é criado sob demanda e reaproveitado por todas as
+    requisições do mesmo event loop (keep-alive e, se disponível, HTTP/2).
+    Cada event loop tem o seu cliente, pois as conexões do pool pertencem ao
+    loop que as abriu: a API e uma thread com outro loop usam a instância
+    global sem trocar (nem vazar) o pool uma da outra.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # {event loop: cliente}; a entrada some junto com o loop
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Obter o cliente HTTP do event loop atual (lazy initialization)"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Loops já encerrados não conseguem mais fechar os seus clientes
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._default_headers(),
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return client
+
+    async def aclose(self):
+        """Fechar as conexões do pool do event loop atual"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    async def select(
+        self,
+        table: str,
+        filters: Optional[Filters] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        raise_errors: bool = False,
+    ) -> List[Dict]:
+        """
+        Consultar uma tabela ou view
+
+        Args:
+            table: Nome da tabela/view
+            filters: Filtros PostgREST (também aceita "order"/"limit" crus)
+            columns: Colunas a retornar
+            order: Ordenação
+            limit: Número máximo de linhas
+            raise_errors: Levantar SupabaseError em vez de retornar lista vazia
+
+        Returns:
+            Lista de linhas (vazia em caso de erro)
+        """
+        try:
+            response = await self._get_client().get(
+                f"/{table}", params=build_query(filters, columns, order, limit)
+            )
+            if response.status_code == 200:
+                return response.json()
+            message = f"Erro ao buscar {table}: {response.status_code}"
+        except httpx.HTTPError as e:
+            message = f"Erro ao conectar ao Supabase: {str(e)}"
+
+        logger.error(message)
+        if raise_errors:
+            raise SupabaseError(message)
+        return []
+
+    async def select_all(
+        self,
+        table: str,
+        filters: Optional[Filters] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[str] = None,
+        page_size: int = PAGE_SIZE,
+        raise_errors: bool = False,
+    ) -> List[Dict]:
+        """
+        Consultar todas as linhas, em páginas de ``page_size``
+
+        O PostgREST limita o número de linhas por resposta; ``order`` deve
+        ser determinística para que as páginas não se sobreponham.
+        """
+        items = filters.items() if isinstance(filters, Mapping) else (filters or [])
+        base = list(items)
+        rows: List[Dict] = []
+        while True:
+            page = await self.select(
+                table,
+                base + [("offset", len(rows))] if rows else base,
+                columns=columns,
+                order=order,
+                limit=page_size,
+                raise_errors=raise_errors,
+            )
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
+    async def insert(
+        self,
+        table: str,
+        rows: Union[Dict, List[Dict]],
+        upsert: bool = False,
+        on_conflict: Optional[Sequence[str]] = None,
+    ) -> List[bool]:
+        """
+        Inserir uma ou várias linhas em uma única requisição
+
+        Se o lote for rejeitado pelo servidor (4xx), as linhas são reenviadas
+        individualmente para isolar a linha inválida.
+
+        Args:
+            table: Nome da tabela
+            rows: Linha ou lista de linhas
+            upsert: Mesclar linhas que violem a chave única
+            on_conflict: Colunas da chave única usada no upsert
+
+        Returns:
+            Lista com o sucesso de cada linha
+        """
+        rows = [rows] if isinstance(rows, dict) else list(rows)
+        if not rows:
+            return []
+
+        headers, params = self._insert_request(upsert, on_conflict)
+        try:
+            response = await self._get_client().post(
+                f"/{table}", json=rows, headers=headers, params=params
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Erro ao salvar no Supabase: {str(e)}")
+            return [False] * len(rows)
+
+        if response.status_code in [200, 201]:
+            return [True] * len(rows)
+
+        logger.error(
+            f"Erro ao salvar em {table}: {response.status_code} - {response.text}"
+        )
+        if 400 <= response.status_code < 500 and len(rows) > 1:
+            results = []
+            for row in rows:
+                results.extend(await self.insert(table, row, upsert, on_conflict))
+            return results
+        return [False] * len(rows)
+
+    async def rpc(self, function: str, params: Optional[Dict] = None) -> Any:
+        """
+        Executar uma função Postgres exposta via ``/rpc``
+
+        Returns:
+            Resultado da função ou None em caso de erro
+        """
+        try:
+            response = await self._get_client().post(
+                f"/rpc/{function}", json=params or {}
+            )
+            if response.status_code in [200, 204]:
+                return response.json() if response.content else None
+            logger.error(
+                f"Erro ao executar {function}: {response.status_code} - {response.text}"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Erro ao conectar ao Supabase: {str(e)}")
+        return None
+
+    async def get_devices(self, active_only: bool = True) -> List[DeviceRow]:
+        """Obter dispositivos cadastrados (por padrão, apenas os ativos)"""
+        devices = await self.select("devices")
+        if active_only:
+            devices = [d for d in devices if d.get("is_active") is not False]
+        return devices
+
+    async def get_device(self, device_id: int) -> Optional[DeviceRow]:
+        """Obter um dispositivo pelo ID"""
+        devices = await self.select("devices", {"id": f"eq.{device_id}"})
+        return devices[0] if devices else None
+
+    async def get_energy_readings(
+        self,
+        device_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: str = "timestamp.desc",
+        limit: Optional[int] = None,
+    ) -> List[EnergyReadingRow]:
+        """Obter leituras de energia filtradas por dispositivo e período"""
+        return await self.select(
+            "energy_readings",
+            readings_filters(device_id, since, until),
+            columns=columns,
+            order=order,
+            limit=limit,
+        )
+
+    async def insert_energy_readings(self, rows: List[EnergyReadingRow]) -> List[bool]:
+        """Gravar leituras de energia em lote"""
+        return await self.insert("energy_readings", rows)
+
+    async def upsert_energy_readings(self, rows: List[EnergyReadingRow]) -> List[bool]:
+        """
+        Gravar leituras de energia em lote de forma idempotente
+
+        Linhas repetidas (mesmo dispositivo, timestamp e origem) são mescladas
+        em vez de duplicadas, permitindo reenviar um lote com segurança.
+        """
+        return await self.insert(
+            "energy_readings", rows, upsert=True, on_conflict=READINGS_UNIQUE_KEY
+        )
+
+    async def get_daily_rollup(
+        self,
+        day: Optional[date] = None,
+        device_id: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+    ) -> List[EnergyDailyRow]:
+        """
+        Obter o agregado diário por dispositivo (uma linha por dispositivo/dia)
+
+        Args:
+            day: Dia desejado (padrão: todos)
+            device_id: Filtrar um dispositivo
+            updated_since: Apenas linhas com leitura a partir deste instante
+        """
+        return await self.select_all(
+            "energy_daily",
+            daily_filters(device_id, day, updated_since),
+            order="day.asc,device_id.asc",
+        )
+
+    async def get_latest_daily(self) -> List[EnergyDailyRow]:
+        """Dia mais recente de cada dispositivo (última leitura e agregados)"""
+        return await self.select("energy_daily_latest")
+
+    async def refresh_daily_rollup(self, since: Optional[date] = None) -> Any:
+        """Recalcular ``energy_daily`` a partir das leituras (ex.: após importação)"""
+        params = {"p_since": since.isoformat()} if since else {}
+        return await self.rpc("refresh_energy_daily", params)
+
+    async def get_rollups(
+        self,
+        resolution: str,
+        device_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[EnergyRollupRow]:
+        """Obter todos os buckets de ``energy_rollups`` em ordem cronológica"""
+        return await self.select_all(
+            "energy_rollups",
+            rollup_filters(resolution, device_id, since, until),
+            order="bucket_start.asc,device_id.asc",
+        )
+
+    async def run_rollups(self) -> Any:
+        """Agregar as leituras novas desde a marca d'água (``run_energy_rollups``)"""
+        return await self.rpc("run_energy_rollups")
+
+    async def rebuild_rollups(self, since: datetime, until: datetime) -> Any:
+        """Recalcular todas as resoluções para as leituras em [since, until)"""
+        return await self.rpc(
+            "rebuild_energy_rollups",
+            {"p_from": _format_value(since), "p_to": _format_value(until)},
+        )
+
+    async def maintain_energy_readings(self, retention_months: int = 0) -> Any:
+        """
+        Criar as partições dos próximos meses e descartar as expiradas
+
+        Só são descartadas partições já cobertas pelos agregados; com
+        ``retention_months`` 0 nenhuma leitura bruta é removida.
+        """
+        return await self.rpc(
+            "maintain_energy_readings", {"p_retention_months": retention_months}
+        )
+
+
+class SupabaseSyncClient(_SupabaseBase):
+    """
+    Cliente síncrono do Supabase com pool de conexões
+
+    Usado por código que não roda em um event loop (ex.: dashboard Streamlit).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            headers=self._default_headers(),
+            http2=HTTP2_AVAILABLE,
+            timeout=self.timeout,
+            limits=self.limits,
+        )
+
+    def close(self):
+        """Fechar as conexões do pool"""
+        self._client.close()
+
+    def select(
+        self,
+        table: str,
+        filters: Optional[Filters] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        raise_errors: bool = False,
+    ) -> List[Dict]:
+        """Consultar uma tabela ou view (ver ``SupabaseClient.select``)"""
+        try:
+            response = self._client.get(
+                f"/{table}", params=build_query(filters, columns, order, limit)
+            )
+            if response.status_code == 200:
+                return response.json()
+            message = f"Erro ao buscar {table}: {response.status_code}"
+        except httpx.HTTPError as e:
+            message = f"Erro ao conectar ao Supabase: {str(e)}"
+
+        logger.error(message)
+        if raise_errors:
+            raise SupabaseError(message)
+        return []
+
+    def select_all(
+        self,
+        table: str,
+        filters: Optional[Filters] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[str] = None,
+        page_size: int = PAGE_SIZE,
+        raise_errors: bool = False,
+    ) -> List[Dict]:
+        """Consultar todas as linhas, em páginas (ver ``SupabaseClient.select_all``)"""
+        items = filters.items() if isinstance(filters, Mapping) else (filters or [])
+        base = list(items)
+        rows: List[Dict] = []
+        while True:
+            page = self.select(
+                table,
+                base + [("offset", len(rows))] if rows else base,
+                columns=columns,
+                order=order,
+                limit=page_size,
+                raise_errors=raise_errors,
+            )
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
+    def rpc(self, function: str, params: Optional[Dict] = None) -> Any:
+        """Executar uma função Postgres exposta via ``/rpc``"""
+        try:
+            response = self._client.post(f"/rpc/{function}", json=params or {})
+            if response.status_code in [200, 204]:
+                return response.json() if response.content else None
+            logger.error(
+                f"Erro ao executar {function}: {response.status_code} - {response.text}"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Erro ao conectar ao Supabase: {str(e)}")
+        return None
+
+    def get_energy_readings(
+        self,
+        device_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: str = "timestamp.desc",
+        limit: Optional[int] = None,
+        raise_errors: bool = False,
+    ) -> List[EnergyReadingRow]:
+        """Obter leituras de energia filtradas por dispositivo e período"""
+        return self.select(
+            "energy_readings",
+            readings_filters(device_id, since, until),
+            columns=columns,
+            order=order,
+            limit=limit,
+            raise_errors=raise_errors,
+        )
+
+    def get_daily_rollup(
+        self,
+        day: Optional[date] = None,
+        device_id: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        raise_errors: bool = False,
+    ) -> List[EnergyDailyRow]:
+        """Obter o agregado diário por dispositivo (ver ``SupabaseClient``)"""
+        return self.select_all(
+            "energy_daily",
+            daily_filters(device_id, day, updated_since),
+            order="day.asc,device_id.asc",
+            raise_errors=raise_errors,
+        )
+
+    def get_latest_daily(self, raise_errors: bool = False) -> List[EnergyDailyRow]:
+        """Dia mais recente de cada dispositivo (última leitura e agregados)"""
+        return self.select("energy_daily_latest", raise_errors=raise_errors)
+
+    def get_rollups(
+        self,
+        resolution: str,
+        device_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        raise_errors: bool = False,
+    ) -> List[EnergyRollupRow]:
+        """Obter todos os buckets de ``energy_rollups`` em ordem cronológica"""
+        return self.select_all(
+            "energy_rollups",
+            rollup_filters(resolution, device_id, since, until),
+            order="bucket_start.asc,device_id.asc",
+            raise_errors=raise_errors,
+        )
+
+
+# Instância global do cliente (compartilhada pela API, coletor e LLM)
+supabase_client = SupabaseClient()
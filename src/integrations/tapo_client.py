@@ -4,29 +4,72 @@ Suporta tomadas inteligentes P100, P110 e similares
 Usa a biblioteca 'tapo' (Rust-based, oficial e confiável)
 """
 
+import asyncio
+import ipaddress
+import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone
 from tapo import ApiClient
+from tapo.requests import EnergyDataInterval
 
 logger = logging.getLogger(__name__)
 
+# Chamada ao dispositivo que fornece cada campo de ``get_energy_usage``
+ENERGY_FIELD_SOURCES = {
+    "power_watts": "current_power",
+    "voltage": "current_power",
+    "current": "current_power",
+    "energy_today_kwh": "energy_usage",
+    "today_runtime": "energy_usage",
+    "device_on": "device_info",
+}
+
+# Intervalos aceitos por ``get_energy_history`` (o enum nativo não é instanciável)
+ENERGY_DATA_INTERVALS = {
+    "hourly": EnergyDataInterval.Hourly,
+    "daily": EnergyDataInterval.Daily,
+    "monthly": EnergyDataInterval.Monthly,
+}
+
 
 class TapoClient:
     """Cliente para comunicação com dispositivos TAPO usando biblioteca tapo"""
 
-    def __init__(self, username: str, password: str):
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        metadata_cache_path: Optional[str] = None,
+        metadata_cache_ttl_seconds: float = 86400,
+    ):
         """
         Inicializar cliente TAPO
 
         Args:
             username: Email da conta TP-Link/Tapo
             password: Senha da conta TP-Link/Tapo
+            metadata_cache_path: Arquivo JSON com metadados dos dispositivos por IP
+                (modelo, firmware, MAC). Se informado, dispositivos já conhecidos
+                são registrados sem handshake e conectados no primeiro uso.
+            metadata_cache_ttl_seconds: Validade de uma entrada do cache
         """
         self.username = username
         self.password = password
         self.api_client = None
         self.devices: Dict[str, any] = {}  # {device_name: device_handler}
+        self.device_ips: Dict[str, str] = {}  # {device_name: ip_address}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self._poll_counts: Dict[str, int] = {}  # {device_name: leituras feitas}
+        self._last_device_info: Dict[str, any] = {}  # {device_name: device_info}
+
+        self.metadata_cache_path = (
+            Path(metadata_cache_path) if metadata_cache_path else None
+        )
+        self.metadata_cache_ttl_seconds = metadata_cache_ttl_seconds
+        self.device_metadata: Dict[str, Dict] = self._load_metadata_cache()
 
     async def _get_api_client(self) -> ApiClient:
         """Obter cliente API (lazy initialization)"""
@@ -34,17 +77,88 @@ class TapoClient:
             self.api_client = ApiClient(self.username, self.password)
         return self.api_client
 
-    async def add_device(self, ip_address: str, device_name: str) -> bool:
+    def _load_metadata_cache(self) -> Dict[str, Dict]:
+        """Carregar metadados de dispositivos do disco ({ip: metadados})"""
+        if not self.metadata_cache_path or not self.metadata_cache_path.exists():
+            return {}
+        try:
+            with open(self.metadata_cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de dispositivos TAPO inválido, ignorando: {str(e)}")
+            return {}
+
+    def _save_metadata_cache(self):
+        """Persistir metadados de dispositivos no disco"""
+        if not self.metadata_cache_path:
+            return
+        try:
+            self.metadata_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.metadata_cache_path, "w", encoding="utf-8") as f:
+                json.dump(self.device_metadata, f, indent=2)
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar cache de dispositivos: {str(e)}")
+
+    def _cached_metadata(self, ip_address: str) -> Optional[Dict]:
+        """Metadados em cache ainda válidos para o IP informado"""
+        metadata = self.device_metadata.get(ip_address)
+        if not metadata:
+            return None
+        age = time.time() - metadata.get("verified_at", 0)
+        return metadata if age < self.metadata_cache_ttl_seconds else None
+
+    def _has_device(self, device_name: str) -> bool:
+        return device_name in self.devices or device_name in self.device_ips
+
+    async def _get_device(self, device_name: str):
+        """
+        Obter o handler do dispositivo, conectando no primeiro uso
+
+        Dispositivos registrados a partir do cache ainda não fizeram o
+        handshake; ele acontece aqui, uma única vez por dispositivo.
+        """
+        device = self.devices.get(device_name)
+        if device is not None:
+            return device
+
+        lock = self._connect_locks.setdefault(device_name, asyncio.Lock())
+        async with lock:
+            if device_name not in self.devices:
+                ip_address = self.device_ips[device_name]
+                client = await self._get_api_client()
+                try:
+                    self.devices[device_name] = await client.p110(ip_address)
+                except Exception:
+                    # IP pode ter mudado: forçar verificação completa no próximo início
+                    if self.device_metadata.pop(ip_address, None) is not None:
+                        self._save_metadata_cache()
+                    raise
+                logger.debug(f"🔗 {device_name} conectado sob demanda")
+        return self.devices[device_name]
+
+    async def add_device(
+        self, ip_address: str, device_name: str, use_cache: bool = True
+    ) -> bool:
         """
         Adicionar um dispositivo TAPO
 
         Args:
             ip_address: IP do dispositivo
             device_name: Nome identificador do dispositivo
+            use_cache: Se o IP estiver no cache de metadados, registrar sem
+                handshake (conexão adiada para o primeiro uso)
 
         Returns:
             True se adicionado com sucesso
         """
+        self.device_ips[device_name] = ip_address
+
+        if use_cache and self._cached_metadata(ip_address):
+            logger.info(
+                f"✅ Dispositivo {device_name} ({ip_address}) registrado a partir do cache"
+            )
+            return True
+
         try:
             client = await self._get_api_client()
 
@@ -55,6 +169,13 @@ class TapoClient:
             device_info = await device.get_device_info()
 
             self.devices[device_name] = device
+            self.device_metadata[ip_address] = {
+                "name": device_name,
+                "model": device_info.model,
+                "fw_ver": device_info.fw_ver,
+                "mac": device_info.mac,
+                "verified_at": time.time(),
+            }
             logger.info(
                 f"✅ Dispositivo {device_name} ({ip_address}) adicionado com sucesso"
             )
@@ -63,51 +184,126 @@ class TapoClient:
             return True
 
         except Exception as e:
+            self.device_ips.pop(device_name, None)
             logger.error(
                 f"❌ Erro ao adicionar dispositivo {device_name} ({ip_address}): {str(e)}"
             )
             return False
 
-    async def get_energy_usage(self, device_name: str) -> Optional[Dict]:
+    async def add_devices(
+        self, devices: List[Tuple[str, str]], max_concurrency: int = 10
+    ) -> Dict[str, bool]:
+        """
+        Adicionar vários dispositivos com handshakes em paralelo
+
+        Args:
+            devices: Lista de tuplas (ip_address, device_name)
+            max_concurrency: Handshakes simultâneos
+
+        Returns:
+            Dict {device_name: adicionado com sucesso}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def add(ip_address: str, device_name: str) -> bool:
+            async with semaphore:
+                return await self.add_device(ip_address, device_name)
+
+        results = await asyncio.gather(
+            *(add(ip_address, name) for ip_address, name in devices)
+        )
+        self._save_metadata_cache()
+        return {name: result for (_, name), result in zip(devices, results)}
+
+    async def get_energy_usage(
+        self,
+        device_name: str,
+        fields: Optional[Iterable[str]] = None,
+        device_info_interval: int = 1,
+    ) -> Optional[Dict]:
         """
         Obter dados de consumo de energia de um dispositivo
 
+        As chamadas ao dispositivo (potência, energia e informações) são feitas
+        em paralelo, e apenas as necessárias para os campos pedidos.
+
         Args:
             device_name: Nome do dispositivo
+            fields: Campos desejados (chaves de ``ENERGY_FIELD_SOURCES``);
+                None retorna todos
+            device_info_interval: Consultar ``get_device_info`` apenas a cada N
+                leituras, reaproveitando a última resposta nas demais
 
         Returns:
             Dicionário com dados de energia ou None se falhar
         """
-        if device_name not in self.devices:
+        if not self._has_device(device_name):
             logger.error(f"Dispositivo {device_name} não encontrado")
             return None
 
+        fields = set(ENERGY_FIELD_SOURCES if fields is None else fields)
+        sources = {ENERGY_FIELD_SOURCES[field] for field in fields}
+
+        poll_count = self._poll_counts.get(device_name, 0)
+        self._poll_counts[device_name] = poll_count + 1
+        cached_info = self._last_device_info.get(device_name)
+        if (
+            "device_info" in sources
+            and cached_info is not None
+            and poll_count % max(device_info_interval, 1) != 0
+        ):
+            sources.discard("device_info")
+
         try:
-            device = self.devices[device_name]
+            device = await self._get_device(device_name)
 
-            # Obter informações de energia
-            current_power = await device.get_current_power()
-            energy_usage = await device.get_energy_usage()
-            device_info = await device.get_device_info()
+            # Obter informações de energia (chamadas simultâneas)
+            calls = {
+                "current_power": device.get_current_power,
+                "energy_usage": device.get_energy_usage,
+                "device_info": device.get_device_info,
+            }
+            names = [name for name in calls if name in sources]
+            responses = dict(
+                zip(names, await asyncio.gather(*(calls[name]() for name in names)))
+            )
+
+            if "device_info" in responses:
+                self._last_device_info[device_name] = responses["device_info"]
+            device_info = responses.get("device_info", cached_info)
 
             # Converter para formato esperado
-            data = {
-                "timestamp": datetime.now(),
-                "power_watts": current_power.current_power / 1000.0,  # mW para W
-                "voltage": 127,  # Valor padrão Brasil (P110 não fornece)
-                "current": (
+            data = {"timestamp": datetime.now()}
+
+            if "current_power" in responses:
+                current_power = responses["current_power"]
+                data["power_watts"] = current_power.current_power / 1000.0  # mW para W
+                data["voltage"] = 127  # Valor padrão Brasil (P110 não fornece)
+                data["current"] = (
                     current_power.current_power / 127000.0
                     if current_power.current_power > 0
                     else 0
-                ),  # Estimativa
-                "energy_today_kwh": energy_usage.today_energy / 1000.0,  # Wh para kWh
-                "device_on": device_info.device_on,
-                "today_runtime": energy_usage.today_runtime,  # segundos ligado hoje
+                )  # Estimativa
+
+            if "energy_usage" in responses:
+                energy_usage = responses["energy_usage"]
+                # Wh para kWh; runtime em segundos ligado hoje
+                data["energy_today_kwh"] = energy_usage.today_energy / 1000.0
+                data["today_runtime"] = energy_usage.today_runtime
+
+            if "device_on" in fields and device_info is not None:
+                data["device_on"] = device_info.device_on
+
+            data = {
+                key: value
+                for key, value in data.items()
+                if key == "timestamp" or key in fields
             }
 
-            logger.debug(
-                f"📊 {device_name}: {data['power_watts']:.1f}W, {data['energy_today_kwh']:.3f}kWh hoje"
-            )
+            if "power_watts" in data and "energy_today_kwh" in data:
+                logger.debug(
+                    f"📊 {device_name}: {data['power_watts']:.1f}W, {data['energy_today_kwh']:.3f}kWh hoje"
+                )
 
             return data
 
@@ -117,12 +313,12 @@ class TapoClient:
 
     async def turn_on(self, device_name: str) -> bool:
         """Ligar dispositivo"""
-        if device_name not in self.devices:
+        if not self._has_device(device_name):
             logger.error(f"Dispositivo {device_name} não encontrado")
             return False
 
         try:
-            device = self.devices[device_name]
+            device = await self._get_device(device_name)
             await device.on()
             logger.info(f"✅ {device_name} ligado")
             return True
@@ -132,12 +328,12 @@ class TapoClient:
 
     async def turn_off(self, device_name: str) -> bool:
         """Desligar dispositivo"""
-        if device_name not in self.devices:
+        if not self._has_device(device_name):
             logger.error(f"Dispositivo {device_name} não encontrado")
             return False
 
         try:
-            device = self.devices[device_name]
+            device = await self._get_device(device_name)
             await device.off()
             logger.info(f"✅ {device_name} desligado")
             return True
@@ -147,12 +343,12 @@ class TapoClient:
 
     async def get_device_info(self, device_name: str) -> Optional[Dict]:
         """Obter informações do dispositivo"""
-        if device_name not in self.devices:
+        if not self._has_device(device_name):
             logger.error(f"Dispositivo {device_name} não encontrado")
             return None
 
         try:
-            device = self.devices[device_name]
+            device = await self._get_device(device_name)
             info = await device.get_device_info()
 
             return {
@@ -174,6 +370,53 @@ class TapoClient:
             logger.error(f"Erro ao obter info de {device_name}: {str(e)}")
             return None
 
+    async def get_energy_history(
+        self,
+        device_name: str,
+        interval: str,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+    ) -> Optional[List[Tuple[datetime, float]]]:
+        """
+        Obter o histórico de energia armazenado no próprio dispositivo
+
+        Args:
+            device_name: Nome do dispositivo
+            interval: "hourly" (``start_date`` a ``end_date``, inclusive,
+                no máximo 8 dias), "daily" (``start_date`` no início de um
+                trimestre) ou "monthly" (``start_date`` no início do ano)
+            start_date: Início do período pedido
+            end_date: Fim do período (apenas "hourly")
+
+        Returns:
+            Lista de (início do intervalo em UTC sem timezone, energia em Wh),
+            sem intervalos sem dado, ou None se falhar
+        """
+        if interval not in ENERGY_DATA_INTERVALS:
+            raise ValueError(f"Intervalo de histórico inválido: {interval}")
+        if not self._has_device(device_name):
+            logger.error(f"Dispositivo {device_name} não encontrado")
+            return None
+
+        try:
+            device = await self._get_device(device_name)
+            result = await device.get_energy_data(
+                ENERGY_DATA_INTERVALS[interval], start_date, end_date
+            )
+        except Exception as e:
+            logger.error(f"Erro ao obter histórico de {device_name}: {str(e)}")
+            return None
+
+        history = []
+        for entry in result.entries:
+            if entry.energy is None:
+                continue
+            start = entry.start_date_time
+            if start.tzinfo is not None:
+                start = start.astimezone(timezone.utc).replace(tzinfo=None)
+            history.append((start, float(entry.energy)))
+        return history
+
     async def test_connection(self, ip_address: str) -> bool:
         """Testar conexão com um dispositivo"""
         try:
@@ -185,43 +428,134 @@ class TapoClient:
             logger.debug(f"Falha ao conectar em {ip_address}: {str(e)}")
             return False
 
-    async def scan_network(self, network_prefix: str = "192.168.68") -> List[Dict]:
+    async def _probe_port(self, ip_address: str, port: int, timeout: float) -> bool:
+        """Verificar se o host aceita conexão TCP na porta (sem handshake Tapo)"""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, port), timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def _identify_device(self, ip_address: str) -> Optional[Dict]:
+        """Handshake Tapo em um host responsivo; None se não for um dispositivo TAPO"""
+        try:
+            client = await self._get_api_client()
+            device = await client.p110(ip_address)
+            info = await device.get_device_info()
+        except Exception as e:
+            logger.debug(f"Erro ao obter info de {ip_address}: {str(e)}")
+            return None
+
+        return {
+            "ip": ip_address,
+            "name": getattr(info, "nickname", f"TAPO-{info.mac[-6:]}"),
+            "model": info.model,
+            "mac": info.mac,
+            "device_on": info.device_on,
+        }
+
+    async def iter_network(
+        self,
+        network: str = "192.168.68",
+        port: int = 80,
+        probe_timeout: float = 0.5,
+        probe_concurrency: int = 256,
+        handshake_concurrency: int = 10,
+    ) -> AsyncIterator[Dict]:
+        """
+        Escanear a rede em duas etapas, entregando dispositivos assim que encontrados
+
+        Primeiro um teste TCP rápido e concorrente na porta HTTP de cada host;
+        o handshake Tapo (caro) só é feito nos hosts que responderam.
+
+        Args:
+            network: Faixa CIDR (ex: "192.168.0.0/22") ou prefixo /24 (ex: "192.168.1")
+            port: Porta usada no teste TCP
+            probe_timeout: Timeout do teste TCP por host, em segundos
+            probe_concurrency: Testes TCP simultâneos
+            handshake_concurrency: Handshakes Tapo simultâneos
+
+        Yields:
+            Dicionário com ip, name, model, mac e device_on de cada dispositivo
+        """
+        if "/" not in network:
+            network = f"{network}.0/24"
+        hosts = ipaddress.ip_network(network, strict=False).hosts()
+        logger.info(f"🔍 Escaneando rede {network}...")
+
+        responsive: asyncio.Queue = asyncio.Queue()
+        found: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def probe_worker():
+            # Todos os workers consomem o mesmo gerador de hosts
+            for host in hosts:
+                ip_address = str(host)
+                if await self._probe_port(ip_address, port, probe_timeout):
+                    await responsive.put(ip_address)
+
+        async def handshake_worker():
+            while True:
+                ip_address = await responsive.get()
+                if ip_address is done:
+                    break
+                device = await self._identify_device(ip_address)
+                if device:
+                    await found.put(device)
+
+        async def run():
+            handshakes = [
+                asyncio.create_task(handshake_worker())
+                for _ in range(max(handshake_concurrency, 1))
+            ]
+            try:
+                await asyncio.gather(
+                    *(probe_worker() for _ in range(max(probe_concurrency, 1)))
+                )
+                for _ in handshakes:
+                    await responsive.put(done)
+                await asyncio.gather(*handshakes)
+            finally:
+                for task in handshakes:
+                    task.cancel()
+                await found.put(done)
+
+        runner = asyncio.create_task(run())
+        count = 0
+        try:
+            while True:
+                device = await found.get()
+                if device is done:
+                    break
+                count += 1
+                logger.info(f"✅ Encontrado: {device['ip']} - {device['model']}")
+                yield device
+            await runner
+        finally:
+            runner.cancel()
+
+        logger.info(f"📡 Scan completo: {count} dispositivos encontrados")
+
+    async def scan_network(
+        self, network_prefix: str = "192.168.68", **scan_options
+    ) -> List[Dict]:
         """
         Escanear rede local para encontrar dispositivos TAPO
 
         Args:
-            network_prefix: Prefixo da rede (ex: "192.168.1")
+            network_prefix: Prefixo /24 (ex: "192.168.1") ou faixa CIDR
+            **scan_options: Repassados para ``iter_network``
 
         Returns:
             Lista de dispositivos encontrados
         """
-        logger.info(f"🔍 Escaneando rede {network_prefix}.0/24...")
-        devices_found = []
-
-        # Testar IPs de 1 a 254
-        for i in range(1, 255):
-            ip = f"{network_prefix}.{i}"
-
-            if await self.test_connection(ip):
-                try:
-                    client = await self._get_api_client()
-                    device = await client.p110(ip)
-                    info = await device.get_device_info()
-
-                    devices_found.append(
-                        {
-                            "ip": ip,
-                            "name": getattr(info, "nickname", f"TAPO-{info.mac[-6:]}"),
-                            "model": info.model,
-                            "mac": info.mac,
-                            "device_on": info.device_on,
-                        }
-                    )
-
-                    logger.info(f"✅ Encontrado: {ip} - {info.model}")
-
-                except Exception as e:
-                    logger.debug(f"Erro ao obter info de {ip}: {str(e)}")
-
-        logger.info(f"📡 Scan completo: {len(devices_found)} dispositivos encontrados")
-        return devices_found
+        return [
+            device async for device in self.iter_network(network_prefix, **scan_options)
+        ]
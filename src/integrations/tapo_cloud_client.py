@@ -10,16 +10,64 @@ import hashlib
 import time
 import uuid
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Sessões da Cloud por usuário: {username: (login_em, token, base_url, device_list)}
+_session_cache: Dict[str, Tuple[float, str, str, List[Dict]]] = {}
+
+
+class CloudRateLimiter:
+    """
+    Limitador de requisições à TP-Link Cloud
+
+    Controla quantas requisições ficam em andamento ao mesmo tempo e espaça
+    o início delas para respeitar ``requests_per_second``. Quando a Cloud
+    responde 429, ``back_off`` suspende novas requisições pelo tempo pedido.
+    """
+
+    def __init__(self, max_concurrency: int = 5, requests_per_second: float = 5.0):
+        self._semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        self._interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        now = time.monotonic()
+        start = max(now, self._next_slot, self._blocked_until)
+        self._next_slot = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._semaphore.release()
+
+    def back_off(self, seconds: float):
+        """Suspender novas requisições por ``seconds`` (ex.: Retry-After)"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
 
 class TapoCloudClient:
     """Cliente oficial para TP-Link Cloud API"""
 
-    def __init__(self, username: str, password: str):
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        max_concurrency: int = 5,
+        requests_per_second: float = 5.0,
+    ):
+        """
+        Args:
+            username: Email da conta TP-Link/Tapo
+            password: Senha da conta TP-Link/Tapo
+            max_concurrency: Requisições de informação simultâneas
+            requests_per_second: Taxa máxima de início de requisições
+        """
         self.username = username
         self.password = password
         self.token = None
@@ -27,6 +75,7 @@ class TapoCloudClient:
         self.base_url = "https://eu-wap.tplinkcloud.com"  # Default EU
         self.terminal_uuid = str(uuid.uuid4())
         self.session = None
+        self.rate_limiter = CloudRateLimiter(max_concurrency, requests_per_second)
 
     async def __aenter__(self):
         """Context manager entry"""
@@ -119,6 +168,34 @@ class TapoCloudClient:
             logger.error(f"Erro ao fazer login TP-Link Cloud: {str(e)}")
             return False
 
+    async def login_cached(self, ttl_seconds: float = 60.0) -> bool:
+        """
+        Fazer login reaproveitando a sessão recente do mesmo usuário
+
+        Dentro de ``ttl_seconds`` desde o último login, token, região e lista
+        de dispositivos são restaurados do cache sem nenhuma requisição.
+
+        Returns:
+            bool: True se houver sessão válida
+        """
+        cached = _session_cache.get(self.username)
+        if cached and time.monotonic() - cached[0] < ttl_seconds:
+            _, self.token, self.base_url, device_list = cached
+            self.device_list = list(device_list)
+            logger.debug("Sessão TP-Link Cloud reaproveitada do cache")
+            return True
+
+        if not await self.login():
+            return False
+
+        _session_cache[self.username] = (
+            time.monotonic(),
+            self.token,
+            self.base_url,
+            list(self.device_list),
+        )
+        return True
+
     async def refresh_device_list(self) -> bool:
         """
         Atualizar lista de dispositivos
@@ -173,12 +250,15 @@ class TapoCloudClient:
 
         return self.device_list
 
-    async def get_device_info(self, device_id: str) -> Optional[Dict]:
+    async def get_device_info(
+        self, device_id: str, max_retries: int = 2
+    ) -> Optional[Dict]:
         """
         Obter informações detalhadas do dispositivo
 
         Args:
             device_id: ID do dispositivo
+            max_retries: Novas tentativas quando a Cloud responder 429
 
         Returns:
             Dict: Informações do dispositivo
@@ -196,29 +276,64 @@ class TapoCloudClient:
 
             device_data = {"device_id": device_id}
 
-            async with self.session.post(
-                device_info_url, headers=headers, json=device_data, timeout=10
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
+            for attempt in range(max_retries + 1):
+                async with self.rate_limiter:
+                    async with self.session.post(
+                        device_info_url, headers=headers, json=device_data, timeout=10
+                    ) as response:
+                        if response.status == 429 and attempt < max_retries:
+                            retry_after = response.headers.get("Retry-After", "1")
+                            try:
+                                delay = float(retry_after)
+                            except ValueError:
+                                delay = 1.0
+                            logger.warning(
+                                f"Limite da TP-Link Cloud atingido, aguardando {delay:.0f}s"
+                            )
+                            self.rate_limiter.back_off(delay)
+                            continue
 
-                    if "result" in result and "responseData" in result["result"]:
-                        return result["result"]["responseData"]
-                    else:
-                        logger.error(
-                            f"Erro ao obter info do dispositivo {device_id}: {result}"
-                        )
-                        return None
-                else:
-                    logger.error(
-                        f"Erro HTTP ao obter info do dispositivo: {response.status}"
-                    )
-                    return None
+                        if response.status == 200:
+                            result = await response.json()
+
+                            if (
+                                "result" in result
+                                and "responseData" in result["result"]
+                            ):
+                                return result["result"]["responseData"]
+                            else:
+                                logger.error(
+                                    f"Erro ao obter info do dispositivo {device_id}: {result}"
+                                )
+                                return None
+                        else:
+                            logger.error(
+                                f"Erro HTTP ao obter info do dispositivo: {response.status}"
+                            )
+                            return None
 
         except Exception as e:
             logger.error(f"Erro ao obter informações do dispositivo: {str(e)}")
             return None
 
+    async def get_devices_info(self, device_ids: Iterable[str]) -> List[Optional[Dict]]:
+        """
+        Obter informações de vários dispositivos em paralelo
+
+        As requisições passam pelo ``rate_limiter`` do cliente.
+
+        Args:
+            device_ids: IDs dos dispositivos
+
+        Returns:
+            List: Informações de cada dispositivo, na mesma ordem (None se falhar)
+        """
+        return list(
+            await asyncio.gather(
+                *(self.get_device_info(device_id) for device_id in device_ids)
+            )
+        )
+
     async def get_energy_usage(self, device_id: str) -> Optional[Dict]:
         """
         Obter dados de consumo de energia
@@ -0,0 +1,194 @@
+"""
+Intervalo de coleta adaptativo por dispositivo
+Dispositivos com potência variando (ou perto do limiar de anomalia) são lidos
+com frequência; leituras estáveis ou de equipamentos desligados espaçam a
+coleta até o máximo do dispositivo
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.config import settings
+
+
+class PollState:
+    """Agenda de coleta de um dispositivo"""
+
+    __slots__ = ("interval", "next_due", "last_power")
+
+    def __init__(self, interval: float, next_due: float):
+        self.interval = interval
+        self.next_due = next_due
+        self.last_power: Optional[float] = None
+
+
+class AdaptivePollingScheduler:
+    """
+    Decide quando cada dispositivo deve ser lido novamente
+
+    Uma leitura que muda a potência em ``change_ratio`` (e pelo menos
+    ``change_watts``) ou que chega a ``alert_margin`` do limiar de anomalia
+    leva o dispositivo ao intervalo mínimo; cada leitura estável multiplica o
+    intervalo por ``backoff``, até o máximo. Os limites vêm das colunas
+    ``min_poll_seconds``/``max_poll_seconds`` do dispositivo ou das
+    configurações globais; o máximo global é também o teto dos limites por
+    dispositivo, para que toda hora tenha uma leitura gravada (o backfill
+    trata horas vazias como lacunas).
+    """
+
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        initial_interval: Optional[float] = None,
+        backoff: Optional[float] = None,
+        change_ratio: Optional[float] = None,
+        change_watts: Optional[float] = None,
+        alert_margin: Optional[float] = None,
+        tick_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            min_interval: Intervalo mínimo em segundos
+                (padrão: ``collector_min_interval_seconds``)
+            max_interval: Intervalo máximo em segundos
+            initial_interval: Intervalo antes da primeira leitura
+                (padrão: ``collection_interval_minutes``)
+            backoff: Multiplicador do intervalo a cada leitura estável
+            change_ratio: Variação relativa da potência que acelera a coleta
+            change_watts: Variação absoluta mínima (ignora ruído em standby)
+            alert_margin: Fração do limiar de anomalia que acelera a coleta
+            tick_seconds: Dispositivos devidos dentro deste prazo são lidos
+                junto com os já devidos (um lote por rodada)
+        """
+        self.min_interval = (
+            settings.collector_min_interval_seconds
+            if min_interval is None
+            else min_interval
+        )
+        self.max_interval = (
+            settings.collector_max_interval_seconds
+            if max_interval is None
+            else max_interval
+        )
+        self.initial_interval = (
+            settings.collection_interval_minutes * 60
+            if initial_interval is None
+            else initial_interval
+        )
+        self.backoff = (
+            settings.collector_interval_backoff if backoff is None else backoff
+        )
+        self.change_ratio = (
+            settings.collector_change_ratio if change_ratio is None else change_ratio
+        )
+        self.change_watts = (
+            settings.collector_change_watts if change_watts is None else change_watts
+        )
+        self.alert_margin = (
+            settings.collector_alert_margin if alert_margin is None else alert_margin
+        )
+        self.tick_seconds = (
+            settings.collector_poll_tick_seconds
+            if tick_seconds is None
+            else tick_seconds
+        )
+        self.states: Dict[int, PollState] = {}
+
+    def bounds(self, device: Dict) -> Tuple[float, float]:
+        """Intervalos mínimo e máximo de um dispositivo (até ``max_interval``)"""
+        high = min(
+            device.get("max_poll_seconds") or self.max_interval, self.max_interval
+        )
+        low = min(device.get("min_poll_seconds") or self.min_interval, high)
+        return low, high
+
+    def _state(self, device: Dict, now: float) -> PollState:
+        state = self.states.get(device["id"])
+        if state is None:
+            low, high = self.bounds(device)
+            interval = min(max(self.initial_interval, low), high)
+            state = self.states[device["id"]] = PollState(interval, now)
+        return state
+
+    def due(self, devices: List[Dict], now: Optional[float] = None) -> List[Dict]:
+        """
+        Dispositivos a ler nesta rodada
+
+        Os dispositivos retornados são reagendados para daqui a um intervalo
+        atual; ``observe`` corrige a agenda quando a leitura chega, e uma
+        leitura que falhar é tentada de novo no mesmo ritmo.
+        """
+        now = time.monotonic() if now is None else now
+        selected = []
+        for device in devices:
+            state = self._state(device, now)
+            if state.next_due <= now + self.tick_seconds:
+                state.next_due = now + state.interval
+                selected.append(device)
+        return selected
+
+    def seconds_until_due(
+        self, devices: List[Dict], now: Optional[float] = None
+    ) -> float:
+        """Tempo até o próximo dispositivo devido"""
+        now = time.monotonic() if now is None else now
+        next_due = min(
+            (self._state(device, now).next_due for device in devices),
+            default=now + self.initial_interval,
+        )
+        return max(next_due - now, 0.0)
+
+    def observe(
+        self,
+        device: Dict,
+        power_watts: float,
+        alert_level: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> float:
+        """
+        Ajustar o intervalo de um dispositivo com uma nova leitura
+
+        Args:
+            device: Linha do dispositivo
+            power_watts: Potência lida
+            alert_level: Potência que dispararia um alerta de anomalia
+            now: Relógio monotônico (padrão: ``time.monotonic()``)
+
+        Returns:
+            Novo intervalo em segundos
+        """
+        now = time.monotonic() if now is None else now
+        state = self._state(device, now)
+        low, high = self.bounds(device)
+        previous = state.last_power
+
+        near_alert = (
+            alert_level is not None and power_watts >= self.alert_margin * alert_level
+        )
+        changed = previous is not None and abs(power_watts - previous) >= max(
+            self.change_watts, self.change_ratio * max(previous, power_watts)
+        )
+        if near_alert or changed:
+            interval = low
+        elif previous is None:
+            interval = state.interval
+        else:
+            interval = state.interval * self.backoff
+
+        state.interval = min(max(interval, low), high)
+        state.next_due = now + state.interval
+        state.last_power = power_watts
+        return state.interval
+
+    def stats(self) -> Dict:
+        """Intervalo atual por dispositivo e leituras por hora previstas"""
+        return {
+            "interval_seconds": {
+                device_id: round(state.interval, 1)
+                for device_id, state in self.states.items()
+            },
+            "polls_per_hour": round(
+                sum(3600 / state.interval for state in self.states.values()), 1
+            ),
+        }
@@ -0,0 +1,154 @@
+"""
+Detecção de consumo anômalo em tempo real, leitura a leitura
+Mantém por dispositivo apenas média e variância exponenciais (EWMA), com
+memória constante e sem reprocessar o histórico
+"""
+
+import logging
+import math
+import time
+from typing import Dict, Optional
+
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceStats:
+    """Estatísticas móveis de potência de um dispositivo"""
+
+    __slots__ = ("mean", "variance", "samples", "last_alert_at")
+
+    def __init__(self):
+        self.mean = 0.0
+        self.variance = 0.0
+        self.samples = 0
+        self.last_alert_at: Optional[float] = None
+
+    def update(self, value: float, alpha: float):
+        """Incorporar uma amostra à média e à variância exponenciais"""
+        if self.samples == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.samples += 1
+
+
+class StreamingAnomalyDetector:
+    """
+    Detector online de picos de potência por dispositivo
+
+    Cada leitura é comparada com as estatísticas anteriores a ela e só então
+    incorporada. É anômala quando, ao mesmo tempo, passa de ``threshold``
+    vezes a média e fica ``min_zscore`` desvios acima dela; o segundo critério
+    evita alertas em equipamentos que normalmente alternam entre ligado e
+    desligado (geladeiras, ar-condicionado).
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        alpha: Optional[float] = None,
+        min_zscore: Optional[float] = None,
+        warmup_samples: Optional[int] = None,
+        min_power_watts: Optional[float] = None,
+        cooldown_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            threshold: Múltiplo da média considerado anômalo
+                (padrão: ``anomaly_threshold``)
+            alpha: Peso de cada nova leitura na média exponencial
+            min_zscore: Desvios-padrão mínimos acima da média
+            warmup_samples: Leituras antes de começar a alertar
+            min_power_watts: Potência mínima para alertar (ignora standby)
+            cooldown_seconds: Intervalo mínimo entre alertas do mesmo dispositivo
+        """
+        self.threshold = settings.anomaly_threshold if threshold is None else threshold
+        self.alpha = settings.anomaly_ewma_alpha if alpha is None else alpha
+        self.min_zscore = (
+            settings.anomaly_min_zscore if min_zscore is None else min_zscore
+        )
+        self.warmup_samples = (
+            settings.anomaly_warmup_samples
+            if warmup_samples is None
+            else warmup_samples
+        )
+        self.min_power_watts = (
+            settings.anomaly_min_power_watts
+            if min_power_watts is None
+            else min_power_watts
+        )
+        self.cooldown_seconds = (
+            settings.anomaly_alert_cooldown_seconds
+            if cooldown_seconds is None
+            else cooldown_seconds
+        )
+        self.stats: Dict[int, DeviceStats] = {}
+        self.alerts_raised = 0
+
+    def update(
+        self, device_id: int, power_watts: float, now: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        Processar uma leitura
+
+        Args:
+            device_id: ID do dispositivo
+            power_watts: Potência lida
+            now: Relógio monotônico (padrão: ``time.monotonic()``)
+
+        Returns:
+            Dados do alerta se a leitura for anômala, senão None
+        """
+        stats = self.stats.get(device_id)
+        if stats is None:
+            stats = self.stats[device_id] = DeviceStats()
+
+        alert = None
+        if stats.samples >= self.warmup_samples and power_watts >= self.min_power_watts:
+            mean = stats.mean
+            std = math.sqrt(stats.variance)
+            factor = power_watts / mean if mean > 0 else math.inf
+            zscore = (power_watts - mean) / std if std > 0 else math.inf
+            if factor >= self.threshold and zscore >= self.min_zscore:
+                now = time.monotonic() if now is None else now
+                if (
+                    stats.last_alert_at is None
+                    or now - stats.last_alert_at >= self.cooldown_seconds
+                ):
+                    stats.last_alert_at = now
+                    self.alerts_raised += 1
+                    alert = {
+                        "device_id": device_id,
+                        "current_consumption": power_watts,
+                        "average_consumption": round(mean, 2),
+                        "std_consumption": round(std, 2),
+                        "anomaly_factor": round(factor, 2),
+                        "zscore": round(zscore, 2),
+                        "threshold": self.threshold,
+                    }
+
+        stats.update(power_watts, self.alpha)
+        return alert
+
+    def alert_level(self, device_id: int) -> Optional[float]:
+        """Potência a partir da qual uma leitura seria anômala (None no aquecimento)"""
+        stats = self.stats.get(device_id)
+        if stats is None or stats.samples < self.warmup_samples:
+            return None
+        return max(self.threshold * stats.mean, self.min_power_watts)
+
+    def snapshot(self, device_id: int) -> Optional[Dict]:
+        """Estatísticas atuais de um dispositivo (ou None se nunca lido)"""
+        stats = self.stats.get(device_id)
+        if stats is None:
+            return None
+        return {
+            "mean_power_watts": round(stats.mean, 2),
+            "std_power_watts": round(math.sqrt(stats.variance), 2),
+            "samples": stats.samples,
+        }
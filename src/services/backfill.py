@@ -0,0 +1,349 @@
+"""
+Preenchimento de lacunas das leituras com o histórico das tomadas
+Horas sem nenhuma leitura do coletor (ciclos perdidos, quedas de rede) são
+completadas com o histórico horário que as tomadas TAPO guardam, consultado
+só nos intervalos de ociosidade da coleta
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.integrations.supabase_client import (
+    readings_filters,
+    rollup_filters,
+    supabase_client,
+)
+from src.services.history_import import day_start, history_rows
+from src.services.reading_buffer import BatchWriter
+from src.utils.config import settings
+from src.utils.timestamps import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Origem (data_source) das leituras preenchidas a partir do histórico
+SOURCE_BACKFILL = "tapo_backfill_hourly"
+
+
+def hour_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def default_max_row_gap_seconds() -> float:
+    """
+    Maior espaço normal entre duas linhas gravadas de um dispositivo
+
+    Com leituras estáveis, a banda morta grava uma linha no heartbeat, mas só
+    na primeira leitura depois dele, que pode vir até um intervalo máximo de
+    coleta (mais o atraso de um ciclo) mais tarde.
+    """
+    return (
+        settings.reading_heartbeat_seconds
+        + settings.collector_max_interval_seconds
+        + settings.collector_device_timeout_seconds
+    )
+
+
+def missing_hours(
+    present: Iterable[datetime], max_row_gap_seconds: float = 0.0
+) -> List[datetime]:
+    """
+    Horas sem leituras entre a primeira e a última hora com leituras
+
+    Só lacunas internas contam: antes da primeira leitura o dispositivo pode
+    não existir ainda, e depois da última o coletor pode estar parado (a
+    lacuna é preenchida quando as leituras voltarem). Uma sequência de ``n``
+    horas vazias só é lacuna se ``n`` horas passam de ``max_row_gap_seconds``:
+    abaixo disso, as linhas vizinhas podem estar apenas espaçadas pela banda
+    morta e pelo intervalo adaptativo.
+    """
+    present = set(present)
+    if not present:
+        return []
+    hour, last = min(present), max(present)
+    empty = []
+    while hour < last:
+        if hour not in present:
+            empty.append(hour)
+        hour += timedelta(hours=1)
+    return [
+        hour
+        for run in contiguous_runs(empty)
+        if len(run) * 3600 > max_row_gap_seconds
+        for hour in run
+    ]
+
+
+def contiguous_runs(hours: List[datetime]) -> List[List[datetime]]:
+    """Agrupar horas ordenadas em sequências consecutivas"""
+    runs: List[List[datetime]] = []
+    for hour in hours:
+        if runs and hour - runs[-1][-1] == timedelta(hours=1):
+            runs[-1].append(hour)
+        else:
+            runs.append([hour])
+    return runs
+
+
+class BackfillScheduler:
+    """
+    Detecta lacunas por dispositivo e as preenche com ``get_energy_data``
+
+    As lacunas são as horas sem bucket em ``energy_rollups`` (resolução 1h,
+    que conta as amostras de ``energy_readings``) em sequências mais longas
+    que o espaço normal entre linhas gravadas (``missing_hours``). Cada dia com lacunas custa
+    uma consulta ao dispositivo, e as consultas são espaçadas, limitadas por
+    rodada e suspensas enquanto um ciclo de coleta estiver em andamento:
+    uma consulta em curso quando o ciclo começa é cancelada e refeita depois.
+    """
+
+    def __init__(
+        self,
+        tapo_client,
+        writer: Optional[BatchWriter] = None,
+        supabase=None,
+        lookback_hours: Optional[float] = None,
+        settle_hours: Optional[float] = None,
+        request_interval_seconds: Optional[float] = None,
+        max_requests_per_run: Optional[int] = None,
+        max_row_gap_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            tapo_client: ``TapoClient`` com os dispositivos já adicionados
+            writer: Gravação em lote das linhas (padrão: upsert no Supabase)
+            supabase: Cliente Supabase assíncrono (padrão: instância global)
+            lookback_hours: Janela verificada (padrão: ``backfill_lookback_hours``)
+            settle_hours: Horas recentes ignoradas, ainda sem agregados completos
+            request_interval_seconds: Intervalo mínimo entre consultas
+            max_requests_per_run: Consultas aos dispositivos por rodada
+            max_row_gap_seconds: Maior espaço normal entre linhas gravadas
+                (padrão: ``default_max_row_gap_seconds``)
+        """
+        self.tapo_client = tapo_client
+        self.supabase = supabase or supabase_client
+        self.writer = writer or self.supabase.upsert_energy_readings
+        self.lookback_hours = (
+            settings.backfill_lookback_hours
+            if lookback_hours is None
+            else lookback_hours
+        )
+        self.settle_hours = (
+            settings.backfill_settle_hours if settle_hours is None else settle_hours
+        )
+        self.request_interval_seconds = (
+            settings.backfill_request_interval_seconds
+            if request_interval_seconds is None
+            else request_interval_seconds
+        )
+        self.max_requests_per_run = (
+            settings.backfill_max_requests_per_run
+            if max_requests_per_run is None
+            else max_requests_per_run
+        )
+
+        self.max_row_gap_seconds = (
+            default_max_row_gap_seconds()
+            if max_row_gap_seconds is None
+            else max_row_gap_seconds
+        )
+
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._request: Optional[asyncio.Future] = None
+        self._next_request_at = 0.0
+        # Horas que o dispositivo também não tem no histórico
+        self._unfillable: Set[Tuple[int, datetime]] = set()
+
+        self.requests = 0
+        self.preempted = 0
+        self.rows_filled = 0
+
+    @asynccontextmanager
+    async def live_polling(self):
+        """Ciclo de coleta em andamento: suspende as consultas de histórico"""
+        self._idle.clear()
+        if self._request is not None and not self._request.done():
+            self._request.cancel()
+        try:
+            yield
+        finally:
+            self._idle.set()
+
+    async def find_gaps(
+        self, device_id: int, since: datetime, until: datetime
+    ) -> List[datetime]:
+        """Horas sem leituras de um dispositivo em [since, until)"""
+        buckets = await self.supabase.select_all(
+            "energy_rollups",
+            rollup_filters("1h", device_id, since, until),
+            columns=["bucket_start"],
+            order="bucket_start.asc",
+            raise_errors=True,
+        )
+        present = [parse_timestamp(b["bucket_start"]) for b in buckets]
+        return [
+            hour
+            for hour in missing_hours(present, self.max_row_gap_seconds)
+            if (device_id, hour) not in self._unfillable
+        ]
+
+    async def _energy_before(self, device_id: int, hour: datetime) -> float:
+        """Energia do dia acumulada até ``hour``, pela última leitura anterior"""
+        if hour == day_start(hour):
+            return 0.0
+        rows = await self.supabase.select(
+            "energy_readings",
+            readings_filters(device_id, until=hour),
+            columns=["timestamp", "energy_today_kwh"],
+            order="timestamp.desc",
+            limit=1,
+            raise_errors=True,
+        )
+        if not rows:
+            return 0.0
+        previous = parse_timestamp(rows[0]["timestamp"])
+        if day_start(previous) != day_start(hour):
+            return 0.0
+        return float(rows[0].get("energy_today_kwh") or 0.0)
+
+    async def _request_history(
+        self, device_name: str, day: datetime
+    ) -> Optional[List[Tuple[datetime, float]]]:
+        """
+        Histórico horário de um dia, fora dos ciclos de coleta
+
+        Returns:
+            Entradas do dia ou None se a consulta falhar
+        """
+        while True:
+            await self._idle.wait()
+            delay = self._next_request_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue  # Um ciclo pode ter começado durante a espera
+
+            request = asyncio.ensure_future(
+                asyncio.wait_for(
+                    self.tapo_client.get_energy_history(
+                        device_name, "hourly", day, day
+                    ),
+                    timeout=settings.collector_device_timeout_seconds,
+                )
+            )
+            self._request = request
+            try:
+                await asyncio.wait({request})
+            finally:
+                request.cancel()
+                self._request = None
+                self._next_request_at = time.monotonic() + self.request_interval_seconds
+
+            if request.cancelled():
+                self.preempted += 1
+                continue
+
+            self.requests += 1
+            try:
+                return request.result()
+            except asyncio.TimeoutError:
+                logger.warning(f"⏱️ Timeout ao buscar histórico de {device_name}")
+            except Exception as e:
+                logger.error(f"Erro ao buscar histórico de {device_name}: {str(e)}")
+            return None
+
+    async def _fill_day(
+        self, device: Dict, day: datetime, hours: List[datetime]
+    ) -> Optional[int]:
+        """
+        Preencher as lacunas de um dia com uma consulta ao dispositivo
+
+        Returns:
+            Linhas gravadas ou None se o histórico não foi obtido
+        """
+        device_id = device["id"]
+        entries = await self._request_history(device["name"], day)
+        if entries is None:
+            return None
+
+        energy = {hour_start(start): wh for start, wh in entries}
+        rows = []
+        for run in contiguous_runs(hours):
+            self._unfillable.update((device_id, h) for h in run if h not in energy)
+            available = [(h, energy[h]) for h in run if h in energy]
+            if not available:
+                continue
+            # Continuar o acumulado do dia a partir da leitura anterior à
+            # lacuna, para que energy_daily e os agregados não saltem
+            rows += history_rows(
+                device_id,
+                available,
+                "hourly",
+                source=SOURCE_BACKFILL,
+                start_kwh=await self._energy_before(device_id, run[0]),
+            )
+
+        if not rows:
+            return 0
+        filled = sum(bool(ok) for ok in await self.writer(rows))
+        self.rows_filled += filled
+        return filled
+
+    async def run_once(self, devices: List[Dict]) -> Dict[str, int]:
+        """
+        Verificar e preencher as lacunas recentes dos dispositivos TAPO
+
+        Returns:
+            {nome do dispositivo: horas preenchidas} (só os com lacunas)
+        """
+        now = datetime.utcnow()
+        since = hour_start(now - timedelta(hours=self.lookback_hours))
+        until = hour_start(now - timedelta(hours=self.settle_hours))
+        budget = self.max_requests_per_run
+        results: Dict[str, int] = {}
+
+        for device in devices:
+            if device.get("type", "").upper() != "TAPO" or not device.get("name"):
+                continue
+            try:
+                gaps = await self.find_gaps(device["id"], since, until)
+            except Exception as e:
+                logger.error(f"Erro ao verificar lacunas de {device['name']}: {e}")
+                continue
+
+            days: Dict[datetime, List[datetime]] = {}
+            for hour in gaps:
+                days.setdefault(day_start(hour), []).append(hour)
+
+            for day, hours in sorted(days.items()):
+                if budget <= 0:
+                    logger.info("Limite de consultas de backfill atingido na rodada")
+                    return results
+                budget -= 1
+                try:
+                    filled = await self._fill_day(device, day, hours)
+                except Exception as e:
+                    logger.error(
+                        f"Erro ao preencher lacunas de {device['name']} "
+                        f"em {day:%Y-%m-%d}: {str(e)}"
+                    )
+                    continue
+                if filled:
+                    results[device["name"]] = results.get(device["name"], 0) + filled
+                    logger.info(
+                        f"🧩 {device['name']}: {filled} hora(s) preenchida(s) "
+                        f"em {day:%Y-%m-%d}"
+                    )
+
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "preempted": self.preempted,
+            "rows_filled": self.rows_filled,
+            "unfillable_hours": len(self._unfillable),
+        }
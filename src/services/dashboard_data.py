@@ -0,0 +1,358 @@
+"""
+Camada de dados do dashboard Streamlit
+Mantém em memória dispositivos, agregados e leituras recentes, atualizados
+de forma incremental por uma thread em background: as interações do usuário
+(reruns do Streamlit) leem do cache sem consultar o Supabase
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.integrations.supabase_client import (
+    SupabaseError,
+    SupabaseSyncClient,
+    readings_filters,
+    rollup_filters,
+)
+from src.services.rollups import bucket_start, choose_resolution
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def rows_frame(rows: List[Dict], time_column: str) -> pd.DataFrame:
+    """DataFrame de linhas do Supabase com ``time_column`` em UTC sem timezone"""
+    frame = pd.DataFrame.from_records(rows)
+    if frame.empty:
+        return pd.DataFrame(columns=[time_column]).astype(
+            {time_column: "datetime64[ns]"}
+        )
+    frame[time_column] = pd.to_datetime(
+        frame[time_column], utc=True, errors="coerce", format="ISO8601"
+    ).dt.tz_localize(None)
+    return frame.dropna(subset=[time_column])
+
+
+def append_since(
+    previous: Optional[pd.DataFrame],
+    fetch: Callable[[datetime], List[Dict]],
+    time_column: str,
+    key_columns: Sequence[str],
+    window_start: datetime,
+) -> pd.DataFrame:
+    """
+    Atualizar um DataFrame em cache buscando só as linhas novas
+
+    Busca a partir do maior ``time_column`` já em cache (inclusive, para
+    pegar linhas que ainda estavam sendo atualizadas, como o bucket corrente
+    de um agregado), substitui as linhas repetidas pela versão nova e
+    descarta o que saiu da janela.
+
+    Args:
+        previous: DataFrame em cache (None para carga completa)
+        fetch: Consulta das linhas com ``time_column`` >= o horário recebido
+        time_column: Coluna de horário
+        key_columns: Colunas que identificam uma linha
+        window_start: Início da janela mantida em cache
+
+    Returns:
+        Novo DataFrame, ordenado por ``time_column``
+    """
+    since = window_start
+    if previous is not None and not previous.empty:
+        since = max(window_start, previous[time_column].max())
+
+    new = rows_frame(fetch(since), time_column)
+    if previous is None or previous.empty:
+        frame = new
+    elif new.empty:
+        frame = previous
+    else:
+        frame = pd.concat([previous, new], ignore_index=True).drop_duplicates(
+            list(key_columns), keep="last"
+        )
+    frame = frame[frame[time_column] >= window_start]
+    return frame.sort_values(time_column, kind="stable").reset_index(drop=True)
+
+
+class CachedDataset:
+    """
+    Valor carregado por ``loader`` e reaproveitado por ``ttl`` segundos
+
+    O ``loader`` recebe o valor anterior (ou None a cada ``full_reload_seconds``)
+    para poder atualizar de forma incremental. Se a atualização falhar, o
+    último valor obtido continua sendo servido.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Any], Any],
+        ttl: float,
+        full_reload_seconds: Optional[float] = None,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.full_reload_seconds = full_reload_seconds
+        self.value: Any = None
+        self.loaded_at: Optional[float] = None
+        self.full_loaded_at: Optional[float] = None
+        self.last_access = time.monotonic()
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self, at: Optional[float] = None) -> bool:
+        at = time.monotonic() if at is None else at
+        return self.loaded_at is not None and at - self.loaded_at < self.ttl
+
+    def get(self) -> Any:
+        """Valor em cache, recarregado se expirado"""
+        self.last_access = time.monotonic()
+        if self.is_fresh():
+            return self.value
+        return self.refresh(force=False)
+
+    def refresh(self, force: bool = True) -> Any:
+        """
+        Recarregar o valor
+
+        Raises:
+            SupabaseError: Se a consulta falhar e ainda não houver valor em cache
+        """
+        with self._lock:
+            # Outra thread pode ter atualizado enquanto esperávamos o lock
+            if not force and self.is_fresh():
+                return self.value
+
+            now = time.monotonic()
+            full = self.value is None or (
+                self.full_reload_seconds is not None
+                and now - self.full_loaded_at >= self.full_reload_seconds
+            )
+            try:
+                value = self.loader(None if full else self.value)
+            except SupabaseError as e:
+                self.error = str(e)
+                if self.value is None:
+                    raise
+                logger.warning(f"Usando dados em cache do dashboard: {str(e)}")
+                return self.value
+
+            self.value = value
+            self.loaded_at = now
+            if full:
+                self.full_loaded_at = now
+            self.error = None
+            return value
+
+
+class DashboardDataStore:
+    """
+    Dados do dashboard compartilhados por todas as sessões do Streamlit
+
+    Cada conjunto de dados é criado no primeiro acesso. Enquanto for acessado
+    com frequência, a thread de ``start()`` o atualiza antes de expirar, e os
+    reruns nunca esperam pela rede.
+    """
+
+    def __init__(
+        self,
+        client: SupabaseSyncClient,
+        refresh_interval_seconds: Optional[float] = None,
+        devices_ttl_seconds: Optional[float] = None,
+        readings_window_hours: Optional[float] = None,
+        idle_seconds: Optional[float] = None,
+        full_reload_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            client: Cliente Supabase síncrono
+            refresh_interval_seconds: TTL das leituras e agregados e intervalo
+                da thread de atualização (padrão: ``dashboard_refresh_interval_seconds``)
+            devices_ttl_seconds: TTL da lista de dispositivos
+            readings_window_hours: Janela de leituras brutas mantida em memória
+            idle_seconds: Sem acesso por este tempo, o conjunto para de ser
+                atualizado em background
+            full_reload_seconds: Intervalo entre recargas completas dos dados
+                incrementais (cobre leituras gravadas fora de ordem, ex.: spool)
+        """
+        self.client = client
+        self.refresh_interval_seconds = (
+            settings.dashboard_refresh_interval_seconds
+            if refresh_interval_seconds is None
+            else refresh_interval_seconds
+        )
+        self.devices_ttl_seconds = (
+            settings.dashboard_devices_ttl_seconds
+            if devices_ttl_seconds is None
+            else devices_ttl_seconds
+        )
+        self.readings_window = timedelta(
+            hours=(
+                settings.dashboard_readings_window_hours
+                if readings_window_hours is None
+                else readings_window_hours
+            )
+        )
+        self.idle_seconds = (
+            settings.dashboard_idle_seconds if idle_seconds is None else idle_seconds
+        )
+        self.full_reload_seconds = (
+            settings.dashboard_full_reload_seconds
+            if full_reload_seconds is None
+            else full_reload_seconds
+        )
+        self._datasets: Dict[str, CachedDataset] = {}
+        self._datasets_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _dataset(
+        self, name: str, loader: Callable[[Any], Any], ttl: float, **kwargs
+    ) -> CachedDataset:
+        with self._datasets_lock:
+            dataset = self._datasets.get(name)
+            if dataset is None:
+                dataset = self._datasets[name] = CachedDataset(loader, ttl, **kwargs)
+            return dataset
+
+    def devices(self) -> List[Dict]:
+        """Linhas da tabela ``devices``"""
+        return self._dataset(
+            "devices",
+            lambda _: self.client.select("devices", raise_errors=True),
+            self.devices_ttl_seconds,
+        ).get()
+
+    def latest_daily(self) -> List[Dict]:
+        """Dia mais recente de cada dispositivo (view ``energy_daily_latest``)"""
+        return self._dataset(
+            "latest_daily",
+            lambda _: self.client.get_latest_daily(raise_errors=True),
+            self.refresh_interval_seconds,
+        ).get()
+
+    def recent_readings(self) -> pd.DataFrame:
+        """Leituras brutas da janela ``dashboard_readings_window_hours``"""
+
+        def load(previous: Optional[pd.DataFrame]) -> pd.DataFrame:
+            return append_since(
+                previous,
+                lambda since: self.client.select_all(
+                    "energy_readings",
+                    readings_filters(since=since),
+                    order="timestamp.asc,id.asc",
+                    raise_errors=True,
+                ),
+                "timestamp",
+                ["id"],
+                datetime.utcnow() - self.readings_window,
+            )
+
+        return self._dataset(
+            "readings",
+            load,
+            self.refresh_interval_seconds,
+            full_reload_seconds=self.full_reload_seconds,
+        ).get()
+
+    def rollup_history(
+        self, days: int, min_points: Optional[int] = None
+    ) -> Tuple[str, pd.DataFrame]:
+        """
+        Histórico de ``energy_rollups`` dos últimos ``days`` dias
+
+        Args:
+            days: Tamanho da janela
+            min_points: Buckets mínimos na janela ao escolher a resolução
+                (ver ``choose_resolution``)
+
+        Returns:
+            (resolução escolhida, buckets ordenados por ``bucket_start``)
+        """
+        until = datetime.utcnow()
+        resolution = choose_resolution(
+            until - timedelta(days=days), until, min_points=min_points
+        )
+
+        def load(previous: Optional[pd.DataFrame]) -> pd.DataFrame:
+            window_start = bucket_start(
+                resolution, datetime.utcnow() - timedelta(days=days)
+            )
+            return append_since(
+                previous,
+                lambda since: self.client.select_all(
+                    "energy_rollups",
+                    rollup_filters(resolution, since=since),
+                    order="bucket_start.asc,device_id.asc",
+                    raise_errors=True,
+                ),
+                "bucket_start",
+                ["device_id", "bucket_start"],
+                window_start,
+            )
+
+        frame = self._dataset(
+            f"rollups:{resolution}:{days}",
+            load,
+            self.refresh_interval_seconds,
+            full_reload_seconds=self.full_reload_seconds,
+        ).get()
+        return resolution, frame
+
+    def refresh_due(self):
+        """Atualizar os conjuntos em uso que expirariam antes da próxima rodada"""
+        now = time.monotonic()
+        with self._datasets_lock:
+            datasets = list(self._datasets.items())
+        for name, dataset in datasets:
+            if now - dataset.last_access > self.idle_seconds:
+                continue
+            if dataset.is_fresh(now + self.refresh_interval_seconds):
+                continue
+            try:
+                dataset.refresh()
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar dados do dashboard ({name}): {e}")
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval_seconds):
+            self.refresh_due()
+
+    def start(self) -> "DashboardDataStore":
+        """Iniciar a thread de atualização em background (idempotente)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="dashboard-data", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Parar a thread de atualização"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Dict]:
+        """Idade e último erro de cada conjunto de dados"""
+        now = time.monotonic()
+        with self._datasets_lock:
+            datasets = list(self._datasets.items())
+        return {
+            name: {
+                "age_seconds": (
+                    round(now - dataset.loaded_at, 1)
+                    if dataset.loaded_at is not None
+                    else None
+                ),
+                "error": dataset.error,
+            }
+            for name, dataset in datasets
+        }
@@ -0,0 +1,135 @@
+"""
+Serviço de descoberta de dispositivos TAPO na rede local
+Varre sub-redes em paralelo e mantém os resultados em cache com TTL
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from src.integrations.tapo_client import TapoClient
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceDiscoveryService:
+    """
+    Descoberta de dispositivos TAPO por varredura de sub-redes
+
+    Cada sub-rede é varrida por ``TapoClient.iter_network`` e os dispositivos
+    são entregues assim que respondem. O resultado completo de uma sub-rede
+    fica em cache por ``cache_ttl_seconds``; varreduras simultâneas da mesma
+    sub-rede aguardam a primeira e reaproveitam o cache.
+    """
+
+    def __init__(
+        self,
+        tapo_client: Optional[TapoClient] = None,
+        subnets: Optional[List[str]] = None,
+        cache_ttl_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            tapo_client: Cliente usado nos handshakes (padrão: credenciais do .env)
+            subnets: Sub-redes varridas por padrão (CIDR ou prefixo /24)
+            cache_ttl_seconds: Validade do resultado de uma sub-rede
+        """
+        self.tapo_client = tapo_client or TapoClient(
+            username=settings.tapo_username, password=settings.tapo_password
+        )
+        self.subnets = subnets or settings.discovery_subnets
+        self.cache_ttl_seconds = (
+            settings.discovery_cache_ttl_seconds
+            if cache_ttl_seconds is None
+            else cache_ttl_seconds
+        )
+        self._cache: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _cached(self, subnet: str) -> Optional[List[Dict]]:
+        """Dispositivos em cache ainda válidos para a sub-rede"""
+        entry = self._cache.get(subnet)
+        if not entry:
+            return None
+        scanned_at, devices = entry
+        if time.time() - scanned_at >= self.cache_ttl_seconds:
+            return None
+        return devices
+
+    def clear_cache(self):
+        """Descartar resultados de varreduras anteriores"""
+        self._cache.clear()
+
+    async def _scan_subnet(self, subnet: str, refresh: bool) -> AsyncIterator[Dict]:
+        """Varrer uma sub-rede (ou servir o cache), entregando cada dispositivo"""
+        lock = self._locks.setdefault(subnet, asyncio.Lock())
+        async with lock:
+            cached = None if refresh else self._cached(subnet)
+            if cached is not None:
+                logger.debug(f"Descoberta em {subnet} servida do cache")
+                for device in cached:
+                    yield device
+                return
+
+            devices = []
+            async for device in self.tapo_client.iter_network(
+                subnet,
+                probe_timeout=settings.discovery_probe_timeout_seconds,
+                probe_concurrency=settings.discovery_probe_concurrency,
+                handshake_concurrency=settings.discovery_handshake_concurrency,
+            ):
+                devices.append(device)
+                yield device
+
+            # Só chega aqui se a varredura terminou (cliente não desconectou)
+            self._cache[subnet] = (time.time(), devices)
+
+    async def discover(
+        self, subnets: Optional[Iterable[str]] = None, refresh: bool = False
+    ) -> AsyncIterator[Dict]:
+        """
+        Descobrir dispositivos em várias sub-redes ao mesmo tempo
+
+        Args:
+            subnets: Sub-redes a varrer (padrão: ``discovery_subnets``)
+            refresh: Ignorar o cache e varrer novamente
+
+        Yields:
+            Dicionário com ip, name, model, mac, device_on e subnet
+        """
+        subnets = list(dict.fromkeys(subnets or self.subnets))
+        found: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def scan(subnet: str):
+            try:
+                async for device in self._scan_subnet(subnet, refresh):
+                    await found.put({**device, "subnet": subnet})
+            except ValueError as e:
+                logger.warning(f"Sub-rede inválida ignorada ({subnet}): {str(e)}")
+            finally:
+                await found.put(done)
+
+        tasks = [asyncio.create_task(scan(subnet)) for subnet in subnets]
+        seen = set()
+        pending = len(tasks)
+        try:
+            while pending:
+                device = await found.get()
+                if device is done:
+                    pending -= 1
+                    continue
+                # Sub-redes sobrepostas podem encontrar o mesmo IP
+                if device["ip"] in seen:
+                    continue
+                seen.add(device["ip"])
+                yield device
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# Instância global do serviço
+device_discovery_service = DeviceDiscoveryService()
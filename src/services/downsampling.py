@@ -0,0 +1,85 @@
+"""
+Redução de pontos de séries temporais para gráficos
+Mantém no máximo dois pontos (mínimo e máximo) por coluna de pixels, de modo
+que picos e vales continuem visíveis com payloads pequenos
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import settings
+
+
+def chart_buckets(width_px: Optional[int] = None) -> int:
+    """
+    Número de intervalos de tempo de um gráfico com ``width_px`` pixels
+
+    Cada intervalo contribui com até dois pontos (mínimo e máximo), então a
+    série desenhada fica com no máximo ``width_px`` pontos.
+    """
+    width_px = settings.dashboard_chart_width_px if width_px is None else width_px
+    return max(width_px // 2, 1)
+
+
+def minmax_downsample(
+    frame: pd.DataFrame,
+    y: str,
+    x: str = "timestamp",
+    by: Optional[str] = None,
+    buckets: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Reduzir uma série (ou uma por grupo) a mínimo e máximo por intervalo
+
+    O eixo ``x`` de cada série é dividido em ``buckets`` intervalos iguais e
+    de cada um são mantidas as linhas com o menor e o maior ``y``, além da
+    primeira e da última da série. Séries que já cabem no orçamento são
+    devolvidas sem alteração.
+
+    Args:
+        frame: Dados do gráfico, com ``x`` datetime
+        y: Coluna do valor desenhado
+        x: Coluna do tempo
+        by: Coluna que separa as séries (ex.: dispositivo)
+        buckets: Intervalos por série (padrão: ``chart_buckets()``)
+
+    Returns:
+        Subconjunto das linhas de ``frame``, ordenado por ``x`` em cada série
+    """
+    buckets = chart_buckets() if buckets is None else buckets
+    if frame.empty:
+        return frame
+
+    groups = frame[by] if by else pd.Series(0, index=frame.index)
+    sizes = groups.map(groups.value_counts())
+    large = sizes > 2 * buckets
+    if not large.any():
+        return frame
+
+    data = frame.loc[large, [x, y]].copy()
+    data["_series"] = groups[large]
+    data[y] = pd.to_numeric(data[y], errors="coerce")
+    data = data.dropna(subset=[y])
+
+    # Posição relativa de cada ponto na própria série -> índice do intervalo
+    times = data[x].astype("int64")
+    by_series = times.groupby(data["_series"])
+    start = by_series.transform("min")
+    span = (by_series.transform("max") - start).replace(0, 1)
+    data["_bucket"] = np.minimum(
+        ((times - start) / span * buckets).astype("int64"), buckets - 1
+    )
+
+    per_bucket = data.groupby(["_series", "_bucket"])[y]
+    per_series = data.groupby("_series")[x]
+    keep = (
+        pd.Index(per_bucket.idxmin())
+        .union(pd.Index(per_bucket.idxmax()))
+        .union(pd.Index(per_series.idxmin()))
+        .union(pd.Index(per_series.idxmax()))
+    )
+
+    kept = frame.index[~large].union(keep)
+    return frame.loc[frame.index.isin(kept)]
@@ -0,0 +1,134 @@
+"""
+Energia consumida a partir de amostras irregulares de potência e contadores
+Um único cálculo vetorizado (pandas/NumPy) para todos os tipos de dispositivo:
+usa o contador acumulado quando ele é confiável e integra ``power_watts``
+(regra do trapézio) nos demais casos, sem atravessar lacunas de coleta
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import settings
+
+# Origem da energia de cada intervalo
+SOURCE_COUNTER = "counter"
+SOURCE_POWER = "power"
+SOURCE_GAP = "gap"
+
+# Quedas menores que isto no contador são ruído de arredondamento, não reset
+COUNTER_RESET_TOLERANCE_KWH = 0.001
+
+
+def default_max_interpolation_seconds() -> float:
+    """Maior intervalo entre leituras integrado pela potência (configurado)"""
+    return settings.energy_max_interpolation_seconds or (
+        1.5 * settings.collector_max_interval_seconds
+    )
+
+
+def integrate_energy(
+    frame: pd.DataFrame,
+    max_interpolation_seconds: Optional[float] = None,
+    counter_column: str = "energy_today_kwh",
+) -> pd.DataFrame:
+    """
+    Calcular a energia de cada intervalo entre leituras consecutivas
+
+    Cada leitura fecha o intervalo iniciado na leitura anterior do mesmo
+    dispositivo. A energia do intervalo vem de:
+
+    - ``counter``: diferença do contador acumulado (``energy_today_kwh``),
+      quando as duas leituras o têm e ele não está parado em zero. Uma queda
+      do contador é um reset (meia-noite ou reinício da tomada): a energia é
+      o valor atual, acumulado desde o reset. O contador cobre também
+      intervalos longos, pois continua contando durante a lacuna.
+    - ``power``: trapézio sobre ``power_watts`` (tomadas que só informam a
+      potência, como ``cur_power`` da Tuya, ou contador ausente).
+    - ``gap``: intervalo sem contador maior que ``max_interpolation_seconds``;
+      a potência não é interpolada e a energia fica zerada.
+
+    Args:
+        frame: Leituras com ``device_id``, ``timestamp`` e ``power_watts``
+            (e opcionalmente a coluna do contador), ordenadas por dispositivo
+            e horário
+        max_interpolation_seconds: Maior intervalo integrado pela potência
+            (padrão: ``energy_max_interpolation_seconds`` ou 1,5 vez o
+            intervalo máximo de coleta, para que leituras espaçadas pelo
+            intervalo adaptativo não virem lacunas)
+        counter_column: Coluna com o contador acumulado em kWh
+
+    Returns:
+        Cópia do DataFrame com ``interval_hours``, ``energy_kwh``,
+        ``energy_source`` e ``gap_hours``
+    """
+    if max_interpolation_seconds is None:
+        max_interpolation_seconds = default_max_interpolation_seconds()
+
+    frame = frame.copy()
+    by_device = frame.groupby("device_id", sort=False)
+    seconds = by_device["timestamp"].diff().dt.total_seconds().to_numpy()
+    hours = np.nan_to_num(seconds) / 3600
+    first = np.isnan(seconds)
+
+    power = frame["power_watts"].to_numpy(dtype="float64")
+    previous_power = by_device["power_watts"].shift().to_numpy(dtype="float64")
+    power_energy = np.nan_to_num((power + previous_power) / 2 * hours / 1000)
+    gap = ~first & (seconds > max_interpolation_seconds)
+
+    if counter_column in frame.columns:
+        counter_series = pd.to_numeric(frame[counter_column], errors="coerce")
+        counter = counter_series.to_numpy(dtype="float64")
+        delta = counter - counter_series.groupby(
+            frame["device_id"], sort=False
+        ).shift().to_numpy(dtype="float64")
+        reset = delta < -COUNTER_RESET_TOLERANCE_KWH
+        counter_energy = np.where(reset, counter, np.maximum(delta, 0.0))
+        use_counter = ~np.isnan(delta) & (counter > 0)
+    else:
+        counter_energy = np.zeros(len(frame))
+        use_counter = np.zeros(len(frame), dtype=bool)
+
+    gap &= ~use_counter
+    frame["interval_hours"] = hours
+    frame["energy_kwh"] = np.select(
+        [use_counter, gap, first], [counter_energy, 0.0, 0.0], power_energy
+    )
+    frame["energy_source"] = np.select(
+        [use_counter, gap, first],
+        [SOURCE_COUNTER, SOURCE_GAP, None],
+        SOURCE_POWER,
+    )
+    frame["gap_hours"] = np.where(gap, hours, 0.0)
+    return frame
+
+
+def energy_by_period(frame: pd.DataFrame, freq: str = "1h") -> pd.DataFrame:
+    """
+    Energia por dispositivo e período a partir de ``integrate_energy``
+
+    A energia de cada intervalo é atribuída ao período da leitura que o fecha.
+
+    Args:
+        frame: Resultado de ``integrate_energy``
+        freq: Tamanho do período (alias do pandas, ex.: "15min", "1h", "1D")
+
+    Returns:
+        DataFrame indexado por (device_id, timestamp) com ``energy_kwh``,
+        ``gap_hours``, ``samples`` e ``coverage`` (fração do período coberta
+        por intervalos com energia conhecida)
+    """
+    periods = frame.groupby(["device_id", pd.Grouper(key="timestamp", freq=freq)]).agg(
+        energy_kwh=("energy_kwh", "sum"),
+        covered_hours=("interval_hours", "sum"),
+        gap_hours=("gap_hours", "sum"),
+        samples=("energy_kwh", "size"),
+    )
+    period_hours = pd.to_timedelta(
+        pd.tseries.frequencies.to_offset(freq)
+    ) / pd.Timedelta(hours=1)
+    periods["coverage"] = (
+        (periods["covered_hours"] - periods["gap_hours"]) / period_hours
+    ).clip(0, 1)
+    return periods.drop(columns="covered_hours")
@@ -1,37 +1,236 @@
 """
 Serviço de análise e processamento de dados de consumo de energia
-NOTA: Temporariamente simplificado durante migração para Supabase
+Cada análise carrega a janela de leituras uma única vez em um DataFrame e
+agrupa/reamostra de forma vetorizada (pandas/NumPy)
 """
 
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
+import numpy as np
+import pandas as pd
+
+from src.integrations.supabase_client import readings_filters, supabase_client
+from src.services.energy_integration import SOURCE_GAP, integrate_energy
+from src.services.live_status import entry_view, live_status
+from src.services.reading_deadband import expand_samples
 from src.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
+READING_COLUMNS = [
+    "device_id",
+    "timestamp",
+    "power_watts",
+    "energy_today_kwh",
+    "samples",
+]
+
+# Agregados por dispositivo (ou por dispositivo e período) sobre o DataFrame
+SUMMARY_AGGREGATIONS = {
+    "total_energy_kwh": ("energy_kwh", "sum"),
+    "average_power_watts": ("power_watts", "mean"),
+    "peak_power_watts": ("power_watts", "max"),
+    "min_power_watts": ("power_watts", "min"),
+    "runtime_hours": ("runtime_hours", "sum"),
+    "gap_hours": ("gap_hours", "sum"),
+    "readings_count": ("power_watts", "size"),
+}
+
+
+def readings_frame(rows: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Montar o DataFrame de leituras usado por todas as análises
+
+    Ordena por dispositivo e horário (UTC sem timezone), reconstrói as
+    leituras comprimidas pela banda morta (ver ``expand_samples``) e calcula,
+    para cada leitura, a energia do intervalo desde a leitura anterior do
+    mesmo dispositivo (ver ``integrate_energy``).
+
+    Args:
+        rows: Linhas de ``energy_readings``
+
+    Returns:
+        DataFrame com as colunas de ``READING_COLUMNS`` (exceto ``samples``)
+        mais as de ``integrate_energy`` e ``runtime_hours``
+    """
+    frame = pd.DataFrame.from_records(list(rows), columns=READING_COLUMNS)
+    frame["timestamp"] = pd.to_datetime(
+        frame["timestamp"], utc=True, errors="coerce", format="ISO8601"
+    ).dt.tz_localize(None)
+    frame["power_watts"] = pd.to_numeric(frame["power_watts"], errors="coerce")
+    frame["energy_today_kwh"] = pd.to_numeric(
+        frame["energy_today_kwh"], errors="coerce"
+    )
+    frame = frame.dropna(subset=["device_id", "timestamp", "power_watts"])
+    frame = frame.astype({"device_id": "int64", "power_watts": "float64"})
+    frame = frame.sort_values(["device_id", "timestamp"], ignore_index=True)
+
+    frame = integrate_energy(expand_samples(frame))
+    known = frame["energy_source"].notna() & (frame["energy_source"] != SOURCE_GAP)
+    frame["runtime_hours"] = np.where(
+        known & (frame["power_watts"] > 0), frame["interval_hours"], 0.0
+    )
+    return frame
+
+
+async def load_readings(
+    since: datetime, until: Optional[datetime] = None, device_id: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Carregar as leituras de uma janela (todas as páginas) em um DataFrame
 
-def get_device_weekly_consumption(device_id: int, weeks: int = 1) -> List[Dict]:
-    """Obter consumo semanal de um dispositivo - TEMPORARIAMENTE DESABILITADO"""
-    logger.warning(
-        "get_device_weekly_consumption temporariamente desabilitado durante migração"
+    Args:
+        since: Início da janela
+        until: Fim da janela (exclusivo; padrão: sem limite)
+        device_id: Restringir a um dispositivo
+    """
+    rows = await supabase_client.select_all(
+        "energy_readings",
+        readings_filters(device_id, since, until),
+        columns=READING_COLUMNS,
+        order="timestamp.asc,id.asc",
     )
-    return []
+    return readings_frame(rows)
+
+
+def summarize(frame: pd.DataFrame, by: Optional[List] = None) -> pd.DataFrame:
+    """
+    Agregar o DataFrame de leituras por dispositivo (e chaves extras)
+
+    Args:
+        frame: DataFrame de ``readings_frame``
+        by: Chaves adicionais de agrupamento (ex.: ``pd.Grouper`` por dia)
+
+    Returns:
+        DataFrame com as colunas de ``SUMMARY_AGGREGATIONS`` e ``total_cost``
+    """
+    summary = frame.groupby(["device_id"] + (by or [])).agg(**SUMMARY_AGGREGATIONS)
+    summary["total_cost"] = summary["total_energy_kwh"] * settings.energy_cost_per_kwh
+    return summary
 
 
-def get_device_monthly_stats(device_id: int) -> Dict:
-    """Obter estatísticas mensais de um dispositivo - TEMPORARIAMENTE DESABILITADO"""
-    logger.warning(
-        "get_device_monthly_stats temporariamente desabilitado durante migração"
+def daily_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Agregados por dispositivo e dia (dias sem leituras não aparecem)"""
+    return summarize(frame, [pd.Grouper(key="timestamp", freq="D")]).rename_axis(
+        ["device_id", "date"]
     )
-    return {}
 
 
-def get_devices_ranking(period_days: int = 30) -> List[Dict]:
-    """Obter ranking de dispositivos por consumo - TEMPORARIAMENTE DESABILITADO"""
-    logger.warning("get_devices_ranking temporariamente desabilitado durante migração")
-    return []
+def _records(summary: pd.DataFrame) -> List[Dict]:
+    """Converter agregados em dicionários JSON (datas ISO, valores arredondados)"""
+    records = summary.reset_index().round(
+        {
+            "total_energy_kwh": 3,
+            "total_cost": 2,
+            "average_power_watts": 2,
+            "peak_power_watts": 2,
+            "min_power_watts": 2,
+            "runtime_hours": 2,
+            "gap_hours": 2,
+        }
+    )
+    for column in records.select_dtypes(include="datetime").columns:
+        records[column] = records[column].dt.strftime("%Y-%m-%d")
+    return records.to_dict("records")
+
+
+def _day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def get_device_weekly_consumption(device_id: int, weeks: int = 1) -> List[Dict]:
+    """
+    Obter consumo semanal de um dispositivo
+
+    As semanas são blocos de 7 dias terminando hoje (a mais recente por último).
+
+    Returns:
+        Uma entrada por semana com os totais e o consumo de cada dia
+    """
+    today = _day_start(datetime.utcnow())
+    since = today - timedelta(days=weeks * 7 - 1)
+    frame = await load_readings(since, device_id=device_id)
+    if frame.empty:
+        return []
+
+    frame["week"] = (frame["timestamp"] - since) // pd.Timedelta(days=7)
+    weekly = summarize(frame, ["week"]).droplevel("device_id")
+    daily = daily_frame(frame).droplevel("device_id")
+
+    result = []
+    for week, totals in zip(weekly.index, _records(weekly)):
+        week_start = since + timedelta(days=7 * int(week))
+        days = daily.loc[week_start : week_start + timedelta(days=6)]
+        result.append(
+            {
+                **totals,
+                "week_start": week_start.strftime("%Y-%m-%d"),
+                "week_end": (week_start + timedelta(days=6)).strftime("%Y-%m-%d"),
+                "daily": _records(days),
+            }
+        )
+    return result
+
+
+async def get_device_monthly_stats(device_id: int) -> Dict:
+    """
+    Obter estatísticas do mês corrente de um dispositivo, com projeção para o
+    mês inteiro a partir da média diária
+    """
+    now = datetime.utcnow()
+    month_start = _day_start(now).replace(day=1)
+    frame = await load_readings(month_start, device_id=device_id)
+    if frame.empty:
+        return {}
+
+    totals = _records(summarize(frame))[0]
+    daily = daily_frame(frame).droplevel("device_id")
+    days_in_month = pd.Timestamp(month_start).days_in_month
+    average_daily = float(daily["total_energy_kwh"].mean())
+
+    return {
+        **totals,
+        "month": month_start.strftime("%Y-%m"),
+        "days_with_data": len(daily),
+        "average_daily_energy_kwh": round(average_daily, 3),
+        "max_daily_energy_kwh": round(float(daily["total_energy_kwh"].max()), 3),
+        "projected_energy_kwh": round(average_daily * days_in_month, 3),
+        "projected_cost": round(
+            average_daily * days_in_month * settings.energy_cost_per_kwh, 2
+        ),
+        "daily": _records(daily),
+    }
+
+
+async def get_devices_ranking(period_days: int = 30) -> List[Dict]:
+    """
+    Obter ranking de dispositivos por consumo no período
+
+    Returns:
+        Dispositivos do maior para o menor consumo, com a participação de cada
+        um no total
+    """
+    frame = await load_readings(datetime.utcnow() - timedelta(days=period_days))
+    if frame.empty:
+        return []
+
+    summary = summarize(frame).sort_values("total_energy_kwh", ascending=False)
+    total_energy = summary["total_energy_kwh"].sum()
+    summary["share_percent"] = (
+        summary["total_energy_kwh"] / total_energy * 100 if total_energy else 0.0
+    ).round(1)
+    summary["rank"] = np.arange(1, len(summary) + 1)
+
+    devices = {d["id"]: d for d in await supabase_client.get_devices(active_only=False)}
+    ranking = _records(summary)
+    for entry in ranking:
+        device = devices.get(entry["device_id"], {})
+        entry["device_name"] = device.get("name")
+        entry["location"] = device.get("location")
+    return ranking
 
 
 class EnergyAnalysisService:
@@ -40,54 +239,222 @@ class EnergyAnalysisService:
     def __init__(self):
         self.cost_per_kwh = settings.energy_cost_per_kwh
 
-    def calculate_daily_consumption(
+    async def calculate_daily_consumption(
         self, device_id: int, date: datetime
     ) -> Optional[Dict]:
-        """Calcular consumo diário de um dispositivo - TEMPORARIAMENTE DESABILITADO"""
-        logger.warning(
-            "calculate_daily_consumption temporariamente desabilitado durante migração"
-        )
-        return None
+        """
+        Calcular consumo diário de um dispositivo
+
+        Returns:
+            Totais do dia ou None se não houver leituras
+        """
+        day = _day_start(date)
+        frame = await load_readings(day, day + timedelta(days=1), device_id)
+        if frame.empty:
+            return None
+
+        return {**_records(summarize(frame))[0], "date": day.strftime("%Y-%m-%d")}
 
-    def detect_anomalies(
-        self, device_id: int, threshold: float = 1.5
+    async def detect_anomalies(
+        self,
+        device_id: int,
+        current_consumption: Optional[float] = None,
+        threshold: Optional[float] = None,
+        days: int = 7,
     ) -> Optional[Dict]:
-        """Detectar anomalias no consumo - TEMPORARIAMENTE DESABILITADO"""
-        logger.warning("detect_anomalies temporariamente desabilitado durante migração")
-        return None
-
-    def generate_daily_report(self, date: datetime = None) -> Dict:
-        """Gerar relatório diário - TEMPORARIAMENTE DESABILITADO"""
-        logger.warning(
-            "generate_daily_report temporariamente desabilitado durante migração"
+        """
+        Detectar consumo anômalo em relação à média dos últimos dias
+
+        Args:
+            device_id: ID do dispositivo
+            current_consumption: Potência atual em W (padrão: última leitura)
+            threshold: Múltiplo da média considerado anômalo
+                (padrão: ``anomaly_threshold``)
+            days: Janela da média histórica
+
+        Returns:
+            Descrição da anomalia ou None se o consumo estiver normal
+        """
+        threshold = settings.anomaly_threshold if threshold is None else threshold
+        frame = await load_readings(
+            datetime.utcnow() - timedelta(days=days), device_id=device_id
         )
-        if date is None:
-            date = datetime.utcnow()
+        if frame.empty:
+            return None
+
+        if current_consumption is None:
+            current_consumption = float(frame["power_watts"].iloc[-1])
+        average = float(frame["power_watts"].mean())
+        if average <= 0:
+            return None
+
+        factor = current_consumption / average
+        if factor < threshold:
+            return None
+
         return {
-            "date": date.strftime("%Y-%m-%d"),
-            "devices": [],
-            "total_consumption_kwh": 0.0,
-            "total_cost_brl": 0.0,
-            "message": "Relatório temporariamente desabilitado durante migração para Supabase",
+            "device_id": device_id,
+            "current_consumption": current_consumption,
+            "average_consumption": round(average, 2),
+            "anomaly_factor": round(factor, 2),
+            "threshold": threshold,
+            "description": (
+                f"Consumo anômalo: {current_consumption:.1f}W é {factor:.1f}x "
+                f"a média de {average:.1f}W dos últimos {days} dias"
+            ),
         }
 
-    def get_consumption_trends(self, device_id: int, days: int = 30) -> Optional[Dict]:
-        """Obter tendências de consumo - TEMPORARIAMENTE DESABILITADO"""
-        logger.warning(
-            "get_consumption_trends temporariamente desabilitado durante migração"
+    async def generate_daily_report(
+        self, date: datetime = None, history_days: int = 7
+    ) -> Dict:
+        """
+        Gerar relatório diário de todos os dispositivos ativos
+
+        O dia e os ``history_days`` anteriores são carregados juntos; um
+        dispositivo é anômalo quando a potência média do dia passa de
+        ``anomaly_threshold`` vezes a média do histórico.
+        """
+        day = _day_start(date or datetime.utcnow())
+        frame = await load_readings(
+            day - timedelta(days=history_days), day + timedelta(days=1)
         )
-        return None
+        devices = await supabase_client.get_devices()
+
+        is_today = frame["timestamp"] >= day
+        today = summarize(frame[is_today])
+        history_average = frame[~is_today].groupby("device_id")["power_watts"].mean()
+        factor = today["average_power_watts"] / history_average.reindex(today.index)
+        anomalous = factor[factor >= settings.anomaly_threshold]
+
+        summaries = {entry["device_id"]: entry for entry in _records(today)}
+        report_devices = []
+        anomalies = []
+        for device in devices:
+            summary = summaries.get(device["id"]) or {
+                "device_id": device["id"],
+                "total_energy_kwh": 0.0,
+                "total_cost": 0.0,
+                "average_power_watts": 0.0,
+                "peak_power_watts": 0.0,
+                "min_power_watts": 0.0,
+                "runtime_hours": 0.0,
+                "gap_hours": 0.0,
+                "readings_count": 0,
+            }
+            entry = {
+                **summary,
+                "device_name": device.get("name"),
+                "location": device.get("location"),
+                "equipment": device.get("equipment_connected"),
+            }
+            if device["id"] in anomalous.index:
+                average = float(history_average[device["id"]])
+                entry["anomaly"] = {
+                    "device_id": device["id"],
+                    "anomaly_factor": round(float(anomalous[device["id"]]), 2),
+                    "average_consumption": round(average, 2),
+                    "description": (
+                        f"{device.get('name')}: média de "
+                        f"{summary['average_power_watts']:.1f}W no dia, "
+                        f"{float(anomalous[device['id']]):.1f}x a média de "
+                        f"{average:.1f}W dos {history_days} dias anteriores"
+                    ),
+                }
+                anomalies.append(entry["anomaly"])
+            report_devices.append(entry)
 
-    def get_realtime_status(self) -> Dict:
-        """Obter status em tempo real - TEMPORARIAMENTE DESABILITADO"""
-        logger.warning(
-            "get_realtime_status temporariamente desabilitado durante migração"
+        total_energy = sum(d["total_energy_kwh"] for d in report_devices)
+        return {
+            "date": day,
+            "devices": report_devices,
+            "anomalies": anomalies,
+            "total_energy_kwh": round(total_energy, 3),
+            "total_cost": round(total_energy * self.cost_per_kwh, 2),
+        }
+
+    async def get_consumption_trends(
+        self, device_id: int, days: int = 30
+    ) -> Optional[Dict]:
+        """
+        Obter tendências de consumo de um dispositivo
+
+        A tendência é a inclinação da reta ajustada ao consumo diário,
+        expressa em kWh/dia e em percentual da média diária.
+
+        Returns:
+            Totais, série diária e tendência, ou None se não houver leituras
+        """
+        since = _day_start(datetime.utcnow()) - timedelta(days=days - 1)
+        frame = await load_readings(since, device_id=device_id)
+        if frame.empty:
+            return None
+
+        daily = (
+            daily_frame(frame)
+            .droplevel("device_id")
+            .reindex(pd.date_range(since, periods=days, freq="D"), fill_value=0)
+            .rename_axis("date")
         )
+        energy = daily["total_energy_kwh"].to_numpy()
+        average_daily = float(energy.mean())
+        slope = float(np.polyfit(np.arange(len(energy)), energy, 1)[0])
+        trend_percent = slope / average_daily * 100 if average_daily else 0.0
+        if abs(trend_percent) < 1:
+            trend = "stable"
+        else:
+            trend = "increasing" if slope > 0 else "decreasing"
+
+        total_energy = float(energy.sum())
+        return {
+            "device_id": device_id,
+            "days": days,
+            "total_energy_kwh": round(total_energy, 3),
+            "total_cost": round(total_energy * self.cost_per_kwh, 2),
+            "average_daily_energy_kwh": round(average_daily, 3),
+            "max_daily_energy_kwh": round(float(energy.max()), 3),
+            "min_daily_energy_kwh": round(float(energy.min()), 3),
+            "trend": trend,
+            "trend_kwh_per_day": round(slope, 4),
+            "trend_percent": round(trend_percent, 1),
+            "daily": _records(daily),
+        }
+
+    def get_realtime_status(self, stale_after_seconds: Optional[float] = None) -> Dict:
+        """
+        Status em tempo real a partir da última leitura publicada pelo coletor
+
+        Não consulta o Supabase: lê o snapshot em memória (``live_status``).
+        Leituras mais antigas que ``stale_after_seconds`` ficam marcadas como
+        desatualizadas e não entram no total de potência.
+
+        Args:
+            stale_after_seconds: Idade máxima de uma leitura atual
+                (padrão: ``realtime_stale_after_seconds`` ou duas vezes o
+                intervalo máximo de coleta)
+        """
+        if stale_after_seconds is None:
+            stale_after_seconds = settings.realtime_stale_after_seconds or (
+                2 * settings.collector_max_interval_seconds
+            )
+
+        now = time.monotonic()
+        devices = []
+        for entry in live_status.snapshot().values():
+            device = entry_view(entry)
+            age = now - entry["collected_monotonic"]
+            device["age_seconds"] = round(age, 1)
+            device["is_stale"] = age > stale_after_seconds
+            devices.append(device)
+
+        current = [device for device in devices if not device["is_stale"]]
         return {
             "timestamp": datetime.utcnow().isoformat(),
-            "devices": [],
-            "total_power_watts": 0.0,
-            "message": "Status temporariamente desabilitado durante migração para Supabase",
+            "devices": devices,
+            "total_current_power_watts": round(
+                sum(device["power_watts"] for device in current), 2
+            ),
+            "active_devices": sum(1 for device in current if device["power_watts"] > 0),
+            "stale_devices": len(devices) - len(current),
         }
 
 
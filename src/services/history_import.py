@@ -0,0 +1,354 @@
+"""
+Importação do histórico de energia armazenado nas tomadas TAPO
+Vários dispositivos em paralelo, gravação idempotente em lotes grandes e
+checkpoint por dispositivo para retomar importações interrompidas
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.integrations.supabase_client import supabase_client
+from src.services.reading_buffer import ReadingBuffer
+from src.utils.config import settings
+from src.utils.timestamps import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Origem (data_source) das leituras importadas, por intervalo do histórico
+SOURCE_HOURLY = "tapo_history_hourly"
+SOURCE_DAILY = "tapo_history_daily"
+HISTORY_SOURCES = {"hourly": SOURCE_HOURLY, "daily": SOURCE_DAILY}
+INTERVAL_HOURS = {"hourly": 1, "daily": 24}
+
+# Maior período aceito pelo dispositivo em uma consulta horária (inclusive)
+HOURLY_REQUEST_DAYS = 8
+
+
+def day_start(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def quarter_start(ts: datetime) -> datetime:
+    return day_start(ts).replace(month=(ts.month - 1) // 3 * 3 + 1, day=1)
+
+
+def next_quarter(ts: datetime) -> datetime:
+    start = quarter_start(ts)
+    if start.month == 10:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 3)
+
+
+def history_rows(
+    device_id: int,
+    entries: Iterable[Tuple[datetime, float]],
+    interval: str,
+    source: Optional[str] = None,
+    start_kwh: float = 0.0,
+) -> List[Dict]:
+    """
+    Converter entradas do histórico em linhas de ``energy_readings``
+
+    Cada linha fica no início do seu intervalo, com a potência média do
+    intervalo e, em ``energy_today_kwh``, a energia acumulada no dia até o
+    fim do intervalo (mesma semântica do contador lido pelo coletor, de modo
+    que ``integrate_energy`` trata as duas origens igual). ``energy_daily``
+    só usa essas linhas em dias sem nenhuma leitura ao vivo.
+
+    Args:
+        device_id: ID do dispositivo
+        entries: (início do intervalo, energia em Wh), em ordem cronológica
+        interval: "hourly" ou "daily"
+        source: ``data_source`` das linhas (padrão: origem do intervalo)
+        start_kwh: Energia já acumulada no dia da primeira entrada, antes dela
+    """
+    hours = INTERVAL_HOURS[interval]
+    source = source or HISTORY_SOURCES[interval]
+    rows = []
+    day = None
+    accumulated_wh = 0.0
+    for start, energy_wh in entries:
+        if day is None:
+            day, accumulated_wh = day_start(start), start_kwh * 1000.0
+        elif day_start(start) != day:
+            day, accumulated_wh = day_start(start), 0.0
+        accumulated_wh += energy_wh
+        rows.append(
+            {
+                "device_id": device_id,
+                "timestamp": start.isoformat(),
+                "power_watts": round(energy_wh / hours, 3),
+                "energy_today_kwh": round(accumulated_wh / 1000.0, 6),
+                "data_source": source,
+            }
+        )
+    return rows
+
+
+def history_windows(
+    interval: str, start: datetime, end: datetime
+) -> Iterator[Tuple[datetime, Optional[datetime], datetime, datetime]]:
+    """
+    Dividir [start, end) nas consultas aceitas pelo dispositivo
+
+    Yields:
+        (início pedido, fim pedido ou None, início e fim da janela importada)
+    """
+    cursor = start
+    while cursor < end:
+        if interval == "hourly":
+            window_end = min(cursor + timedelta(days=HOURLY_REQUEST_DAYS), end)
+            last_day = day_start(window_end - timedelta(microseconds=1))
+            yield cursor, last_day, cursor, window_end
+        else:
+            window_end = min(next_quarter(cursor), end)
+            yield quarter_start(cursor), None, cursor, window_end
+        cursor = window_end
+
+
+class ImportCheckpoints:
+    """Até onde o histórico de cada dispositivo já foi gravado (arquivo JSON)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.history_import_checkpoint_path)
+        self._data: Dict[str, Dict[str, str]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Checkpoints de importação inválidos: {str(e)}")
+
+    def get(self, device_id: int, source: str) -> Optional[datetime]:
+        value = self._data.get(str(device_id), {}).get(source)
+        return datetime.fromisoformat(value) if value else None
+
+    def set(self, device_id: int, source: str, until: datetime):
+        self._data.setdefault(str(device_id), {})[source] = until.isoformat()
+        self._save()
+
+    def reset(self, device_id: Optional[int] = None):
+        """Esquecer o progresso de um dispositivo (ou de todos)"""
+        if device_id is None:
+            self._data = {}
+        else:
+            self._data.pop(str(device_id), None)
+        self._save()
+
+    def _save(self):
+        # Escrita atômica: uma interrupção nunca deixa o arquivo pela metade
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class HistoryImporter:
+    """
+    Importa o histórico horário e diário das tomadas para ``energy_readings``
+
+    Os dias mais recentes vêm com resolução horária e os anteriores com
+    resolução diária, sem sobreposição. O histórico termina onde começam as
+    leituras do coletor, para não misturar as duas fontes no mesmo período.
+    As linhas de todos os dispositivos passam por um único buffer de upsert
+    (chave ``device_id, timestamp, data_source``), então reexecutar é seguro.
+    """
+
+    def __init__(
+        self,
+        tapo_client,
+        supabase=None,
+        checkpoints: Optional[ImportCheckpoints] = None,
+        max_concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            tapo_client: ``TapoClient`` com os dispositivos já adicionados
+            supabase: Cliente Supabase assíncrono (padrão: instância global)
+            checkpoints: Progresso por dispositivo (padrão: arquivo configurado)
+            max_concurrency: Dispositivos importados ao mesmo tempo
+            batch_size: Linhas por upsert
+        """
+        self.tapo_client = tapo_client
+        self.supabase = supabase or supabase_client
+        self.checkpoints = checkpoints or ImportCheckpoints()
+        self.max_concurrency = (
+            settings.history_import_max_concurrency
+            if max_concurrency is None
+            else max_concurrency
+        )
+        self.buffer = ReadingBuffer(
+            writer=self.supabase.upsert_energy_readings,
+            max_batch_size=(
+                settings.history_import_batch_size if batch_size is None else batch_size
+            ),
+            flush_interval_seconds=1.0,
+        )
+
+    async def _history_end(self, device_id: int) -> datetime:
+        """Início das leituras do coletor (ou a hora atual, se ainda não houver)"""
+        rows = await self.supabase.select(
+            "energy_readings",
+            [
+                ("device_id", f"eq.{device_id}"),
+                ("data_source", "not.like.tapo_history*"),
+            ],
+            columns=["timestamp"],
+            order="timestamp.asc",
+            limit=1,
+            raise_errors=True,
+        )
+        if rows:
+            first = parse_timestamp(rows[0]["timestamp"])
+            return first.replace(minute=0, second=0, microsecond=0)
+        return datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    async def _submit_range(
+        self, device: Dict, interval: str, start: datetime, end: datetime
+    ) -> Tuple[List[Tuple[datetime, asyncio.Future]], Optional[str]]:
+        """
+        Buscar [start, end) de um intervalo e enfileirar as linhas no buffer
+
+        As consultas ao dispositivo não esperam a gravação: as linhas de
+        várias janelas (e dispositivos) se juntam nos mesmos lotes.
+
+        Returns:
+            ([(fim da janela, future da gravação)], erro da busca ou None)
+        """
+        device_id, device_name = device["id"], device["name"]
+
+        checkpoint = self.checkpoints.get(device_id, HISTORY_SOURCES[interval])
+        if checkpoint is not None:
+            # Recomeçar do início do dia: o acumulado do dia depende das
+            # horas anteriores (o upsert torna a repetição inofensiva)
+            start = max(start, day_start(checkpoint))
+
+        submitted = []
+        for request_start, request_end, window_start, window_end in history_windows(
+            interval, start, end
+        ):
+            entries = await self.tapo_client.get_energy_history(
+                device_name, interval, request_start, request_end
+            )
+            if entries is None:
+                return submitted, (
+                    f"histórico {interval} a partir de {request_start:%Y-%m-%d} "
+                    "indisponível"
+                )
+
+            rows = history_rows(
+                device_id,
+                sorted(e for e in entries if window_start <= e[0] < window_end),
+                interval,
+            )
+            submitted.append(
+                (window_end, asyncio.gather(*(self.buffer.submit(r) for r in rows)))
+            )
+        return submitted, None
+
+    async def _commit_range(
+        self,
+        device_id: int,
+        source: str,
+        submitted: List[Tuple[datetime, asyncio.Future]],
+    ) -> Tuple[int, Optional[str]]:
+        """Avançar o checkpoint, em ordem, até a última janela gravada por inteiro"""
+        imported = 0
+        for window_end, future in submitted:
+            results = await future
+            if not all(results):
+                return (
+                    imported,
+                    f"{len(results) - sum(results)} linha(s) não gravada(s)",
+                )
+            imported += len(results)
+            self.checkpoints.set(device_id, source, window_end)
+        return imported, None
+
+    async def import_device(
+        self, device: Dict, daily_days: int, hourly_days: int
+    ) -> Dict[str, int]:
+        """
+        Importar o histórico de um dispositivo
+
+        Returns:
+            Linhas gravadas por origem
+
+        Raises:
+            RuntimeError: Se parte do histórico não foi obtida ou gravada (o
+                que foi gravado fica no checkpoint)
+        """
+        end = await self._history_end(device["id"])
+        hourly_start = min(day_start(end - timedelta(days=hourly_days)), end)
+        daily_start = min(day_start(end - timedelta(days=daily_days)), hourly_start)
+
+        ranges = {
+            SOURCE_DAILY: await self._submit_range(
+                device, "daily", daily_start, hourly_start
+            ),
+            SOURCE_HOURLY: await self._submit_range(
+                device, "hourly", hourly_start, end
+            ),
+        }
+        # Enviar já o restante, sem esperar o timer do buffer
+        await self.buffer.flush()
+
+        counts, errors = {}, []
+        for source, (submitted, fetch_error) in ranges.items():
+            counts[source], write_error = await self._commit_range(
+                device["id"], source, submitted
+            )
+            errors += [error for error in (fetch_error, write_error) if error]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return counts
+
+    async def run(
+        self,
+        devices: List[Dict],
+        daily_days: Optional[int] = None,
+        hourly_days: Optional[int] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Importar vários dispositivos em paralelo
+
+        Falhas em um dispositivo não interrompem os demais; o checkpoint
+        preserva o que já foi gravado para a próxima execução.
+
+        Returns:
+            {nome do dispositivo: linhas por origem, ou {"error": mensagem}}
+        """
+        daily_days = (
+            settings.history_import_daily_days if daily_days is None else daily_days
+        )
+        hourly_days = (
+            settings.history_import_hourly_days if hourly_days is None else hourly_days
+        )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def import_one(device: Dict) -> Dict:
+            async with semaphore:
+                try:
+                    counts = await self.import_device(device, daily_days, hourly_days)
+                except Exception as e:
+                    logger.error(
+                        f"Erro ao importar histórico de {device['name']}: {str(e)}"
+                    )
+                    return {"error": str(e)}
+                logger.info(
+                    f"📥 Histórico de {device['name']}: {sum(counts.values())} leituras"
+                )
+                return counts
+
+        try:
+            results = await asyncio.gather(*(import_one(d) for d in devices))
+        finally:
+            await self.buffer.flush()
+        return {device["name"]: result for device, result in zip(devices, results)}
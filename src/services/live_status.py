@@ -0,0 +1,78 @@
+"""
+Estado em tempo real dos dispositivos, publicado pelo coletor
+Guarda apenas a última leitura de cada dispositivo em memória, para que o
+status em tempo real seja servido sem consultar o Supabase
+"""
+
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+
+class LiveStatusBoard:
+    """
+    Última leitura de cada dispositivo (copy-on-write, sem locks)
+
+    O coletor nunca altera o snapshot publicado: cada leitura gera um novo
+    mapeamento imutável que substitui o anterior em uma única atribuição.
+    Quem lê pega a referência uma vez e vê sempre um estado consistente,
+    mesmo de outra thread, sem bloquear a coleta.
+    """
+
+    def __init__(self):
+        self._snapshot: Mapping[int, Dict] = MappingProxyType({})
+
+    def publish(
+        self, device: Dict, reading: Dict, latency_seconds: Optional[float] = None
+    ) -> Mapping:
+        """
+        Publicar a leitura mais recente de um dispositivo
+
+        Args:
+            device: Linha da tabela ``devices``
+            reading: Linha de ``energy_readings`` montada pelo coletor
+            latency_seconds: Tempo gasto para ler o dispositivo
+
+        Returns:
+            Entrada publicada
+        """
+        entry = MappingProxyType(
+            {
+                "device_id": device.get("id"),
+                "device_name": device.get("name", "Unknown"),
+                "location": device.get("location"),
+                "equipment": device.get("equipment_connected"),
+                "power_watts": reading.get("power_watts", 0.0),
+                "voltage": reading.get("voltage"),
+                "current": reading.get("current"),
+                "energy_today_kwh": reading.get("energy_today_kwh"),
+                "device_on": reading.get("device_on"),
+                "timestamp": reading.get("timestamp"),
+                "collected_at": datetime.utcnow().isoformat(),
+                "collected_monotonic": time.monotonic(),
+                "latency_seconds": (
+                    round(latency_seconds, 3) if latency_seconds is not None else None
+                ),
+            }
+        )
+        snapshot = dict(self._snapshot)
+        snapshot[entry["device_id"]] = entry
+        self._snapshot = MappingProxyType(snapshot)
+        return entry
+
+    def snapshot(self) -> Mapping[int, Mapping]:
+        """Estado atual: {device_id: última leitura} (somente leitura)"""
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+
+def entry_view(entry: Mapping) -> Dict:
+    """Cópia serializável de uma entrada (sem o relógio monotônico interno)"""
+    return {key: value for key, value in entry.items() if key != "collected_monotonic"}
+
+
+# Instância global, compartilhada entre o coletor e a API
+live_status = LiveStatusBoard()
@@ -0,0 +1,118 @@
+"""
+Distribuição de leituras ao vivo para assinantes (SSE)
+O coletor publica cada leitura uma vez e ela é repassada às filas dos
+assinantes interessados, sem consultas ao Supabase
+"""
+
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    """Limite de assinantes simultâneos atingido"""
+
+
+class Subscription:
+    """
+    Fila de um assinante, opcionalmente filtrada por dispositivo
+
+    A fila é limitada: se o assinante não acompanhar o ritmo, as mensagens
+    mais antigas são descartadas (e contadas em ``dropped``) para que ele
+    receba sempre as leituras mais recentes e o coletor nunca espere.
+    """
+
+    def __init__(self, device_ids: Optional[Iterable[int]], max_pending: int):
+        self.device_ids = frozenset(device_ids) if device_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def wants(self, device_id: int) -> bool:
+        return self.device_ids is None or device_id in self.device_ids
+
+    def offer(self, message: Dict):
+        """Enfileirar sem bloquear, descartando a mensagem mais antiga se cheia"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Próxima mensagem, ou None se nada chegar em ``timeout`` segundos"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ReadingBroadcaster:
+    """Fan-out de leituras do coletor para os assinantes deste processo"""
+
+    def __init__(
+        self, max_pending: Optional[int] = None, max_subscribers: Optional[int] = None
+    ):
+        """
+        Args:
+            max_pending: Mensagens retidas por assinante lento
+                (padrão: ``live_stream_max_pending``)
+            max_subscribers: Assinantes simultâneos
+                (padrão: ``live_stream_max_subscribers``)
+        """
+        self.max_pending = (
+            settings.live_stream_max_pending if max_pending is None else max_pending
+        )
+        self.max_subscribers = (
+            settings.live_stream_max_subscribers
+            if max_subscribers is None
+            else max_subscribers
+        )
+        self.subscribers: Set[Subscription] = set()
+        self.published = 0
+
+    def subscribe(self, device_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        Criar uma assinatura (todas as leituras ou só de ``device_ids``)
+
+        Raises:
+            TooManySubscribers: Se ``max_subscribers`` já foi atingido
+        """
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribers(
+                f"Limite de {self.max_subscribers} assinantes atingido"
+            )
+        subscription = Subscription(device_ids, self.max_pending)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription not in self.subscribers:
+            return
+        self.subscribers.discard(subscription)
+        if subscription.dropped:
+            logger.info(
+                f"Assinante do stream encerrado com {subscription.dropped} "
+                "leituras descartadas (consumidor lento)"
+            )
+
+    def publish(self, message: Dict):
+        """Repassar uma leitura (com ``device_id``) aos assinantes interessados"""
+        self.published += 1
+        device_id = message.get("device_id")
+        for subscription in self.subscribers:
+            if subscription.wants(device_id):
+                subscription.offer(message)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in self.subscribers),
+        }
+
+
+# Instância global, compartilhada entre o coletor e a API
+reading_broadcaster = ReadingBroadcaster()
@@ -0,0 +1,118 @@
+"""
+Buffer de escrita em lote (write-behind) para leituras de energia
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Função que grava um lote de linhas e retorna o sucesso de cada linha
+BatchWriter = Callable[[List[Dict]], Awaitable[List[bool]]]
+
+
+class ReadingBuffer:
+    """
+    Acumula leituras em memória e as envia em um único insert em lote
+
+    O lote é descarregado quando atinge ``max_batch_size`` linhas, quando a
+    leitura mais antiga completa ``flush_interval_seconds`` no buffer, ou
+    explicitamente via ``flush()`` (ex.: ao final de um ciclo de coleta).
+    Cada ``submit`` devolve um future resolvido com o sucesso da sua linha.
+    """
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        max_batch_size: int = 200,
+        flush_interval_seconds: float = 5.0,
+    ):
+        """
+        Args:
+            writer: Corrotina que grava o lote e retorna um bool por linha
+            max_batch_size: Tamanho que dispara o envio imediato do lote
+            flush_interval_seconds: Tempo máximo que uma leitura aguarda no buffer
+        """
+        self.writer = writer
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, row: Dict) -> asyncio.Future:
+        """
+        Enfileirar uma linha para o próximo lote
+
+        Args:
+            row: Linha a ser gravada
+
+        Returns:
+            Future resolvido com True/False quando o lote for gravado
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(
+                self.flush_interval_seconds, self._schedule_flush
+            )
+
+        return future
+
+    async def add(self, row: Dict) -> bool:
+        """Enfileirar uma linha e aguardar o resultado da gravação"""
+        return await self.submit(row)
+
+    def _schedule_flush(self):
+        """Disparar um flush em background (usado pelos gatilhos de tamanho/tempo)"""
+        self._cancel_timer()
+        task = asyncio.ensure_future(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self) -> List[bool]:
+        """
+        Gravar imediatamente todas as linhas pendentes
+
+        Returns:
+            Lista com o sucesso de cada linha do lote enviado
+        """
+        self._cancel_timer()
+
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return []
+
+            rows = [row for row, _ in batch]
+            try:
+                results = list(await self.writer(rows))
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de {len(rows)} leituras: {str(e)}")
+                results = []
+
+            # Linhas sem resultado correspondente são consideradas falhas
+            results += [False] * (len(rows) - len(results))
+
+            for (_, future), success in zip(batch, results):
+                if not future.done():
+                    future.set_result(bool(success))
+
+            logger.debug(
+                f"Lote gravado: {sum(results)}/{len(rows)} leituras bem-sucedidas"
+            )
+            return results[: len(rows)]
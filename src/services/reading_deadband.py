@@ -0,0 +1,248 @@
+"""
+Compressão das leituras por banda morta (deadband)
+O coletor só grava uma leitura quando a potência sai da tolerância em torno
+da última gravada ou quando o heartbeat vence; cada linha gravada informa
+quantas leituras representa, e ``expand_samples`` reconstrói a série em
+degraus para os cálculos de energia
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.services.energy_integration import default_max_interpolation_seconds
+from src.utils.config import settings
+from src.utils.timestamps import parse_timestamp
+
+
+class DeviceTrack:
+    """Última leitura gravada e leituras suprimidas desde ela"""
+
+    __slots__ = (
+        "stored_power",
+        "stored_on",
+        "stored_at",
+        "pending",
+        "pending_at",
+        "held",
+    )
+
+    def __init__(
+        self, power_watts: float, device_on: Optional[bool], stored_at: datetime
+    ):
+        self.stored_power = power_watts
+        self.stored_on = device_on
+        self.stored_at = stored_at
+        self.pending: Optional[Dict] = None
+        self.pending_at: Optional[datetime] = None
+        self.held = 0
+
+    @property
+    def last_seen(self) -> datetime:
+        """Horário da leitura mais recente (gravada ou suprimida)"""
+        return self.pending_at or self.stored_at
+
+
+class ReadingDeadband:
+    """
+    Decide quais leituras de cada dispositivo precisam ser gravadas
+
+    Uma leitura dentro da tolerância da última gravada é suprimida. Ao sair
+    da tolerância, a última leitura suprimida é gravada antes da nova, para
+    que o degrau termine no instante certo; o heartbeat, a virada do dia
+    (o contador ``energy_today_kwh`` zera) e a mudança de ``device_on``
+    (liga/desliga sem variar a potência, ex.: em standby) também forçam a
+    gravação. A coluna ``samples`` de cada linha é o número de leituras que
+    ela representa desde a linha anterior do dispositivo, inclusive ela.
+
+    Uma leitura que chega mais de ``max_gap_seconds`` depois da anterior
+    (queda de rede, tomada desligada) também força a gravação, e a última
+    suprimida é gravada antes dela: ``expand_samples`` espalha as amostras
+    de forma uniforme até a linha anterior, o que esconderia a lacuna. As
+    leituras suprimidas ficam só em memória até a próxima linha gravada;
+    ``flush`` as devolve (ex.: ao parar o coletor).
+    """
+
+    def __init__(
+        self,
+        tolerance_watts: Optional[float] = None,
+        tolerance_ratio: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        max_gap_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            tolerance_watts: Variação absoluta tolerada
+                (padrão: ``reading_deadband_watts``)
+            tolerance_ratio: Variação relativa tolerada
+            heartbeat_seconds: Intervalo máximo entre linhas gravadas
+                (0 desativa a compressão)
+            max_gap_seconds: Intervalo entre leituras que é lacuna (padrão: o
+                limite de interpolação de ``integrate_energy``)
+        """
+        self.tolerance_watts = (
+            settings.reading_deadband_watts
+            if tolerance_watts is None
+            else tolerance_watts
+        )
+        self.tolerance_ratio = (
+            settings.reading_deadband_ratio
+            if tolerance_ratio is None
+            else tolerance_ratio
+        )
+        self.heartbeat_seconds = (
+            settings.reading_heartbeat_seconds
+            if heartbeat_seconds is None
+            else heartbeat_seconds
+        )
+        self.max_gap_seconds = (
+            default_max_interpolation_seconds()
+            if max_gap_seconds is None
+            else max_gap_seconds
+        )
+        self.tracks: Dict[int, DeviceTrack] = {}
+        self.received = 0
+        self.stored = 0
+
+    def _within_band(self, track: DeviceTrack, power_watts: float) -> bool:
+        tolerance = max(
+            self.tolerance_watts,
+            self.tolerance_ratio * max(abs(track.stored_power), abs(power_watts)),
+        )
+        return abs(power_watts - track.stored_power) <= tolerance
+
+    def filter(self, reading: Dict) -> List[Dict]:
+        """
+        Linhas a gravar para uma nova leitura
+
+        Args:
+            reading: Linha de ``energy_readings`` montada pelo coletor
+
+        Returns:
+            Linhas com ``samples`` (vazia se a leitura foi suprimida)
+        """
+        self.received += 1
+        device_id = reading["device_id"]
+        power = reading["power_watts"]
+        at = parse_timestamp(reading["timestamp"])
+        track = self.tracks.get(device_id)
+
+        if track is None or self.heartbeat_seconds <= 0:
+            rows = [{**reading, "samples": 1}]
+        else:
+            same_day = at.date() == track.stored_at.date()
+            within = self._within_band(track, power) and (
+                reading.get("device_on") == track.stored_on
+            )
+            contiguous = (at - track.last_seen).total_seconds() <= self.max_gap_seconds
+            elapsed = (at - track.stored_at).total_seconds()
+            if same_day and within and contiguous and elapsed < self.heartbeat_seconds:
+                track.pending = reading
+                track.pending_at = at
+                track.held += 1
+                return []
+            if same_day and within and contiguous:
+                # Heartbeat logo após a última suprimida: representa todas
+                rows = [{**reading, "samples": track.held + 1}]
+            else:
+                rows = [{**reading, "samples": 1}]
+                if track.pending is not None:
+                    rows.insert(0, {**track.pending, "samples": track.held})
+
+        self.tracks[device_id] = DeviceTrack(power, reading.get("device_on"), at)
+        self.stored += len(rows)
+        return rows
+
+    def flush(self) -> List[Dict]:
+        """
+        Linhas das leituras suprimidas ainda não gravadas
+
+        A última suprimida de cada dispositivo passa a ser a linha gravada,
+        representando as demais; sem isso elas se perdem ao reiniciar.
+        """
+        rows = []
+        for device_id, track in self.tracks.items():
+            if track.pending is None:
+                continue
+            rows.append({**track.pending, "samples": track.held})
+            self.tracks[device_id] = DeviceTrack(
+                track.pending["power_watts"],
+                track.pending.get("device_on"),
+                track.pending_at,
+            )
+        self.stored += len(rows)
+        return rows
+
+    def stats(self) -> Dict:
+        return {
+            "received": self.received,
+            "stored": self.stored,
+            "suppressed_pending": sum(t.held for t in self.tracks.values()),
+        }
+
+
+def expand_samples(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reconstruir a série em degraus a partir de linhas com ``samples``
+
+    Uma linha que representa ``n`` leituras vira ``n`` pontos espaçados
+    igualmente desde a linha anterior do dispositivo: os ``n - 1`` primeiros
+    repetem a potência anterior (o valor mantido pela banda morta) e o
+    contador acumulado é interpolado, então a energia total e a cobertura
+    (sem lacunas falsas) ficam iguais às da série sem compressão.
+
+    Args:
+        frame: Leituras ordenadas por dispositivo e horário, com ``device_id``,
+            ``timestamp``, ``power_watts`` e opcionalmente ``samples`` e
+            ``energy_today_kwh``
+
+    Returns:
+        Novo DataFrame sem a coluna ``samples``
+    """
+    if "samples" not in frame.columns:
+        return frame
+
+    samples = (
+        pd.to_numeric(frame["samples"], errors="coerce")
+        .fillna(1)
+        .clip(lower=1)
+        .to_numpy(dtype="int64")
+    )
+    frame = frame.drop(columns="samples")
+    by_device = frame.groupby("device_id", sort=False)
+    previous_ts = by_device["timestamp"].shift()
+    repeats = np.where(previous_ts.notna().to_numpy(), samples, 1)
+    if (repeats == 1).all():
+        return frame
+
+    rows = np.repeat(np.arange(len(frame)), repeats)
+    expanded = frame.iloc[rows].reset_index(drop=True)
+    count = repeats[rows]
+    step = expanded.groupby(rows).cumcount().to_numpy() + 1
+    fraction = step / count
+    held = step < count
+
+    timestamp = frame["timestamp"].to_numpy()[rows]
+    start = previous_ts.to_numpy()[rows]
+    expanded["timestamp"] = np.where(
+        held, start + (timestamp - start) * fraction, timestamp
+    )
+    expanded["power_watts"] = np.where(
+        held,
+        by_device["power_watts"].shift().to_numpy(dtype="float64")[rows],
+        expanded["power_watts"].to_numpy(dtype="float64"),
+    )
+
+    if "energy_today_kwh" in frame.columns:
+        counter = pd.to_numeric(frame["energy_today_kwh"], errors="coerce")
+        previous = counter.groupby(frame["device_id"], sort=False).shift()
+        counter, previous = counter.to_numpy()[rows], previous.to_numpy()[rows]
+        # Reset do contador no meio do degrau: manter o valor até a linha real
+        interpolated = np.where(
+            counter >= previous, previous + (counter - previous) * fraction, previous
+        )
+        expanded["energy_today_kwh"] = np.where(held, interpolated, counter)
+
+    return expanded
@@ -0,0 +1,233 @@
+"""
+Spool local e durável de leituras de energia (SQLite em modo WAL)
+Garante que leituras não sejam perdidas enquanto o Supabase estiver inacessível
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Função que grava um lote de linhas e retorna o sucesso de cada linha
+BatchWriter = Callable[[List[Dict]], Awaitable[List[bool]]]
+
+
+class ReadingSpool:
+    """
+    Fila append-only de leituras persistida em disco
+
+    As leituras são gravadas no spool antes de serem enviadas ao Supabase e
+    removidas apenas após a confirmação (``ack``). O que sobrar é reenviado
+    em lotes por ``drain``. Os métodos síncronos fazem I/O em disco: em
+    código assíncrono, chame-os via ``asyncio.to_thread`` (a conexão é
+    compartilhada entre threads sob um lock).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Caminho do arquivo SQLite do spool
+        """
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.replayed_total = 0
+        self.last_replay_at: Optional[float] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abrir o banco do spool (lazy initialization)"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path), check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """Fechar o banco do spool"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def append_many(self, rows: List[Dict]) -> List[int]:
+        """
+        Gravar leituras no spool em uma única transação
+
+        Returns:
+            IDs das entradas criadas, na mesma ordem das linhas
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                ids = [
+                    conn.execute(
+                        "INSERT INTO spool (payload, enqueued_at) VALUES (?, ?)",
+                        (json.dumps(row, default=str), now),
+                    ).lastrowid
+                    for row in rows
+                ]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def peek(
+        self, limit: int, enqueued_before: Optional[float] = None
+    ) -> List[Tuple[int, Dict]]:
+        """
+        Obter as entradas mais antigas sem removê-las
+
+        Args:
+            limit: Número máximo de entradas
+            enqueued_before: Considerar apenas entradas gravadas antes deste instante
+
+        Returns:
+            Lista de tuplas (id, leitura)
+        """
+        cutoff = enqueued_before if enqueued_before is not None else time.time()
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT id, payload FROM spool WHERE enqueued_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (cutoff, limit),
+            )
+            return [(row_id, json.loads(payload)) for row_id, payload in cursor]
+
+    def ack(self, ids: List[int]):
+        """Remover entradas confirmadas no Supabase"""
+        if not ids:
+            return
+        with self._lock:
+            self._connection().executemany(
+                "DELETE FROM spool WHERE id = ?", [(row_id,) for row_id in ids]
+            )
+
+    def mark_failed(self, ids: List[int]):
+        """Registrar mais uma tentativa de envio sem sucesso"""
+        if not ids:
+            return
+        with self._lock:
+            self._connection().executemany(
+                "UPDATE spool SET attempts = attempts + 1 WHERE id = ?",
+                [(row_id,) for row_id in ids],
+            )
+
+    def discard_exhausted(self, max_attempts: int) -> int:
+        """
+        Descartar entradas que falharam ``max_attempts`` vezes (ex.: linha inválida)
+
+        Returns:
+            Número de entradas descartadas
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM spool WHERE attempts >= ?", (max_attempts,)
+            )
+        if cursor.rowcount:
+            logger.error(
+                f"Spool: {cursor.rowcount} leituras descartadas após {max_attempts} tentativas"
+            )
+        return cursor.rowcount
+
+    def depth(self) -> int:
+        """Número de leituras aguardando envio"""
+        with self._lock:
+            return (
+                self._connection().execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+            )
+
+    def stats(self) -> Dict:
+        """
+        Métricas do spool
+
+        Returns:
+            Dict com profundidade, atraso de replay (idade da leitura mais
+            antiga pendente, em segundos) e total reenviado
+        """
+        with self._lock:
+            depth, oldest = (
+                self._connection()
+                .execute("SELECT COUNT(*), MIN(enqueued_at) FROM spool")
+                .fetchone()
+            )
+        return {
+            "depth": depth,
+            "replay_lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "replayed_total": self.replayed_total,
+            "last_replay_at": self.last_replay_at,
+        }
+
+    async def drain(
+        self,
+        writer: BatchWriter,
+        batch_size: int = 500,
+        min_age_seconds: float = 0,
+        max_attempts: int = 20,
+    ) -> int:
+        """
+        Reenviar as leituras pendentes em lotes
+
+        Para no primeiro lote com falha (provavelmente o Supabase continua
+        fora do ar) e tenta novamente na próxima chamada. O acesso ao SQLite
+        roda em threads, sem bloquear o event loop.
+
+        Args:
+            writer: Corrotina que grava o lote e retorna um bool por linha
+            batch_size: Leituras por lote
+            min_age_seconds: Ignorar entradas mais novas (ainda em envio normal)
+            max_attempts: Tentativas antes de descartar uma leitura rejeitada
+
+        Returns:
+            Número de leituras reenviadas com sucesso
+        """
+        replayed = 0
+        cutoff = time.time() - min_age_seconds
+
+        while True:
+            entries = await asyncio.to_thread(
+                self.peek, batch_size, enqueued_before=cutoff
+            )
+            if not entries:
+                break
+
+            ids = [row_id for row_id, _ in entries]
+            results = await writer([row for _, row in entries])
+            results = list(results) + [False] * (len(ids) - len(results))
+
+            sent = [row_id for row_id, ok in zip(ids, results) if ok]
+            failed = [row_id for row_id, ok in zip(ids, results) if not ok]
+            await asyncio.to_thread(self.ack, sent)
+            await asyncio.to_thread(self.mark_failed, failed)
+            replayed += len(sent)
+
+            if failed:
+                await asyncio.to_thread(self.discard_exhausted, max_attempts)
+                break
+
+        if replayed:
+            self.replayed_total += replayed
+            self.last_replay_at = time.time()
+            logger.info(f"📤 Spool: {replayed} leituras reenviadas ao Supabase")
+
+        return replayed
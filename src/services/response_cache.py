@@ -0,0 +1,256 @@
+"""
+Cache de respostas para os endpoints de leitura da API
+Backend em memória (LRU + TTL) por padrão ou Redis (``response_cache_backend``),
+com coalescência de requisições idênticas simultâneas e invalidação por
+namespace quando o coletor grava leituras novas
+"""
+
+import asyncio
+import functools
+import importlib.util
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_AVAILABLE = importlib.util.find_spec("redis") is not None
+
+# Namespaces invalidados pelo coletor a cada gravação de leituras
+READINGS_NAMESPACE = "readings"
+DEVICES_NAMESPACE = "devices"
+
+
+class MemoryCacheBackend:
+    """Cache local do processo: LRU limitado a ``max_entries``, com TTL por entrada"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """Retornar (encontrado, valor)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Cache compartilhado entre processos (valores serializados em JSON)"""
+
+    def __init__(self, url: str, key_prefix: str = "casa:cache:"):
+        import redis.asyncio as redis
+
+        self.key_prefix = key_prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raw = await self._redis.get(self.key_prefix + key)
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._redis.set(
+            self.key_prefix + key,
+            json.dumps(jsonable_encoder(value)),
+            px=max(1, int(ttl * 1000)),
+        )
+
+    async def delete_prefix(self, prefix: str) -> int:
+        keys = [
+            key
+            async for key in self._redis.scan_iter(match=f"{self.key_prefix}{prefix}*")
+        ]
+        if keys:
+            await self._redis.delete(*keys)
+        return len(keys)
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+
+class ResponseCache:
+    """
+    Cache de respostas com coalescência e métricas
+
+    Chaves são ``namespace:nome``; ``invalidate(namespace)`` remove todas as
+    respostas de um namespace. Enquanto uma resposta é calculada, requisições
+    com a mesma chave aguardam o mesmo resultado em vez de repetir a consulta.
+    Falhas do backend (ex.: Redis fora do ar) viram misses, nunca erros.
+    """
+
+    def __init__(self, backend=None, default_ttl: Optional[float] = None):
+        """
+        Args:
+            backend: Backend de armazenamento (padrão: conforme
+                ``response_cache_backend``)
+            default_ttl: TTL padrão em segundos
+        """
+        self.backend = self._default_backend() if backend is None else backend
+        self.default_ttl = (
+            settings.response_cache_ttl_seconds if default_ttl is None else default_ttl
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[str, int] = {}  # {namespace: invalidações}
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "invalidations": 0,
+            "backend_errors": 0,
+        }
+
+    @staticmethod
+    def _default_backend():
+        if settings.response_cache_backend == "redis":
+            if REDIS_AVAILABLE:
+                return RedisCacheBackend(settings.redis_url)
+            logger.warning(
+                "Pacote 'redis' não instalado - usando cache de respostas em memória"
+            )
+        return MemoryCacheBackend(settings.response_cache_max_entries)
+
+    async def _backend_call(self, method: str, *args, default=None):
+        try:
+            return await getattr(self.backend, method)(*args)
+        except Exception as e:
+            self.metrics["backend_errors"] += 1
+            logger.warning(f"Erro no cache de respostas ({method}): {str(e)}")
+            return default
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        name: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Retornar a resposta em cache ou calculá-la com ``loader``
+
+        Exceções do ``loader`` (ex.: HTTPException) não são armazenadas e são
+        repassadas a todas as requisições que aguardavam o mesmo resultado.
+        """
+        key = f"{namespace}:{name}"
+        found, value = await self._backend_call("get", key, default=(False, None))
+        if found:
+            self.metrics["hits"] += 1
+            return value
+
+        # A consulta roda em uma task própria: se a requisição que a iniciou
+        # for cancelada, as demais continuam aguardando o mesmo resultado
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            self.metrics["misses"] += 1
+            generation = self._generations.get(namespace, 0)
+            task = asyncio.ensure_future(
+                self._load(namespace, generation, key, loader, ttl)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._load_done, key))
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        namespace: str,
+        generation: int,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+    ) -> Any:
+        value = await loader()
+        # Invalidado durante a consulta: o resultado pode estar desatualizado
+        if self._generations.get(namespace, 0) == generation:
+            await self._backend_call(
+                "set", key, value, self.default_ttl if ttl is None else ttl
+            )
+        return value
+
+    def _load_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # evitar aviso se ninguém aguardava o resultado
+
+    async def invalidate(self, namespace: str) -> int:
+        """Remover todas as respostas de um namespace"""
+        self.metrics["invalidations"] += 1
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        # Consultas em andamento terminam para quem já aguardava, mas não
+        # recebem novas requisições
+        for key in [k for k in self._inflight if k.startswith(f"{namespace}:")]:
+            del self._inflight[key]
+        return await self._backend_call("delete_prefix", f"{namespace}:", default=0)
+
+    async def aclose(self):
+        """Fechar a conexão do backend (Redis)"""
+        if hasattr(self.backend, "aclose"):
+            await self._backend_call("aclose")
+
+    def stats(self) -> Dict:
+        """Métricas de acerto do cache"""
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_ratio": round(self.metrics["hits"] / lookups, 3) if lookups else None,
+            "backend": type(self.backend).__name__,
+            "entries": (
+                len(self.backend)
+                if isinstance(self.backend, MemoryCacheBackend)
+                else None
+            ),
+        }
+
+    def cached(self, namespace: str, ttl: Optional[float] = None):
+        """
+        Decorador para endpoints assíncronos: a chave é o nome da função e os
+        argumentos recebidos (parâmetros de query/path)
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                name = func.__name__ + json.dumps(
+                    jsonable_encoder([args, kwargs]), sort_keys=True
+                )
+                return await self.get_or_set(
+                    namespace, name, lambda: func(*args, **kwargs), ttl
+                )
+
+            return wrapper
+
+        return decorator
+
+
+# Instância global do cache
+response_cache = ResponseCache()
@@ -0,0 +1,95 @@
+"""
+Consultas aos agregados de energy_readings em várias resoluções
+Escolhe a resolução mais grossa que ainda descreve bem a janela pedida
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from src.integrations.supabase_client import supabase_client
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Resoluções mantidas em energy_rollups, da mais fina para a mais grossa
+RESOLUTIONS = {
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "1mo": timedelta(days=30),
+}
+
+
+def bucket_start(resolution: str, ts: datetime) -> datetime:
+    """Início do bucket que contém ``ts`` (mesma regra de ``energy_bucket`` no SQL)"""
+    if resolution == "15m":
+        return ts.replace(minute=ts.minute - ts.minute % 15, second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == "1d":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def choose_resolution(
+    since: datetime, until: datetime, min_points: Optional[int] = None
+) -> str:
+    """
+    Escolher a resolução mais grossa com pelo menos ``min_points`` buckets
+
+    Args:
+        since: Início da janela
+        until: Fim da janela
+        min_points: Número mínimo de pontos desejado (padrão: ``rollup_min_points``)
+
+    Returns:
+        Chave de ``RESOLUTIONS``; a mais fina se nenhuma atingir o mínimo
+    """
+    min_points = settings.rollup_min_points if min_points is None else min_points
+    window = until - since
+    for resolution in reversed(RESOLUTIONS):
+        if window / RESOLUTIONS[resolution] >= min_points:
+            return resolution
+    return next(iter(RESOLUTIONS))
+
+
+async def get_device_history(
+    device_id: int,
+    since: datetime,
+    until: Optional[datetime] = None,
+    resolution: Optional[str] = None,
+) -> Dict:
+    """
+    Série histórica de um dispositivo a partir de ``energy_rollups``
+
+    Args:
+        device_id: ID do dispositivo
+        since: Início da janela
+        until: Fim da janela (padrão: agora)
+        resolution: Forçar uma resolução (padrão: ``choose_resolution``)
+
+    Returns:
+        Dicionário com a resolução usada, os buckets e os totais da janela
+    """
+    until = until or datetime.utcnow()
+    if resolution is None:
+        resolution = choose_resolution(since, until)
+    elif resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: {resolution}")
+
+    # Incluir o bucket parcial do início da janela
+    buckets = await supabase_client.get_rollups(
+        resolution, device_id, bucket_start(resolution, since), until
+    )
+    total_energy = sum(b.get("energy_delta_kwh") or 0 for b in buckets)
+
+    return {
+        "device_id": device_id,
+        "resolution": resolution,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "buckets": buckets,
+        "total_energy_kwh": round(total_energy, 4),
+        "total_cost": round(total_energy * settings.energy_cost_per_kwh, 2),
+    }
@@ -0,0 +1,175 @@
+"""
+Modelo em memória do estado atual da casa, usado como contexto do LLM
+Mantém a última leitura e os agregados de hoje por dispositivo, atualizados
+de forma incremental a partir do agregado diário ``energy_daily`` do Supabase
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.integrations.supabase_client import (
+    DeviceRow,
+    EnergyDailyRow,
+    supabase_client,
+)
+from src.utils.config import settings
+from src.utils.timestamps import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def _row_timestamp(value) -> Optional[datetime]:
+    """Timestamp de uma linha do agregado, ou None se ausente ou inválido"""
+    if not value:
+        return None
+    try:
+        return parse_timestamp(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Não foi possível fazer parse do timestamp: {value}")
+        return None
+
+
+class SystemContextCache:
+    """
+    Estado por dispositivo para montar o contexto do LLM sem reler o banco
+
+    Para cada dispositivo guarda a última leitura (potência e horário) e os
+    agregados de hoje (número de leituras e energia acumulada), lidos de
+    ``energy_daily`` (uma linha por dispositivo e dia). A carga inicial usa a
+    view ``energy_daily_latest``; depois, ``refresh`` busca apenas as linhas
+    com leituras a partir do cursor. Dentro de ``max_staleness_seconds`` desde
+    a última sincronização, nenhuma consulta é feita.
+    """
+
+    def __init__(
+        self,
+        max_staleness_seconds: Optional[float] = None,
+        devices_refresh_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            max_staleness_seconds: Idade máxima do estado antes de buscar
+                agregados novos
+            devices_refresh_seconds: Intervalo para recarregar a tabela
+                ``devices``
+        """
+        self.max_staleness_seconds = (
+            settings.llm_context_max_staleness_seconds
+            if max_staleness_seconds is None
+            else max_staleness_seconds
+        )
+        self.devices_refresh_seconds = (
+            settings.llm_context_devices_refresh_seconds
+            if devices_refresh_seconds is None
+            else devices_refresh_seconds
+        )
+        self.devices: List[DeviceRow] = []
+        self.device_state: Dict[int, Dict] = {}  # {device_id: estado}
+        self.latest_reading_time: Optional[datetime] = None
+        self._today = None
+        self._cursor: Optional[datetime] = None
+        self._synced_at: Optional[float] = None
+        self._devices_loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def readings_today(self) -> int:
+        return sum(state["readings_today"] for state in self.device_state.values())
+
+    def _roll_day(self, now: datetime):
+        """Zerar os agregados de hoje na virada do dia (UTC)"""
+        if self._today == now.date():
+            return
+        self._today = now.date()
+        for state in self.device_state.values():
+            state["readings_today"] = 0
+            state["energy_today_kwh"] = 0.0
+
+    def apply_rollup(self, row: EnergyDailyRow) -> bool:
+        """
+        Aplicar uma linha do agregado diário ao estado
+
+        Linhas de dias anteriores só atualizam a última leitura; a linha de
+        hoje também substitui os agregados do dia. Aplicar a mesma linha de
+        novo não altera nada.
+
+        Returns:
+            True se a linha alterou o estado
+        """
+        ts = _row_timestamp(row.get("last_timestamp"))
+        device_id = row.get("device_id")
+        if ts is None or device_id is None:
+            return False
+
+        state = self.device_state.setdefault(
+            device_id,
+            {
+                "power_watts": 0,
+                "last_reading_time": None,
+                "readings_today": 0,
+                "energy_today_kwh": 0.0,
+            },
+        )
+        if state["last_reading_time"] and ts < state["last_reading_time"]:
+            return False
+
+        state["last_reading_time"] = ts
+        state["power_watts"] = row.get("last_power_watts") or 0
+        if ts.date() == self._today:
+            state["readings_today"] = row.get("readings_count") or 0
+            state["energy_today_kwh"] = row.get("energy_kwh") or 0.0
+
+        if self.latest_reading_time is None or ts > self.latest_reading_time:
+            self.latest_reading_time = ts
+        if self._cursor is None or ts > self._cursor:
+            self._cursor = ts
+        return True
+
+    async def refresh(self, force: bool = False):
+        """
+        Sincronizar o estado com o Supabase, se estiver desatualizado
+
+        Args:
+            force: Sincronizar mesmo dentro do limite de desatualização
+        """
+        async with self._lock:
+            now_monotonic = time.monotonic()
+            if (
+                not force
+                and self._synced_at is not None
+                and now_monotonic - self._synced_at < self.max_staleness_seconds
+            ):
+                return
+
+            self._roll_day(datetime.utcnow())
+
+            if (
+                self._devices_loaded_at is None
+                or now_monotonic - self._devices_loaded_at
+                >= self.devices_refresh_seconds
+            ):
+                devices = await supabase_client.select("devices")
+                if devices:
+                    self.devices = devices
+                    self._devices_loaded_at = now_monotonic
+
+            if self._cursor is None:
+                # Carga inicial: dia mais recente de cada dispositivo
+                rows = await supabase_client.get_latest_daily()
+            else:
+                # Incremental: o filtro é inclusivo (gte); aplicar de novo é inócuo
+                rows = await supabase_client.get_daily_rollup(
+                    updated_since=self._cursor
+                )
+
+            for row in rows:
+                self.apply_rollup(row)
+
+            self._synced_at = now_monotonic
+
+
+# Instância global do contexto
+system_context_cache = SystemContextCache()
@@ -21,6 +21,13 @@ class Settings(BaseSettings):
     )
     redis_url: str = "redis://localhost:6379"
 
+    # Cache de respostas da API ("memory" ou "redis", usando redis_url)
+    response_cache_backend: str = "memory"
+    response_cache_max_entries: int = 512
+    response_cache_ttl_seconds: float = 30.0
+    response_cache_devices_ttl_seconds: float = 300.0
+    response_cache_insights_ttl_seconds: float = 600.0
+
     # Supabase (banco de dados principal)
     supabase_url: str = "https://pqqrodiuuhckvdqawgeg.supabase.co"
     supabase_anon_key: str = ""
@@ -29,6 +36,24 @@ class Settings(BaseSettings):
     tapo_username: str = ""
     tapo_password: str = ""
     tapo_devices: List[str] = []
+    # Cache de metadados (modelo, firmware, MAC) por IP para acelerar o início
+    tapo_metadata_cache_path: str = "data/cache/tapo_devices.json"
+    tapo_metadata_cache_ttl_hours: float = 24.0
+    # TP-Link Cloud (/devices/discover-cloud)
+    tapo_cloud_max_concurrency: int = 5  # Requisições de info simultâneas
+    tapo_cloud_requests_per_second: float = 5.0
+    tapo_cloud_session_ttl_seconds: float = 60.0  # Reuso de login e lista
+
+    # Descoberta de dispositivos na rede local (/devices/discover-local)
+    discovery_subnets: List[str] = [
+        "192.168.0.0/24",
+        "192.168.1.0/24",
+        "192.168.68.0/24",
+    ]
+    discovery_cache_ttl_seconds: float = 300.0
+    discovery_probe_timeout_seconds: float = 0.5  # Teste TCP por host
+    discovery_probe_concurrency: int = 256
+    discovery_handshake_concurrency: int = 10
 
     # Tuya Cloud (NovaDigital usa plataforma Tuya)
     tuya_access_id: str = ""
@@ -44,6 +69,9 @@ class Settings(BaseSettings):
 
     # Configuração de Energia
     energy_cost_per_kwh: float = 0.85  # R$ por kWh
+    # Maior intervalo entre leituras integrado pela potência (acima disso é
+    # lacuna); padrão: 1,5x o intervalo máximo de coleta
+    energy_max_interpolation_seconds: Optional[float] = None
 
     # Notificações
     telegram_bot_token: Optional[str] = None
@@ -62,18 +90,88 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     google_ai_api_key: Optional[str] = None
 
+    # Contexto do assistente (/ai/ask)
+    llm_context_max_staleness_seconds: float = 60.0  # Idade máxima do contexto
+    llm_context_devices_refresh_seconds: float = 900.0  # Recarga de dispositivos
+
     # SmartLife
     smartlife_username: Optional[str] = None
     smartlife_password: Optional[str] = None
 
     # Monitoramento
-    collection_interval_minutes: int = 15
+    collection_interval_minutes: int = 15  # Intervalo inicial de cada dispositivo
+    realtime_stale_after_seconds: Optional[float] = None  # Padrão: 2x o máximo
+    live_stream_max_pending: int = 100  # Leituras retidas por assinante lento
+    live_stream_max_subscribers: int = 200  # Conexões SSE simultâneas
+    live_stream_heartbeat_seconds: float = 15.0  # Keep-alive das conexões SSE
     report_time: str = "20:00"  # Horário dos relatórios diários
     enable_collector: bool = True  # Reativado após deploy bem-sucedido
     collector_init_timeout_seconds: int = 20
+    collector_max_concurrency: int = 10  # Dispositivos consultados em paralelo
+    collector_device_timeout_seconds: float = 20.0  # Timeout por dispositivo
+    collector_cycle_deadline_seconds: float = 300.0  # Prazo máximo de um ciclo
+    collector_batch_size: int = 200  # Leituras por insert em lote
+    collector_flush_interval_seconds: float = 5.0  # Espera máxima no buffer
+    collector_device_info_interval: int = 10  # get_device_info a cada N leituras
+
+    # Intervalo de coleta adaptativo por dispositivo (mínimo = máximo: fixo)
+    collector_min_interval_seconds: float = 60.0  # Potência variando/perto do alerta
+    collector_max_interval_seconds: float = 1800.0  # Leituras estáveis/desligado
+    collector_interval_backoff: float = 2.0  # Multiplicador a cada leitura estável
+    collector_change_ratio: float = 0.2  # Variação relativa que acelera a coleta
+    collector_change_watts: float = 5.0  # Variação mínima em W (ignora ruído)
+    collector_alert_margin: float = 0.8  # Fração do limiar de anomalia
+    collector_poll_tick_seconds: float = 5.0  # Agrupa dispositivos quase devidos
+
+    # Compressão das leituras gravadas (banda morta); heartbeat + intervalo
+    # máximo de coleta é o maior espaço normal entre linhas (ver backfill)
+    reading_deadband_watts: float = 1.0  # Variação de potência tolerada (W)
+    reading_deadband_ratio: float = 0.02  # Variação relativa tolerada
+    reading_heartbeat_seconds: float = 1800.0  # Gravar ao menos a cada (0 = tudo)
+
+    # Spool local de leituras (quando o Supabase estiver inacessível)
+    spool_path: str = "data/spool/readings.db"
+    spool_drain_interval_seconds: float = 60.0
+    spool_drain_batch_size: int = 500
+
+    # Importação do histórico armazenado nas tomadas (import_historical_data.py)
+    history_import_checkpoint_path: str = "data/import/history_checkpoints.json"
+    history_import_daily_days: int = 90  # Dias importados com resolução diária
+    history_import_hourly_days: int = 30  # Dias mais recentes com resolução horária
+    history_import_max_concurrency: int = 4  # Dispositivos importados em paralelo
+    history_import_batch_size: int = 1000  # Linhas por upsert em lote
+
+    # Preenchimento de lacunas com o histórico das tomadas (pelo coletor)
+    backfill_enabled: bool = True
+    backfill_interval_minutes: float = 60.0  # Intervalo entre verificações
+    backfill_lookback_hours: float = 168.0  # Janela verificada
+    backfill_settle_hours: float = 2.0  # Horas recentes ainda não verificadas
+    backfill_request_interval_seconds: float = 30.0  # Espaço entre consultas
+    backfill_max_requests_per_run: int = 24  # Dias consultados por verificação
+
+    # Agregados em várias resoluções (energy_rollups)
+    rollup_interval_seconds: float = 300.0  # run_energy_rollups pelo coletor
+    rollup_min_points: int = 24  # Pontos mínimos ao escolher a resolução
+
+    # Partições mensais de energy_readings e retenção das leituras brutas
+    raw_retention_months: int = 0  # Meses de leituras brutas mantidos (0 = sempre)
+    partition_maintenance_interval_hours: float = 24.0
+
+    # Dados do dashboard Streamlit (cache em memória + atualização em background)
+    dashboard_refresh_interval_seconds: float = 10.0  # Leituras e agregados
+    dashboard_devices_ttl_seconds: float = 300.0  # Lista de dispositivos
+    dashboard_readings_window_hours: float = 24.0  # Leituras brutas mantidas
+    dashboard_idle_seconds: float = 600.0  # Sem acesso: parar de atualizar
+    dashboard_full_reload_seconds: float = 900.0  # Recarga completa periódica
+    dashboard_chart_width_px: int = 1200  # Limita os pontos enviados por série
 
     # Alertas
     anomaly_threshold: float = 2.0  # Multiplicador da média para detectar anomalias
+    anomaly_ewma_alpha: float = 0.05  # Peso de cada leitura na média móvel
+    anomaly_min_zscore: float = 3.0  # Desvios-padrão acima da média móvel
+    anomaly_warmup_samples: int = 30  # Leituras antes de começar a alertar
+    anomaly_min_power_watts: float = 5.0  # Ignorar picos em standby
+    anomaly_alert_cooldown_seconds: float = 1800.0  # Entre alertas do mesmo dispositivo
     max_daily_cost: float = 50.0  # Alerta se o custo diário passar deste valor
 
     class Config:
@@ -0,0 +1,27 @@
+"""
+Conversão dos timestamps de leituras (Supabase, coletor, histórico)
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Converter um timestamp para datetime UTC sem timezone
+
+    Aceita ``datetime`` ou texto ISO 8601. O PostgREST omite zeros finais da
+    fração de segundo (``10:15:30.12``), que ``datetime.fromisoformat`` só
+    aceita a partir do Python 3.11; horários com fuso são convertidos para UTC
+    e os sem fuso são mantidos como estão.
+
+    Raises:
+        ValueError: Valor vazio ou que não é um timestamp
+    """
+    ts = pd.Timestamp(value)
+    if pd.isna(ts):
+        raise ValueError(f"Timestamp vazio: {value!r}")
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_pydatetime()
@@ -13,12 +13,15 @@ CREATE TABLE IF NOT EXISTS devices (
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    device_id VARCHAR(255)
+    device_id VARCHAR(255),
+    -- Limites do intervalo de coleta adaptativo (migrations/005_devices_poll_intervals.sql)
+    min_poll_seconds INTEGER,
+    max_poll_seconds INTEGER
 );
 
--- Tabela de leituras de energia
+-- Tabela de leituras de energia, particionada por mês (migrations/004_energy_readings_partitioning.sql)
 CREATE TABLE IF NOT EXISTS energy_readings (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     device_id INTEGER REFERENCES devices(id),
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
     power_watts FLOAT NOT NULL,
@@ -27,9 +30,54 @@ CREATE TABLE IF NOT EXISTS energy_readings (
     energy_today_kwh FLOAT,
     energy_total_kwh FLOAT,
     device_on BOOLEAN,
-    data_source VARCHAR(50),
-    reading_at TIMESTAMP
-);
+    data_source VARCHAR(50) DEFAULT 'tapo_local',
+    reading_at TIMESTAMP,
+    -- Leituras da tomada representadas pela linha (migrations/006_energy_readings_samples.sql)
+    samples INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Leituras fora das partições mensais existentes (ex.: importações antigas)
+CREATE TABLE IF NOT EXISTS energy_readings_default
+    PARTITION OF energy_readings DEFAULT;
+
+-- Criar (se preciso) a partição do mês que contém p_month
+-- Leituras desse mês que estejam na partição default são movidas para ela
+CREATE OR REPLACE FUNCTION ensure_energy_readings_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+    v_name TEXT := format('energy_readings_p%s', to_char(v_start, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    CREATE TEMP TABLE IF NOT EXISTS energy_readings_moving
+        (LIKE energy_readings) ON COMMIT DROP;
+    TRUNCATE energy_readings_moving;
+
+    WITH moved AS (
+        DELETE FROM energy_readings_default
+        WHERE timestamp >= v_start AND timestamp < v_end
+        RETURNING *
+    )
+    INSERT INTO energy_readings_moving SELECT * FROM moved;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF energy_readings FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+
+    -- Leituras apenas mudam de partição: os agregados não devem contá-las de novo
+    PERFORM set_config('casa.skip_rollup_triggers', 'on', true);
+    INSERT INTO energy_readings SELECT * FROM energy_readings_moving;
+    PERFORM set_config('casa.skip_rollup_triggers', 'off', true);
+
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
 
 -- Tabela de alertas
 CREATE TABLE IF NOT EXISTS alerts (
@@ -76,12 +124,471 @@ CREATE TABLE IF NOT EXISTS users (
 );
 
 -- Índices para performance
-CREATE INDEX IF NOT EXISTS idx_energy_readings_device_id ON energy_readings(device_id);
-CREATE INDEX IF NOT EXISTS idx_energy_readings_timestamp ON energy_readings(timestamp);
+-- Chave única para upserts idempotentes (spool do coletor, importações); também
+-- atende às consultas por dispositivo e período (device_id, timestamp)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_energy_readings_device_ts_source ON energy_readings(device_id, timestamp, data_source);
+CREATE INDEX IF NOT EXISTS brin_energy_readings_timestamp ON energy_readings USING BRIN (timestamp);
 CREATE INDEX IF NOT EXISTS idx_alerts_device_id ON alerts(device_id);
 CREATE INDEX IF NOT EXISTS idx_devices_ip_address ON devices(ip_address);
 CREATE INDEX IF NOT EXISTS idx_daily_reports_date ON daily_reports(report_date);
 
+-- Agregado diário por dispositivo, mantido por trigger (migrations/002_energy_daily_rollup.sql)
+CREATE TABLE IF NOT EXISTS energy_daily (
+    device_id INTEGER NOT NULL REFERENCES devices(id),
+    day DATE NOT NULL,
+    readings_count INTEGER NOT NULL DEFAULT 0,
+    power_sum_watts DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_power_watts DOUBLE PRECISION,
+    last_timestamp TIMESTAMP NOT NULL,
+    last_power_watts DOUBLE PRECISION,
+    -- energy_today_kwh é o acumulado do dia informado pela tomada
+    energy_kwh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (device_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_energy_daily_day ON energy_daily(day);
+CREATE INDEX IF NOT EXISTS idx_energy_daily_last_timestamp ON energy_daily(last_timestamp);
+
+-- Leitura coletada ao vivo (não importada nem preenchida do histórico)
+CREATE OR REPLACE FUNCTION energy_reading_is_live(p_source TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_source IS NULL
+        OR (p_source NOT LIKE 'tapo\_history\_%'
+            AND p_source NOT LIKE 'tapo\_backfill\_%');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Aplicar uma leitura nova ao agregado do seu dia
+CREATE OR REPLACE FUNCTION energy_daily_apply_reading()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.device_id IS NULL
+       OR current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
+    IF NOT energy_reading_is_live(NEW.data_source) THEN
+        -- Histórico só vale para dias que o coletor não viu
+        INSERT INTO energy_daily AS d (
+            device_id, day, readings_count, power_sum_watts, max_power_watts,
+            last_timestamp, last_power_watts, energy_kwh, updated_at
+        )
+        VALUES (
+            NEW.device_id, NEW.timestamp::date, 0, 0, NULL,
+            NEW.timestamp, NULL, COALESCE(NEW.energy_today_kwh, 0),
+            CURRENT_TIMESTAMP
+        )
+        ON CONFLICT (device_id, day) DO UPDATE SET
+            last_timestamp = GREATEST(d.last_timestamp, EXCLUDED.last_timestamp),
+            energy_kwh = GREATEST(d.energy_kwh, EXCLUDED.energy_kwh),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE d.readings_count = 0;
+
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO energy_daily AS d (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    VALUES (
+        NEW.device_id, NEW.timestamp::date, NEW.samples,
+        NEW.power_watts * NEW.samples, NEW.power_watts,
+        NEW.timestamp, NEW.power_watts, COALESCE(NEW.energy_today_kwh, 0),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        readings_count = d.readings_count + EXCLUDED.readings_count,
+        power_sum_watts = d.power_sum_watts + EXCLUDED.power_sum_watts,
+        max_power_watts = GREATEST(d.max_power_watts, EXCLUDED.max_power_watts),
+        -- Num dia só com histórico, a primeira leitura ao vivo substitui tudo
+        last_power_watts = CASE
+            WHEN d.readings_count = 0
+                 OR EXCLUDED.last_timestamp >= d.last_timestamp
+                THEN EXCLUDED.last_power_watts
+            ELSE d.last_power_watts
+        END,
+        last_timestamp = CASE
+            WHEN d.readings_count = 0 THEN EXCLUDED.last_timestamp
+            ELSE GREATEST(d.last_timestamp, EXCLUDED.last_timestamp)
+        END,
+        energy_kwh = CASE
+            WHEN d.readings_count = 0 THEN EXCLUDED.energy_kwh
+            ELSE GREATEST(d.energy_kwh, EXCLUDED.energy_kwh)
+        END,
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Só INSERT: upserts que mesclam uma leitura repetida não alteram o agregado
+DROP TRIGGER IF EXISTS trg_energy_daily_apply_reading ON energy_readings;
+CREATE TRIGGER trg_energy_daily_apply_reading
+    AFTER INSERT ON energy_readings
+    FOR EACH ROW EXECUTE FUNCTION energy_daily_apply_reading();
+
+-- Recalcular o agregado a partir das leituras (carga inicial ou correções)
+CREATE OR REPLACE FUNCTION refresh_energy_daily(p_since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_since DATE := GREATEST(p_since, energy_readings_retained_from()::date);
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_daily WHERE v_since IS NULL OR day >= v_since;
+
+    INSERT INTO energy_daily (
+        device_id, day, readings_count, power_sum_watts, max_power_watts,
+        last_timestamp, last_power_watts, energy_kwh, updated_at
+    )
+    SELECT
+        device_id,
+        timestamp::date,
+        COALESCE(SUM(samples) FILTER (WHERE live), 0),
+        COALESCE(SUM(power_watts * samples) FILTER (WHERE live), 0),
+        MAX(power_watts) FILTER (WHERE live),
+        COALESCE(MAX(timestamp) FILTER (WHERE live), MAX(timestamp)),
+        (ARRAY_AGG(power_watts ORDER BY timestamp DESC)
+            FILTER (WHERE live))[1],
+        COALESCE(
+            MAX(energy_today_kwh) FILTER (WHERE live),
+            MAX(energy_today_kwh),
+            0
+        ),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT *, energy_reading_is_live(data_source) AS live
+        FROM energy_readings
+        WHERE device_id IS NOT NULL
+          AND (v_since IS NULL OR timestamp >= v_since)
+    ) r
+    GROUP BY device_id, timestamp::date;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Dia mais recente de cada dispositivo (última leitura + agregados do dia)
+CREATE OR REPLACE VIEW energy_daily_latest AS
+SELECT DISTINCT ON (device_id) *
+FROM energy_daily
+ORDER BY device_id, day DESC;
+
+-- Agregados em várias resoluções (migrations/003_energy_rollups.sql)
+CREATE TABLE IF NOT EXISTS energy_rollups (
+    device_id INTEGER NOT NULL REFERENCES devices(id),
+    resolution VARCHAR(8) NOT NULL,  -- '15m', '1h', '1d' ou '1mo'
+    bucket_start TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    min_power_watts DOUBLE PRECISION,
+    max_power_watts DOUBLE PRECISION,
+    avg_power_watts DOUBLE PRECISION,
+    energy_delta_kwh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (device_id, resolution, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_energy_rollups_resolution_bucket
+    ON energy_rollups(resolution, bucket_start);
+
+-- Marca d'água do processamento incremental: leituras anteriores já agregadas
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_run_at TIMESTAMP
+);
+
+INSERT INTO rollup_state (name) VALUES ('energy_rollups') ON CONFLICT DO NOTHING;
+-- Leituras brutas anteriores a esta marca foram descartadas pela retenção
+INSERT INTO rollup_state (name) VALUES ('energy_readings_retention') ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION energy_readings_retained_from()
+RETURNS TIMESTAMP AS $$
+    SELECT watermark FROM rollup_state WHERE name = 'energy_readings_retention'
+$$ LANGUAGE sql STABLE;
+
+-- Início do bucket que contém p_ts na resolução informada
+CREATE OR REPLACE FUNCTION energy_bucket(p_resolution TEXT, p_ts TIMESTAMP)
+RETURNS TIMESTAMP AS $$
+    SELECT CASE p_resolution
+        WHEN '15m' THEN date_trunc('hour', p_ts)
+            + floor(extract(minute FROM p_ts) / 15) * interval '15 minutes'
+        WHEN '1h' THEN date_trunc('hour', p_ts)
+        WHEN '1d' THEN date_trunc('day', p_ts)
+        WHEN '1mo' THEN date_trunc('month', p_ts)
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recalcular uma resolução a partir da resolução imediatamente mais fina
+CREATE OR REPLACE FUNCTION rebuild_energy_rollup_level(
+    p_target TEXT, p_source TEXT, p_from TIMESTAMP, p_to TIMESTAMP
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_first TIMESTAMP := energy_bucket(p_target, p_from);
+    v_last TIMESTAMP := energy_bucket(p_target, p_to - interval '1 microsecond');
+    affected INTEGER;
+BEGIN
+    DELETE FROM energy_rollups
+    WHERE resolution = p_target
+      AND bucket_start BETWEEN v_first AND v_last;
+
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        p_target,
+        energy_bucket(p_target, bucket_start),
+        SUM(samples),
+        MIN(min_power_watts),
+        MAX(max_power_watts),
+        SUM(avg_power_watts * samples) / NULLIF(SUM(samples), 0),
+        SUM(energy_delta_kwh)
+    FROM energy_rollups
+    WHERE resolution = p_source
+      AND energy_bucket(p_target, bucket_start) BETWEEN v_first AND v_last
+    GROUP BY device_id, energy_bucket(p_target, bucket_start);
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular todas as resoluções para as leituras em [p_from, p_to)
+CREATE OR REPLACE FUNCTION rebuild_energy_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER AS $$
+DECLARE
+    v_from TIMESTAMP := energy_bucket(
+        '15m', GREATEST(p_from, energy_readings_retained_from())
+    );
+    v_to TIMESTAMP := energy_bucket('15m', p_to - interval '1 microsecond')
+        + interval '15 minutes';
+    total INTEGER;
+BEGIN
+    IF v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    DELETE FROM energy_rollups
+    WHERE resolution = '15m'
+      AND bucket_start >= v_from
+      AND bucket_start < v_to;
+
+    -- energy_today_kwh é um acumulado que zera à meia-noite: a energia de
+    -- cada leitura é a diferença para a anterior do mesmo dia e do mesmo
+    -- contador. Leituras ao vivo e de preenchimento de lacunas continuam o
+    -- contador da tomada; cada importação do histórico (tapo_history_*) tem
+    -- o seu, e só entra nos buckets sem nenhuma outra leitura
+    INSERT INTO energy_rollups (
+        device_id, resolution, bucket_start, samples, min_power_watts,
+        max_power_watts, avg_power_watts, energy_delta_kwh
+    )
+    SELECT
+        device_id,
+        '15m',
+        bucket_start,
+        SUM(samples),
+        MIN(power_watts),
+        MAX(power_watts),
+        SUM(power_watts * samples) / SUM(samples),
+        COALESCE(SUM(energy_increment), 0)
+    FROM (
+        SELECT
+            *,
+            BOOL_AND(history) OVER (
+                PARTITION BY device_id, bucket_start
+            ) AS history_only
+        FROM (
+            SELECT
+                device_id,
+                energy_bucket('15m', timestamp) AS bucket_start,
+                power_watts,
+                samples,
+                history,
+                CASE
+                    WHEN prev_timestamp IS NULL
+                      OR prev_timestamp::date <> timestamp::date
+                        THEN energy_today_kwh
+                    ELSE GREATEST(energy_today_kwh - prev_energy, 0)
+                END AS energy_increment
+            FROM (
+                SELECT
+                    device_id,
+                    timestamp,
+                    power_watts,
+                    samples,
+                    energy_today_kwh,
+                    COALESCE(data_source LIKE 'tapo\_history\_%', false)
+                        AS history,
+                    LAG(timestamp) OVER w AS prev_timestamp,
+                    LAG(energy_today_kwh) OVER w AS prev_energy
+                FROM energy_readings
+                WHERE device_id IS NOT NULL
+                  AND timestamp >= v_from - interval '1 day'
+                  AND timestamp < v_to
+                WINDOW w AS (
+                    PARTITION BY device_id,
+                        CASE
+                            WHEN data_source LIKE 'tapo\_history\_%'
+                                THEN data_source
+                        END
+                    ORDER BY timestamp
+                )
+            ) AS with_previous
+            WHERE timestamp >= v_from
+        ) AS increments
+    ) AS by_bucket
+    WHERE history_only OR NOT history
+    GROUP BY device_id, bucket_start;
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+
+    total := total + rebuild_energy_rollup_level('1h', '15m', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1d', '1h', v_from, v_to);
+    total := total + rebuild_energy_rollup_level('1mo', '1d', v_from, v_to);
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Processar as leituras a partir da marca d'água (chamado periodicamente)
+CREATE OR REPLACE FUNCTION run_energy_rollups()
+RETURNS INTEGER AS $$
+DECLARE
+    v_watermark TIMESTAMP;
+    v_max TIMESTAMP;
+    total INTEGER := 0;
+BEGIN
+    -- O lock faz inserts concorrentes de leituras antigas aguardarem e
+    -- rebaixarem a marca d'água depois desta execução
+    SELECT watermark INTO v_watermark
+    FROM rollup_state
+    WHERE name = 'energy_rollups'
+    FOR UPDATE;
+
+    SELECT MAX(timestamp) INTO v_max FROM energy_readings;
+    IF v_max IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    IF v_watermark IS NULL THEN
+        SELECT MIN(timestamp) INTO v_watermark FROM energy_readings;
+    END IF;
+
+    IF v_watermark <= v_max THEN
+        total := rebuild_energy_rollups(v_watermark, v_max + interval '1 microsecond');
+    END IF;
+
+    -- O último bucket pode estar incompleto: é recalculado na próxima execução
+    UPDATE rollup_state
+    SET watermark = v_max, last_run_at = CURRENT_TIMESTAMP
+    WHERE name = 'energy_rollups';
+
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Leituras inseridas com timestamp anterior à marca d'água (spool, importações)
+-- rebaixam a marca para que a próxima execução as inclua
+CREATE OR REPLACE FUNCTION energy_rollups_mark_dirty()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('casa.skip_rollup_triggers', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE rollup_state
+    SET watermark = (SELECT MIN(timestamp) FROM new_rows)
+    WHERE name = 'energy_rollups'
+      AND watermark > (SELECT MIN(timestamp) FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_energy_rollups_mark_dirty ON energy_readings;
+CREATE TRIGGER trg_energy_rollups_mark_dirty
+    AFTER INSERT ON energy_readings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION energy_rollups_mark_dirty();
+
+-- Descartar partições inteiras anteriores a p_retention_months meses, desde
+-- que os agregados já cubram todo o período (marca d'água de energy_rollups)
+CREATE OR REPLACE FUNCTION drop_expired_energy_partitions(p_retention_months INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_cutoff TIMESTAMP;
+    v_rolled_up TIMESTAMP;
+    v_end TIMESTAMP;
+    partition_name TEXT;
+BEGIN
+    IF p_retention_months IS NULL OR p_retention_months <= 0 THEN
+        RETURN;
+    END IF;
+
+    SELECT watermark INTO v_rolled_up
+    FROM rollup_state
+    WHERE name = 'energy_rollups';
+    IF v_rolled_up IS NULL THEN
+        RETURN;
+    END IF;
+
+    v_cutoff := LEAST(
+        date_trunc('month', CURRENT_TIMESTAMP)
+            - make_interval(months => p_retention_months),
+        energy_bucket('1d', v_rolled_up)
+    );
+
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'energy_readings'::regclass
+          AND c.relname ~ '^energy_readings_p[0-9]{4}_[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        v_end := to_date(right(partition_name, 7), 'YYYY_MM') + interval '1 month';
+        EXIT WHEN v_end > v_cutoff;
+
+        EXECUTE format('DROP TABLE %I', partition_name);
+        UPDATE rollup_state
+        SET watermark = GREATEST(COALESCE(watermark, v_end), v_end),
+            last_run_at = CURRENT_TIMESTAMP
+        WHERE name = 'energy_readings_retention';
+        RETURN NEXT partition_name;
+    END LOOP;
+
+    -- Leituras antigas que caíram na partição default
+    DELETE FROM energy_readings_default
+    WHERE timestamp < energy_readings_retained_from();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Manutenção periódica: partições dos próximos meses + retenção
+CREATE OR REPLACE FUNCTION maintain_energy_readings(
+    p_retention_months INTEGER DEFAULT 0,
+    p_months_ahead INTEGER DEFAULT 2
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_created TEXT[] := ARRAY[]::TEXT[];
+    v_dropped TEXT[];
+    i INTEGER;
+BEGIN
+    FOR i IN 0..GREATEST(p_months_ahead, 0) LOOP
+        v_created := v_created || ensure_energy_readings_partition(
+            (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date
+        );
+    END LOOP;
+
+    v_dropped := ARRAY(SELECT drop_expired_energy_partitions(p_retention_months));
+
+    RETURN jsonb_build_object('partitions', v_created, 'dropped', v_dropped);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT maintain_energy_readings();
+
 -- Inserir dispositivos iniciais (incluindo os 2 dispositivos TAPO reais)
 INSERT INTO devices (name, type, ip_address, location, equipment_connected, is_active)
 VALUES 
@@ -94,6 +601,9 @@ ON CONFLICT DO NOTHING;
 -- Habilitar Row Level Security (RLS) - Opcional, mas recomendado
 ALTER TABLE devices ENABLE ROW LEVEL SECURITY;
 ALTER TABLE energy_readings ENABLE ROW LEVEL SECURITY;
+ALTER TABLE energy_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE energy_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_state ENABLE ROW LEVEL SECURITY;
 ALTER TABLE alerts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reports ENABLE ROW LEVEL SECURITY;
 ALTER TABLE daily_reports ENABLE ROW LEVEL SECURITY;
@@ -102,6 +612,9 @@ ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 -- Criar políticas para permitir acesso via service role
 CREATE POLICY "Enable all access for service role" ON devices FOR ALL USING (true);
 CREATE POLICY "Enable all access for service role" ON energy_readings FOR ALL USING (true);
+CREATE POLICY "Enable all access for service role" ON energy_daily FOR ALL USING (true);
+CREATE POLICY "Enable all access for service role" ON energy_rollups FOR ALL USING (true);
+CREATE POLICY "Enable all access for service role" ON rollup_state FOR ALL USING (true);
 CREATE POLICY "Enable all access for service role" ON alerts FOR ALL USING (true);
 CREATE POLICY "Enable all access for service role" ON reports FOR ALL USING (true);
 CREATE POLICY "Enable all access for service role" ON daily_reports FOR ALL USING (true);
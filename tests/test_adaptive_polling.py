@@ -0,0 +1,87 @@
+"""
+Testes para o intervalo de coleta adaptativo
+"""
+
+from src.services.adaptive_polling import AdaptivePollingScheduler
+
+DEVICE = {"id": 1, "name": "Purificador"}
+
+
+def make_scheduler(**kwargs):
+    params = dict(
+        min_interval=60,
+        max_interval=1800,
+        initial_interval=900,
+        backoff=2.0,
+        change_ratio=0.2,
+        change_watts=5.0,
+        alert_margin=0.8,
+        tick_seconds=5,
+    )
+    params.update(kwargs)
+    return AdaptivePollingScheduler(**params)
+
+
+def test_stable_readings_back_off_to_maximum():
+    scheduler = make_scheduler()
+
+    intervals = [scheduler.observe(DEVICE, 40.0 + i % 2, now=0) for i in range(4)]
+
+    assert intervals == [900, 1800, 1800, 1800]
+
+
+def test_power_change_polls_at_minimum_then_backs_off():
+    scheduler = make_scheduler()
+    scheduler.observe(DEVICE, 40.0, now=0)
+
+    assert scheduler.observe(DEVICE, 120.0, now=0) == 60
+    assert scheduler.observe(DEVICE, 121.0, now=0) == 120
+    assert scheduler.observe(DEVICE, 2.0, now=0) == 60
+
+
+def test_standby_noise_is_not_a_change():
+    scheduler = make_scheduler()
+    scheduler.observe(DEVICE, 0.5, now=0)
+
+    assert scheduler.observe(DEVICE, 2.5, now=0) == 1800
+
+
+def test_near_alert_threshold_polls_at_minimum():
+    scheduler = make_scheduler()
+    scheduler.observe(DEVICE, 100.0, now=0)
+
+    assert scheduler.observe(DEVICE, 104.0, alert_level=200.0, now=0) == 1800
+    assert scheduler.observe(DEVICE, 165.0, alert_level=200.0, now=0) == 60
+
+
+def test_per_device_bounds_override_defaults():
+    scheduler = make_scheduler()
+    device = {"id": 2, "min_poll_seconds": 300, "max_poll_seconds": 600}
+    scheduler.observe(device, 10.0, now=0)
+
+    assert scheduler.observe(device, 10.0, now=0) == 600
+    assert scheduler.observe(device, 500.0, now=0) == 300
+
+
+def test_global_maximum_caps_device_bounds():
+    scheduler = make_scheduler()
+
+    assert scheduler.bounds({"id": 3, "max_poll_seconds": 7200}) == (60, 1800)
+    assert scheduler.bounds({"id": 4, "min_poll_seconds": 3600}) == (1800, 1800)
+
+
+def test_due_groups_devices_within_tick_and_reschedules():
+    scheduler = make_scheduler()
+    other = {"id": 2}
+
+    assert scheduler.due([DEVICE, other], now=0) == [DEVICE, other]
+    scheduler.observe(DEVICE, 10.0, now=0)
+    scheduler.observe(DEVICE, 90.0, now=0)  # -> 60 s
+    scheduler.observe(other, 10.0, now=2)  # -> 900 s
+
+    assert scheduler.due([DEVICE, other], now=30) == []
+    assert scheduler.seconds_until_due([DEVICE, other], now=30) == 30
+    assert scheduler.due([DEVICE, other], now=56) == [DEVICE]
+    # Sem leitura (falha), o dispositivo volta no mesmo intervalo
+    assert scheduler.seconds_until_due([DEVICE], now=56) == 60
+    assert scheduler.stats()["polls_per_hour"] == 64.0
@@ -0,0 +1,74 @@
+"""
+Testes para o detector de anomalias em tempo real
+"""
+
+from src.services.anomaly_detector import StreamingAnomalyDetector
+
+
+def make_detector(**overrides):
+    """Detector com parâmetros fixos (independentes do .env)"""
+    options = {
+        "threshold": 2.0,
+        "alpha": 0.1,
+        "min_zscore": 3.0,
+        "warmup_samples": 10,
+        "min_power_watts": 5.0,
+        "cooldown_seconds": 600,
+    }
+    options.update(overrides)
+    return StreamingAnomalyDetector(**options)
+
+
+def feed(detector, values, device_id=1, start=0.0, step=60.0):
+    """Enviar leituras em sequência e devolver os alertas gerados"""
+    return [
+        alert
+        for i, value in enumerate(values)
+        if (alert := detector.update(device_id, value, now=start + i * step))
+    ]
+
+
+class TestStreamingAnomalyDetector:
+    """Testes de StreamingAnomalyDetector"""
+
+    def test_spike_raises_alert(self):
+        """Pico muito acima da média estável gera alerta"""
+        detector = make_detector()
+        alerts = feed(detector, [50 + (i % 3) for i in range(30)] + [400])
+
+        assert len(alerts) == 1
+        assert alerts[0]["device_id"] == 1
+        assert alerts[0]["current_consumption"] == 400
+        assert alerts[0]["anomaly_factor"] >= 2.0
+
+    def test_no_alert_during_warmup(self):
+        """Sem histórico suficiente não há alerta"""
+        detector = make_detector()
+
+        assert feed(detector, [50] * 5 + [400]) == []
+
+    def test_cycling_device_is_not_anomalous(self):
+        """Equipamento que alterna ligado/desligado não dispara alertas"""
+        detector = make_detector()
+
+        assert feed(detector, [0, 0, 0, 120, 120] * 20) == []
+
+    def test_cooldown_between_alerts(self):
+        """Picos seguidos do mesmo dispositivo geram um único alerta"""
+        detector = make_detector()
+        feed(detector, [50] * 30)
+
+        alerts = feed(detector, [400, 50, 50, 400], start=10_000)
+
+        assert len(alerts) == 1
+        assert detector.alerts_raised == 1
+
+    def test_devices_are_independent(self):
+        """Cada dispositivo tem suas próprias estatísticas"""
+        detector = make_detector()
+        feed(detector, [50] * 30, device_id=1)
+        feed(detector, [500] * 30, device_id=2)
+
+        assert feed(detector, [500], device_id=2, start=10_000) == []
+        assert detector.snapshot(1)["mean_power_watts"] == 50
+        assert detector.snapshot(3) is None
@@ -0,0 +1,197 @@
+"""
+Testes para o preenchimento de lacunas com o histórico das tomadas
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from tapo.requests import EnergyDataInterval
+
+from src.integrations.tapo_client import TapoClient
+from src.services.backfill import (
+    SOURCE_BACKFILL,
+    BackfillScheduler,
+    contiguous_runs,
+    default_max_row_gap_seconds,
+    missing_hours,
+)
+from src.utils.config import settings
+
+DAY = datetime(2024, 5, 20)
+DEVICE = {"id": 1, "name": "Geladeira", "type": "TAPO"}
+
+
+def hours(*offsets):
+    return [DAY + timedelta(hours=h) for h in offsets]
+
+
+class FakeTapoClient:
+    """Dispositivo com 100 Wh por hora, registrando as consultas"""
+
+    def __init__(self, missing=(), delay=0.0):
+        self.requests = []
+        self.missing = set(missing)
+        self.delay = delay
+
+    async def get_energy_history(self, device_name, interval, start, end=None):
+        self.requests.append((interval, start, end))
+        await asyncio.sleep(self.delay)
+        return [
+            (start + timedelta(hours=h), 100.0)
+            for h in range(24)
+            if start + timedelta(hours=h) not in self.missing
+        ]
+
+
+class FakeTapoDevice:
+    """Handler de tomada do ``tapo`` com 100 Wh por hora (horários em UTC)"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_energy_data(self, interval, start_date, end_date=None):
+        self.calls.append((interval, start_date, end_date))
+        start = start_date.replace(tzinfo=timezone.utc)
+        return SimpleNamespace(
+            entries=[
+                SimpleNamespace(start_date_time=start + timedelta(hours=h), energy=100)
+                for h in range(24)
+            ]
+        )
+
+
+class FakeSupabase:
+    """Buckets de 1h e leituras anteriores às lacunas"""
+
+    def __init__(self, present, previous=None):
+        self.present = present
+        self.previous = previous
+        self.rows = []
+
+    async def select_all(self, table, filters, **kwargs):
+        assert table == "energy_rollups"
+        return [{"bucket_start": h.isoformat()} for h in self.present]
+
+    async def select(self, table, filters, **kwargs):
+        assert table == "energy_readings"
+        return [self.previous] if self.previous else []
+
+    async def upsert_energy_readings(self, rows):
+        self.rows += rows
+        return [True] * len(rows)
+
+
+def scheduler_for(tapo, supabase, **kwargs):
+    kwargs.setdefault("max_row_gap_seconds", 0)
+    return BackfillScheduler(
+        tapo,
+        supabase=supabase,
+        lookback_hours=24 * 365 * 100,
+        settle_hours=0,
+        request_interval_seconds=0,
+        **kwargs,
+    )
+
+
+def test_missing_hours_only_inside_collected_range():
+    assert missing_hours(hours(2, 3, 6, 8)) == hours(4, 5, 7)
+    assert missing_hours([]) == []
+
+
+def test_short_empty_runs_are_normal_row_spacing(monkeypatch):
+    # Heartbeat de 30 min + coleta a cada 30 min: uma hora vazia é normal
+    monkeypatch.setattr(settings, "reading_heartbeat_seconds", 1800.0)
+    monkeypatch.setattr(settings, "collector_max_interval_seconds", 1800.0)
+    max_gap = default_max_row_gap_seconds()
+
+    assert max_gap > 3600
+    assert missing_hours(hours(0, 2, 5, 6), max_gap) == hours(3, 4)
+    assert missing_hours(hours(0, 2), 7200) == []
+    assert contiguous_runs(hours(4, 5, 7)) == [hours(4, 5), hours(7)]
+
+
+@pytest.mark.asyncio
+async def test_fills_gaps_continuing_daily_counter():
+    tapo = FakeTapoClient()
+    supabase = FakeSupabase(
+        hours(8, 9, 12),
+        previous={
+            # Como o PostgREST devolve: sem zeros finais na fração de segundo
+            "timestamp": "2024-05-20T09:59:30.12",
+            "energy_today_kwh": 1.5,
+        },
+    )
+    scheduler = scheduler_for(tapo, supabase)
+
+    assert await scheduler.run_once([DEVICE]) == {"Geladeira": 2}
+
+    assert tapo.requests == [("hourly", DAY, DAY)]
+    assert [r["timestamp"] for r in supabase.rows] == [
+        h.isoformat() for h in hours(10, 11)
+    ]
+    assert [r["energy_today_kwh"] for r in supabase.rows] == [1.6, 1.7]
+    assert {r["data_source"] for r in supabase.rows} == {SOURCE_BACKFILL}
+
+
+@pytest.mark.asyncio
+async def test_one_request_per_day_and_budget_per_run():
+    tapo = FakeTapoClient()
+    present = hours(0, 30, 60)  # lacunas em três dias
+    scheduler = scheduler_for(tapo, FakeSupabase(present), max_requests_per_run=2)
+
+    await scheduler.run_once([DEVICE, {"id": 2, "name": "Tuya", "type": "TUYA"}])
+
+    assert [start for _, start, _ in tapo.requests] == [
+        DAY,
+        DAY + timedelta(days=1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hours_missing_on_device_are_not_requested_again():
+    tapo = FakeTapoClient(missing=hours(5))
+    scheduler = scheduler_for(tapo, FakeSupabase(hours(4, 6)))
+
+    assert await scheduler.run_once([DEVICE]) == {}
+    assert await scheduler.run_once([DEVICE]) == {}
+
+    assert len(tapo.requests) == 1
+    assert scheduler.stats()["unfillable_hours"] == 1
+
+
+@pytest.mark.asyncio
+async def test_collection_cycle_preempts_history_request():
+    tapo = FakeTapoClient(delay=0.05)
+    supabase = FakeSupabase(hours(4, 6))
+    scheduler = scheduler_for(tapo, supabase)
+
+    run = asyncio.create_task(scheduler.run_once([DEVICE]))
+    await asyncio.sleep(0.01)  # consulta em andamento
+    async with scheduler.live_polling():
+        await asyncio.sleep(0.01)
+        assert len(tapo.requests) == 1  # nada novo durante o ciclo
+
+    assert await run == {"Geladeira": 1}
+    assert len(tapo.requests) == 2
+    assert scheduler.stats()["preempted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fills_gaps_through_real_tapo_client():
+    device = FakeTapoDevice()
+    tapo = TapoClient("user", "password")
+    tapo.devices[DEVICE["name"]] = device
+    supabase = FakeSupabase(hours(0, 3))
+    scheduler = scheduler_for(tapo, supabase)
+
+    assert await scheduler.run_once([DEVICE]) == {"Geladeira": 2}
+
+    assert len(device.calls) == 1
+    interval, start, end = device.calls[0]
+    assert interval == EnergyDataInterval.Hourly
+    assert (start, end) == (DAY, DAY)
+    assert [r["timestamp"] for r in supabase.rows] == [
+        h.isoformat() for h in hours(1, 2)
+    ]
@@ -0,0 +1,104 @@
+"""
+Testes para o agente coletor
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.agents.collector import EnergyCollector
+from src.utils.config import settings
+
+DEVICE = {"id": 1, "name": "Geladeira", "type": "TAPO"}
+
+
+class FakeSupabase:
+    """Upsert em memória"""
+
+    def __init__(self, available=True):
+        self.available = available
+        self.rows = []
+
+    async def upsert_energy_readings(self, rows):
+        if not self.available:
+            return [False] * len(rows)
+        self.rows += rows
+        return [True] * len(rows)
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "spool_path", str(tmp_path / "spool.db"))
+    collector = EnergyCollector()
+    collector.supabase = FakeSupabase()
+    collector.reading_buffer.max_batch_size = 1
+    powers = iter([40.0, 40.0, 120.0])
+
+    async def read_device(device):
+        return {
+            "device_id": device["id"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "power_watts": next(powers),
+            "energy_today_kwh": 0.5,
+            "device_on": True,
+            "data_source": "tapo_local",
+        }
+
+    monkeypatch.setattr(collector, "_read_device", read_device)
+    return collector
+
+
+@pytest.mark.asyncio
+async def test_both_collection_paths_adjust_the_poll_interval(collector):
+    interval = collector.polling.initial_interval
+
+    assert await collector.collect_device_data(DEVICE)
+    assert collector.polling.states[1].last_power == 40.0
+
+    assert await collector.collect_device_data(DEVICE)
+    assert collector.polling.states[1].interval == interval * 2
+
+    reading, saved = await collector._collect_with_limits(DEVICE, asyncio.Semaphore(1))
+    assert await saved
+    assert reading["power_watts"] == 120.0
+    assert collector.polling.states[1].interval == collector.polling.min_interval
+    assert collector.supabase.rows[0]["device_on"] is True
+
+
+@pytest.mark.asyncio
+async def test_reading_is_spooled_before_the_batch_is_sent(collector):
+    collector.reading_buffer.max_batch_size = 100
+    reading = await collector._read_device(DEVICE)
+
+    saved = await collector._submit_reading(reading)
+
+    assert collector.spool.depth() == 1
+    await collector.reading_buffer.flush()
+    assert await saved
+    assert collector.spool.depth() == 0
+    assert "_spool_id" not in collector.supabase.rows[0]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_stays_in_spool_for_the_drainer(collector):
+    collector.supabase.available = False
+
+    assert not await collector.collect_device_data(DEVICE)
+    assert collector.spool.depth() == 1
+
+    collector.supabase.available = True
+    assert await collector.spool.drain(collector.supabase.upsert_energy_readings) == 1
+    assert collector.spool.depth() == 0
+    assert collector.supabase.rows[0]["power_watts"] == 40.0
+
+
+@pytest.mark.asyncio
+async def test_stop_spools_readings_held_by_the_deadband(collector):
+    await collector.collect_device_data(DEVICE)
+    await collector.collect_device_data(DEVICE)  # suprimida: potência igual
+    assert collector.spool.depth() == 0
+
+    collector.stop_collection()
+
+    assert [row["samples"] for _, row in collector.spool.peek(10)] == [1]
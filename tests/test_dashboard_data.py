@@ -0,0 +1,166 @@
+"""
+Testes para a camada de dados do dashboard
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.integrations.supabase_client import SupabaseError
+from src.services.dashboard_data import (
+    CachedDataset,
+    DashboardDataStore,
+    append_since,
+)
+
+
+class FakeClient:
+    """Cliente Supabase em memória que registra as consultas"""
+
+    def __init__(self, readings):
+        self.readings = readings
+        self.queries = []
+
+    def select_all(self, table, filters=None, order=None, raise_errors=False):
+        since = dict(filters)["timestamp"].removeprefix("gte.")
+        self.queries.append((table, since))
+        return [r for r in self.readings if r["timestamp"] >= since]
+
+
+def reading(reading_id, timestamp, power):
+    return {
+        "id": reading_id,
+        "device_id": 1,
+        "timestamp": timestamp.isoformat(),
+        "power_watts": power,
+    }
+
+
+class TestAppendSince:
+    """Testes da atualização incremental"""
+
+    def test_fetches_from_last_timestamp_and_replaces_duplicates(self):
+        """Só busca a partir do último horário e mantém a versão nova"""
+        start = datetime(2024, 1, 1)
+        fetched = []
+
+        def fetch(rows):
+            def inner(since):
+                fetched.append(since)
+                return rows
+
+            return inner
+
+        first = append_since(
+            None,
+            fetch([{"id": 1, "timestamp": "2024-01-01T00:10:00", "v": 1}]),
+            "timestamp",
+            ["id"],
+            start,
+        )
+        second = append_since(
+            first,
+            fetch(
+                [
+                    {"id": 1, "timestamp": "2024-01-01T00:10:00", "v": 2},
+                    {"id": 2, "timestamp": "2024-01-01T00:20:00", "v": 3},
+                ]
+            ),
+            "timestamp",
+            ["id"],
+            start,
+        )
+
+        assert fetched == [start, datetime(2024, 1, 1, 0, 10)]
+        assert second["v"].tolist() == [2, 3]
+
+    def test_drops_rows_outside_window(self):
+        """Linhas anteriores ao início da janela saem do cache"""
+        previous = append_since(
+            None,
+            lambda since: [{"id": 1, "timestamp": "2024-01-01T00:00:00"}],
+            "timestamp",
+            ["id"],
+            datetime(2024, 1, 1),
+        )
+        frame = append_since(
+            previous,
+            lambda since: [{"id": 2, "timestamp": "2024-01-02T00:00:00"}],
+            "timestamp",
+            ["id"],
+            datetime(2024, 1, 1, 12),
+        )
+
+        assert frame["id"].tolist() == [2]
+
+
+class TestCachedDataset:
+    """Testes do cache com TTL"""
+
+    def test_serves_cached_value_within_ttl(self):
+        """Dentro do TTL o loader não é chamado de novo"""
+        calls = []
+        dataset = CachedDataset(
+            lambda previous: calls.append(previous) or len(calls), 60
+        )
+
+        assert dataset.get() == 1
+        assert dataset.get() == 1
+        assert calls == [None]
+
+    def test_keeps_last_value_on_error(self):
+        """Falha na atualização mantém o último valor obtido"""
+        values = iter([1])
+
+        def loader(previous):
+            try:
+                return next(values)
+            except StopIteration:
+                raise SupabaseError("fora do ar")
+
+        dataset = CachedDataset(loader, 0)
+        assert dataset.get() == 1
+        assert dataset.get() == 1
+        assert dataset.error == "fora do ar"
+
+    def test_raises_without_cached_value(self):
+        """Sem valor em cache o erro chega a quem chamou"""
+
+        def loader(previous):
+            raise SupabaseError("fora do ar")
+
+        with pytest.raises(SupabaseError):
+            CachedDataset(loader, 60).get()
+
+
+class TestDashboardDataStore:
+    """Testes do DashboardDataStore"""
+
+    def test_recent_readings_are_incremental(self):
+        """Atualizações buscam só a partir da última leitura em cache"""
+        now = datetime.utcnow().replace(microsecond=0)
+        client = FakeClient([reading(1, now - timedelta(minutes=10), 10.0)])
+        store = DashboardDataStore(
+            client,
+            refresh_interval_seconds=0,
+            readings_window_hours=1,
+            full_reload_seconds=3600,
+        )
+
+        assert store.recent_readings()["id"].tolist() == [1]
+
+        client.readings.append(reading(2, now, 20.0))
+        frame = store.recent_readings()
+
+        assert frame["id"].tolist() == [1, 2]
+        assert client.queries[1][1] == (now - timedelta(minutes=10)).isoformat()
+
+    def test_refresh_due_skips_idle_datasets(self):
+        """Conjuntos sem acesso recente não são atualizados em background"""
+        client = FakeClient([])
+        store = DashboardDataStore(client, refresh_interval_seconds=0, idle_seconds=-1)
+        store.recent_readings()
+
+        store.refresh_due()
+
+        assert len(client.queries) == 1
@@ -0,0 +1,61 @@
+"""
+Testes para a redução de pontos dos gráficos
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.services.downsampling import chart_buckets, minmax_downsample
+
+
+def series(points, device_id=1, spike_at=None):
+    """Série de potência por minuto, com um pico opcional"""
+    power = np.full(points, 50.0)
+    if spike_at is not None:
+        power[spike_at] = 2000.0
+    return pd.DataFrame(
+        {
+            "device_id": device_id,
+            "timestamp": pd.date_range("2024-01-01", periods=points, freq="1min"),
+            "power_watts": power,
+        }
+    )
+
+
+class TestMinmaxDownsample:
+    """Testes de minmax_downsample"""
+
+    def test_small_series_unchanged(self):
+        """Séries dentro do orçamento não são alteradas"""
+        frame = series(100)
+
+        assert minmax_downsample(frame, "power_watts", buckets=50).equals(frame)
+
+    def test_reduces_points_and_keeps_peak(self):
+        """Série longa fica com até dois pontos por intervalo, com o pico"""
+        frame = series(100_000, spike_at=54_321)
+
+        result = minmax_downsample(frame, "power_watts", buckets=500)
+
+        assert len(result) <= 2 * 500 + 2
+        assert result["power_watts"].max() == 2000.0
+        assert result["timestamp"].iloc[0] == frame["timestamp"].iloc[0]
+        assert result["timestamp"].iloc[-1] == frame["timestamp"].iloc[-1]
+        assert result["timestamp"].is_monotonic_increasing
+
+    def test_per_group(self):
+        """Cada série é reduzida separadamente"""
+        frame = pd.concat(
+            [series(10_000, 1, spike_at=10), series(30, 2)], ignore_index=True
+        )
+
+        result = minmax_downsample(frame, "power_watts", by="device_id", buckets=100)
+
+        assert (result["device_id"] == 2).sum() == 30
+        assert (result["device_id"] == 1).sum() <= 202
+        assert result.loc[result["device_id"] == 1, "power_watts"].max() == 2000.0
+
+    def test_chart_buckets(self):
+        """Dois pontos por intervalo: um intervalo a cada dois pixels"""
+        assert chart_buckets(1200) == 600
+        assert chart_buckets(1) == 1
@@ -0,0 +1,140 @@
+"""
+Testes para a integração de energia a partir de amostras de potência
+"""
+
+import pandas as pd
+import pytest
+
+from src.services.energy_integration import (
+    SOURCE_COUNTER,
+    SOURCE_GAP,
+    SOURCE_POWER,
+    energy_by_period,
+    integrate_energy,
+)
+from src.utils.config import settings
+
+
+def make_frame(samples, device_id=1):
+    """Montar leituras a partir de (horário, potência, contador)"""
+    return pd.DataFrame(
+        {
+            "device_id": device_id,
+            "timestamp": pd.to_datetime([s[0] for s in samples]),
+            "power_watts": [float(s[1]) for s in samples],
+            "energy_today_kwh": [s[2] for s in samples],
+        }
+    )
+
+
+class TestIntegrateEnergy:
+    """Testes de integrate_energy"""
+
+    def test_power_only_trapezoid(self):
+        """Sem contador, a energia é o trapézio da potência"""
+        frame = integrate_energy(
+            make_frame(
+                [
+                    ("2024-01-01 00:00", 100, None),
+                    ("2024-01-01 00:10", 200, None),
+                    ("2024-01-01 00:20", 200, None),
+                ]
+            ),
+            max_interpolation_seconds=900,
+        )
+
+        assert frame["energy_kwh"].sum() == pytest.approx(
+            (150 + 200) * (10 / 60) / 1000
+        )
+        assert list(frame["energy_source"][1:]) == [SOURCE_POWER, SOURCE_POWER]
+
+    def test_default_limit_follows_max_poll_interval(self, monkeypatch):
+        """Leituras no intervalo máximo de coleta não viram lacuna"""
+        monkeypatch.setattr(settings, "energy_max_interpolation_seconds", None)
+        monkeypatch.setattr(settings, "collector_max_interval_seconds", 1800.0)
+        samples = [
+            ("2024-01-01 00:00", 100, None),
+            ("2024-01-01 00:30", 100, None),
+            ("2024-01-01 01:30", 100, None),
+        ]
+
+        frame = integrate_energy(make_frame(samples))
+
+        assert list(frame["energy_source"][1:]) == [SOURCE_POWER, SOURCE_GAP]
+
+    def test_gap_is_not_interpolated(self):
+        """Intervalos acima do limite não são integrados"""
+        frame = integrate_energy(
+            make_frame(
+                [
+                    ("2024-01-01 00:00", 100, None),
+                    ("2024-01-01 02:00", 100, None),
+                    ("2024-01-01 02:10", 100, None),
+                ]
+            ),
+            max_interpolation_seconds=900,
+        )
+
+        assert frame["energy_source"][1] == SOURCE_GAP
+        assert frame["energy_kwh"][1] == 0
+        assert frame["gap_hours"].sum() == pytest.approx(2)
+        assert frame["energy_kwh"].sum() == pytest.approx(100 * (10 / 60) / 1000)
+
+    def test_counter_with_reset(self):
+        """O contador é usado quando presente; uma queda é tratada como reset"""
+        frame = integrate_energy(
+            make_frame(
+                [
+                    ("2024-01-01 23:50", 100, 1.20),
+                    ("2024-01-02 00:00", 100, 1.25),
+                    ("2024-01-02 00:10", 100, 0.02),
+                    ("2024-01-02 03:00", 100, 0.30),
+                ]
+            ),
+            max_interpolation_seconds=900,
+        )
+
+        assert list(frame["energy_kwh"][1:]) == pytest.approx([0.05, 0.02, 0.28])
+        assert (frame["energy_source"][1:] == SOURCE_COUNTER).all()
+        assert frame["gap_hours"].sum() == 0  # O contador cobre a lacuna
+
+    def test_counter_stuck_at_zero_falls_back_to_power(self):
+        """Contador sempre zero (tomada sem medição de energia) usa a potência"""
+        frame = integrate_energy(
+            make_frame([("2024-01-01 00:00", 60, 0.0), ("2024-01-01 00:10", 60, 0.0)]),
+            max_interpolation_seconds=900,
+        )
+
+        assert frame["energy_source"][1] == SOURCE_POWER
+        assert frame["energy_kwh"][1] == pytest.approx(0.01)
+
+    def test_devices_are_independent(self):
+        """O intervalo não atravessa leituras de dispositivos diferentes"""
+        frame = pd.concat(
+            [
+                make_frame([("2024-01-01 00:00", 100, None)], device_id=1),
+                make_frame([("2024-01-01 00:05", 100, None)], device_id=2),
+            ],
+            ignore_index=True,
+        )
+
+        assert integrate_energy(frame)["energy_kwh"].sum() == 0
+
+
+def test_energy_by_period_coverage():
+    """Energia e cobertura por hora"""
+    frame = integrate_energy(
+        make_frame(
+            [
+                ("2024-01-01 00:00", 100, None),
+                ("2024-01-01 00:30", 100, None),
+                ("2024-01-01 01:00", 100, None),
+            ]
+        ),
+        max_interpolation_seconds=3600,
+    )
+
+    periods = energy_by_period(frame, "1h").loc[1]
+
+    assert periods["energy_kwh"].sum() == pytest.approx(0.1)
+    assert periods["coverage"].iloc[0] == pytest.approx(0.5)
@@ -4,10 +4,11 @@ Testes para o serviço de análise de energia
 
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, patch
 
-from src.services.energy_service import EnergyAnalysisService
-from src.models.database import Device, EnergyReading, DailyReport
+from src.services import energy_service as energy_module
+from src.services.energy_service import EnergyAnalysisService, readings_frame
+from src.services.live_status import LiveStatusBoard
 
 
 @pytest.fixture
@@ -18,34 +19,82 @@ def energy_service():
 
 @pytest.fixture
 def mock_device():
-    """Fixture para dispositivo mock"""
-    device = Mock(spec=Device)
-    device.id = 1
-    device.name = "Geladeira"
-    device.type = "TAPO"
-    device.location = "Cozinha"
-    device.equipment_connected = "Geladeira Consul"
-    return device
+    """Fixture para dispositivo (linha da tabela devices)"""
+    return {
+        "id": 1,
+        "name": "Geladeira",
+        "type": "TAPO",
+        "location": "Cozinha",
+        "equipment_connected": "Geladeira Consul",
+        "is_active": True,
+    }
 
 
 @pytest.fixture
 def mock_energy_readings():
-    """Fixture para leituras de energia mock"""
+    """Fixture para leituras de energia (linhas de energy_readings)"""
     readings = []
-    base_time = datetime.utcnow()
+    base_time = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
 
     for i in range(24):  # 24 horas de dados
         for j in range(4):  # 4 leituras por hora
-            reading = Mock(spec=EnergyReading)
-            reading.timestamp = base_time + timedelta(hours=i, minutes=j * 15)
-            reading.power_watts = 50 + (i * 2) + (j * 0.5)  # Consumo variando
-            reading.voltage = 220
-            reading.current = reading.power_watts / 220
-            readings.append(reading)
+            power = 50 + (i * 2) + (j * 0.5)  # Consumo variando
+            readings.append(
+                {
+                    "device_id": 1,
+                    "timestamp": (
+                        base_time + timedelta(hours=i, minutes=j * 15)
+                    ).isoformat(),
+                    "power_watts": power,
+                    "energy_today_kwh": None,
+                }
+            )
 
     return readings
 
 
+def patch_readings(rows):
+    """Substituir a carga de leituras do Supabase por linhas fixas"""
+    return patch.object(
+        energy_module,
+        "load_readings",
+        AsyncMock(return_value=readings_frame(rows)),
+    )
+
+
+class TestReadingsFrame:
+    """Testes do DataFrame de leituras"""
+
+    def test_trapezoidal_energy(self):
+        """Energia entre leituras pela regra do trapézio, por dispositivo"""
+        frame = readings_frame(
+            [
+                {
+                    "device_id": 1,
+                    "timestamp": "2024-01-01T00:00:00",
+                    "power_watts": 100,
+                },
+                {"device_id": 2, "timestamp": "2024-01-01T00:00:00", "power_watts": 10},
+                {
+                    "device_id": 1,
+                    "timestamp": "2024-01-01T00:10:00",
+                    "power_watts": 300,
+                },
+            ]
+        )
+
+        energy = frame.groupby("device_id")["energy_kwh"].sum()
+        assert energy[1] == pytest.approx(0.2 / 6)  # (100 + 300) / 2 W por 10 min
+        assert energy[2] == 0
+
+    def test_empty(self):
+        """Sem leituras o DataFrame fica vazio, com todas as colunas"""
+        frame = readings_frame([])
+
+        assert frame.empty
+        assert "energy_kwh" in frame.columns
+
+
 class TestEnergyAnalysisService:
     """Classe de testes para EnergyAnalysisService"""
 
@@ -54,175 +103,218 @@ class TestEnergyAnalysisService:
         assert energy_service.cost_per_kwh == 0.85
         assert hasattr(energy_service, "cost_per_kwh")
 
-    @patch("src.services.energy_service.get_db")
-    def test_calculate_daily_consumption_success(
-        self, mock_get_db, energy_service, mock_device, mock_energy_readings
+    @pytest.mark.asyncio
+    async def test_calculate_daily_consumption_success(
+        self, energy_service, mock_device, mock_energy_readings
     ):
         """Testar cálculo de consumo diário com sucesso"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock query readings
-        mock_db.query.return_value.filter.return_value.all.return_value = (
-            mock_energy_readings
-        )
-
-        # Executar teste
-        result = energy_service.calculate_daily_consumption(
-            mock_device.id, datetime.utcnow()
-        )
+        with patch_readings(mock_energy_readings):
+            result = await energy_service.calculate_daily_consumption(
+                mock_device["id"], datetime.utcnow()
+            )
 
         # Verificações
         assert result is not None
-        assert result["device_id"] == mock_device.id
+        assert result["device_id"] == mock_device["id"]
         assert result["total_energy_kwh"] > 0
         assert result["total_cost"] > 0
         assert result["readings_count"] == len(mock_energy_readings)
         assert result["peak_power_watts"] >= result["average_power_watts"]
         assert result["peak_power_watts"] >= result["min_power_watts"]
 
-    @patch("src.services.energy_service.get_db")
-    def test_calculate_daily_consumption_no_readings(
-        self, mock_get_db, energy_service, mock_device
+    @pytest.mark.asyncio
+    async def test_calculate_daily_consumption_no_readings(
+        self, energy_service, mock_device
     ):
         """Testar cálculo quando não há leituras"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock query sem leituras
-        mock_db.query.return_value.filter.return_value.all.return_value = []
+        with patch_readings([]):
+            result = await energy_service.calculate_daily_consumption(
+                mock_device["id"], datetime.utcnow()
+            )
 
-        # Executar teste
-        result = energy_service.calculate_daily_consumption(
-            mock_device.id, datetime.utcnow()
-        )
-
-        # Verificações
         assert result is None
 
-    @patch("src.services.energy_service.get_db")
-    def test_detect_anomalies_above_threshold(
-        self, mock_get_db, energy_service, mock_device
-    ):
+    @pytest.mark.asyncio
+    async def test_detect_anomalies_above_threshold(self, energy_service, mock_device):
         """Testar detecção de anomalias acima do threshold"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock média histórica baixa
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50.0
+        # Média histórica de 50 W
+        history = [
+            {
+                "device_id": 1,
+                "timestamp": (datetime.utcnow() - timedelta(hours=h)).isoformat(),
+                "power_watts": 50.0,
+            }
+            for h in range(1, 10)
+        ]
 
         # Consumo atual muito alto
         current_consumption = 200.0
 
-        # Executar teste
-        result = energy_service.detect_anomalies(mock_device.id, current_consumption)
+        with patch_readings(history):
+            result = await energy_service.detect_anomalies(
+                mock_device["id"], current_consumption
+            )
 
         # Verificações
         assert result is not None
         assert result["current_consumption"] == current_consumption
         assert result["average_consumption"] == 50.0
         assert result["anomaly_factor"] == 4.0  # 200/50
-        assert "anomaly" in result["description"].lower()
+        assert "anômalo" in result["description"].lower()
 
-    @patch("src.services.energy_service.get_db")
-    def test_detect_anomalies_normal_consumption(
-        self, mock_get_db, energy_service, mock_device
+    @pytest.mark.asyncio
+    async def test_detect_anomalies_normal_consumption(
+        self, energy_service, mock_device
     ):
         """Testar detecção quando consumo é normal"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock média histórica
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50.0
-
-        # Consumo atual normal
-        current_consumption = 60.0
+        history = [
+            {
+                "device_id": 1,
+                "timestamp": (datetime.utcnow() - timedelta(hours=h)).isoformat(),
+                "power_watts": 50.0,
+            }
+            for h in range(1, 10)
+        ]
 
-        # Executar teste
-        result = energy_service.detect_anomalies(mock_device.id, current_consumption)
+        with patch_readings(history):
+            result = await energy_service.detect_anomalies(mock_device["id"], 60.0)
 
-        # Verificações
         assert result is None
 
-    @patch("src.services.energy_service.get_db")
-    def test_generate_daily_report(
-        self, mock_get_db, energy_service, mock_device, mock_energy_readings
+    @pytest.mark.asyncio
+    async def test_generate_daily_report(
+        self, energy_service, mock_device, mock_energy_readings
     ):
         """Testar geração de relatório diário"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock dispositivos
-        mock_db.query.return_value.filter.return_value.all.return_value = [mock_device]
-
-        # Mock leituras e cálculos
-        with patch.object(
-            energy_service, "calculate_daily_consumption"
-        ) as mock_calc, patch.object(
-            energy_service, "detect_anomalies"
-        ) as mock_anomaly:
-
-            mock_calc.return_value = {
-                "device_id": mock_device.id,
-                "total_energy_kwh": 2.5,
-                "total_cost": 2.12,
-                "peak_power_watts": 150.0,
-                "average_power_watts": 60.0,
-                "min_power_watts": 30.0,
-                "runtime_hours": 12.0,
-            }
-
-            mock_anomaly.return_value = None
+        report_date = datetime.fromisoformat(mock_energy_readings[0]["timestamp"])
 
-            # Executar teste
-            result = energy_service.generate_daily_report()
+        with patch_readings(mock_energy_readings), patch.object(
+            energy_module.supabase_client,
+            "get_devices",
+            AsyncMock(return_value=[mock_device]),
+        ):
+            result = await energy_service.generate_daily_report(report_date)
 
-            # Verificações
-            assert result is not None
-            assert "date" in result
-            assert "devices" in result
-            assert "total_energy_kwh" in result
-            assert "total_cost" in result
-            assert len(result["devices"]) == 1
-            assert result["total_energy_kwh"] == 2.5
-            assert result["total_cost"] == 2.12
+        # Verificações
+        assert result is not None
+        assert "date" in result
+        assert "devices" in result
+        assert "total_energy_kwh" in result
+        assert "total_cost" in result
+        assert len(result["devices"]) == 1
+        device = result["devices"][0]
+        assert device["device_name"] == "Geladeira"
+        assert device["readings_count"] == len(mock_energy_readings)
+        assert result["total_energy_kwh"] == device["total_energy_kwh"]
+        assert result["total_cost"] == pytest.approx(
+            device["total_energy_kwh"] * energy_service.cost_per_kwh, abs=0.01
+        )
+        assert result["anomalies"] == []
+
+    @pytest.mark.asyncio
+    async def test_get_consumption_trends(self, energy_service, mock_device):
+        """Consumo diário crescente gera tendência de alta"""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        readings = [
+            {
+                "device_id": 1,
+                "timestamp": (today - timedelta(days=d, minutes=-m)).isoformat(),
+                "power_watts": 100.0 * (10 - d),
+            }
+            for d in range(10)
+            for m in range(0, 24 * 60, 10)
+        ]
+
+        with patch_readings(readings):
+            result = await energy_service.get_consumption_trends(mock_device["id"], 10)
+
+        assert result["trend"] == "increasing"
+        assert len(result["daily"]) == 10
+        assert result["max_daily_energy_kwh"] >= result["average_daily_energy_kwh"]
+        assert result["total_energy_kwh"] == pytest.approx(
+            sum(day["total_energy_kwh"] for day in result["daily"]), abs=0.01
+        )
 
-    @patch("src.services.energy_service.get_db")
-    def test_get_realtime_status(self, mock_get_db, energy_service, mock_device):
+    def test_get_realtime_status(self, energy_service, mock_device):
         """Testar obtenção de status em tempo real"""
-        # Mock do banco de dados
-        mock_db = Mock()
-        mock_get_db.return_value = iter([mock_db])
-
-        # Mock dispositivos
-        mock_db.query.return_value.filter.return_value.all.return_value = [mock_device]
-
-        # Mock última leitura
-        mock_reading = Mock(spec=EnergyReading)
-        mock_reading.power_watts = 75.5
-        mock_reading.timestamp = datetime.utcnow()
-
-        mock_db.query.return_value.filter.return_value.order_by.return_value.first.return_value = (
-            mock_reading
+        board = LiveStatusBoard()
+        board.publish(
+            mock_device,
+            {
+                "power_watts": 120.0,
+                "device_on": True,
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+            latency_seconds=0.25,
         )
+        board.publish({"id": 2, "name": "Abajur"}, {"power_watts": 0.0})
 
-        # Executar teste
-        result = energy_service.get_realtime_status()
+        with patch.object(energy_module, "live_status", board):
+            result = energy_service.get_realtime_status()
 
         # Verificações
         assert result is not None
         assert "timestamp" in result
         assert "devices" in result
-        assert "total_current_power_watts" in result
-        assert "active_devices" in result
-        assert len(result["devices"]) == 1
-        assert result["total_current_power_watts"] == 75.5
+        assert result["total_current_power_watts"] == 120.0
         assert result["active_devices"] == 1
+        device = result["devices"][0]
+        assert device["device_name"] == "Geladeira"
+        assert device["latency_seconds"] == 0.25
+        assert device["device_on"] is True
+        assert device["age_seconds"] >= 0
+        assert not device["is_stale"]
+
+    def test_get_realtime_status_stale(self, energy_service, mock_device):
+        """Leituras antigas ficam fora do total de potência"""
+        board = LiveStatusBoard()
+        board.publish(mock_device, {"power_watts": 120.0})
+
+        with patch.object(energy_module, "live_status", board):
+            result = energy_service.get_realtime_status(stale_after_seconds=-1)
+
+        assert result["devices"][0]["is_stale"]
+        assert result["total_current_power_watts"] == 0
+        assert result["stale_devices"] == 1
+
+
+class TestHistoryFunctions:
+    """Testes das consultas semanal, mensal e ranking"""
+
+    @pytest.mark.asyncio
+    async def test_weekly_consumption(self, mock_energy_readings):
+        """Uma semana com o consumo de cada dia"""
+        with patch_readings(mock_energy_readings):
+            result = await energy_module.get_device_weekly_consumption(1, weeks=1)
+
+        assert len(result) == 1
+        assert result[0]["readings_count"] == len(mock_energy_readings)
+        assert len(result[0]["daily"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_monthly_stats_empty(self):
+        """Sem leituras no mês o resultado é vazio"""
+        with patch_readings([]):
+            assert await energy_module.get_device_monthly_stats(1) == {}
+
+    @pytest.mark.asyncio
+    async def test_devices_ranking(self, mock_energy_readings, mock_device):
+        """Dispositivos ordenados por consumo, com participação no total"""
+        other = [dict(r, device_id=2, power_watts=1.0) for r in mock_energy_readings]
+
+        with patch_readings(mock_energy_readings + other), patch.object(
+            energy_module.supabase_client,
+            "get_devices",
+            AsyncMock(return_value=[mock_device, {"id": 2, "name": "Abajur"}]),
+        ):
+            result = await energy_module.get_devices_ranking(30)
+
+        assert [entry["device_id"] for entry in result] == [1, 2]
+        assert result[0]["rank"] == 1
+        assert result[0]["device_name"] == "Geladeira"
+        assert sum(entry["share_percent"] for entry in result) == pytest.approx(
+            100, abs=0.2
+        )
 
 
 if __name__ == "__main__":
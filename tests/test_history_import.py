@@ -0,0 +1,258 @@
+"""
+Testes para a importação do histórico das tomadas
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from tapo.requests import EnergyDataInterval
+
+from src.integrations.tapo_client import TapoClient
+from src.services.history_import import (
+    SOURCE_DAILY,
+    SOURCE_HOURLY,
+    HistoryImporter,
+    ImportCheckpoints,
+    history_rows,
+    history_windows,
+)
+from src.utils.timestamps import parse_timestamp
+
+NOW = datetime(2024, 5, 20, 12)
+DEVICE = {"id": 1, "name": "Geladeira"}
+
+
+class FakeTapoClient:
+    """Dispositivo com 100 Wh por hora, registrando as consultas"""
+
+    def __init__(self, fail_from=None):
+        self.requests = []
+        self.fail_from = fail_from
+
+    async def get_energy_history(self, device_name, interval, start, end=None):
+        self.requests.append((interval, start, end))
+        if self.fail_from is not None and start >= self.fail_from:
+            return None
+        if interval == "hourly":
+            hours = int((end + timedelta(days=1) - start) / timedelta(hours=1))
+            return [(start + timedelta(hours=h), 100.0) for h in range(hours)]
+        days = 92
+        return [(start + timedelta(days=d), 2400.0) for d in range(days)]
+
+
+class FakeTapoDevice:
+    """Handler de tomada do ``tapo``: 100 Wh por hora, com horários em UTC"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_energy_data(self, interval, start_date, end_date=None):
+        self.calls.append((interval, start_date, end_date))
+        hours = int((end_date + timedelta(days=1) - start_date) / timedelta(hours=1))
+        start = start_date.replace(tzinfo=timezone.utc)
+        return SimpleNamespace(
+            entries=[
+                SimpleNamespace(
+                    start_date_time=start + timedelta(hours=h),
+                    energy=None if h == 0 else 100,
+                )
+                for h in range(hours)
+            ]
+        )
+
+
+def tapo_client_with(device):
+    client = TapoClient("user", "password")
+    client.devices[DEVICE["name"]] = device
+    return client
+
+
+class FakeSupabase:
+    """Supabase em memória com upsert pela chave única das leituras"""
+
+    def __init__(self, first_live=None):
+        self.rows = {}
+        self.batches = 0
+        self.first_live = first_live
+
+    async def select(self, table, filters, **kwargs):
+        if not self.first_live:
+            return []
+        first = self.first_live
+        return [{"timestamp": first if isinstance(first, str) else first.isoformat()}]
+
+    async def upsert_energy_readings(self, rows):
+        self.batches += 1
+        for row in rows:
+            key = (row["device_id"], row["timestamp"], row["data_source"])
+            self.rows[key] = row
+        return [True] * len(rows)
+
+
+def importer_for(tapo, supabase, tmp_path):
+    return HistoryImporter(
+        tapo,
+        supabase,
+        ImportCheckpoints(str(tmp_path / "checkpoints.json")),
+        max_concurrency=2,
+        batch_size=500,
+    )
+
+
+class TestHistoryRows:
+    """Testes da conversão para energy_readings"""
+
+    def test_hourly_accumulates_per_day(self):
+        """Potência média do intervalo e energia acumulada no dia"""
+        day = datetime(2024, 1, 1, 22)
+        rows = history_rows(
+            1,
+            [
+                (day, 100.0),
+                (day + timedelta(hours=1), 50.0),
+                (day + timedelta(hours=2), 30.0),
+            ],
+            "hourly",
+        )
+
+        assert [r["power_watts"] for r in rows] == [100.0, 50.0, 30.0]
+        assert [r["energy_today_kwh"] for r in rows] == [0.1, 0.15, 0.03]
+        assert rows[0]["data_source"] == SOURCE_HOURLY
+
+    def test_daily_average_power(self):
+        """Energia diária vira potência média de 24 h"""
+        rows = history_rows(1, [(datetime(2024, 1, 1), 2400.0)], "daily")
+
+        assert rows[0]["power_watts"] == 100.0
+        assert rows[0]["energy_today_kwh"] == 2.4
+
+
+class TestHistoryWindows:
+    """Testes da divisão em consultas aceitas pelo dispositivo"""
+
+    def test_hourly_windows_of_eight_days(self):
+        """Consultas horárias cobrem no máximo 8 dias (inclusive)"""
+        windows = list(
+            history_windows("hourly", datetime(2024, 1, 1), datetime(2024, 1, 20))
+        )
+
+        assert [w[1] for w in windows] == [
+            datetime(2024, 1, 8),
+            datetime(2024, 1, 16),
+            datetime(2024, 1, 19),
+        ]
+
+    def test_daily_windows_start_on_quarter(self):
+        """Consultas diárias começam no início do trimestre"""
+        windows = list(
+            history_windows("daily", datetime(2024, 2, 10), datetime(2024, 5, 1))
+        )
+
+        assert [(w[0], w[2], w[3]) for w in windows] == [
+            (datetime(2024, 1, 1), datetime(2024, 2, 10), datetime(2024, 4, 1)),
+            (datetime(2024, 4, 1), datetime(2024, 4, 1), datetime(2024, 5, 1)),
+        ]
+
+
+class TestTapoEnergyHistory:
+    """Testes de TapoClient.get_energy_history com o enum real do tapo"""
+
+    @pytest.mark.asyncio
+    async def test_passes_native_interval(self):
+        """O intervalo vira o membro de EnergyDataInterval (não instanciável)"""
+        device = FakeTapoDevice()
+        day = datetime(2024, 5, 20)
+
+        history = await tapo_client_with(device).get_energy_history(
+            DEVICE["name"], "hourly", day, day
+        )
+
+        assert device.calls == [(EnergyDataInterval.Hourly, day, day)]
+        assert history[0] == (day + timedelta(hours=1), 100.0)  # sem a hora vazia
+        assert len(history) == 23
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_interval(self):
+        with pytest.raises(ValueError):
+            await tapo_client_with(FakeTapoDevice()).get_energy_history(
+                DEVICE["name"], "weekly", datetime(2024, 5, 20)
+            )
+
+    @pytest.mark.asyncio
+    async def test_importer_through_real_client(self, tmp_path):
+        """Importação horária passando pelo TapoClient real"""
+        device = FakeTapoDevice()
+        supabase = FakeSupabase(first_live=NOW)
+        importer = importer_for(tapo_client_with(device), supabase, tmp_path)
+
+        result = await importer.run([DEVICE], daily_days=1, hourly_days=1)
+
+        assert all(call[0] == EnergyDataInterval.Hourly for call in device.calls)
+        assert result["Geladeira"][SOURCE_HOURLY] == 24 + 12 - 1  # hora vazia
+
+
+class TestHistoryImporter:
+    """Testes do HistoryImporter"""
+
+    @pytest.mark.asyncio
+    async def test_import_stops_at_live_readings(self, tmp_path):
+        """Diário antes, horário depois, e nada a partir das leituras do coletor"""
+        supabase = FakeSupabase(first_live=NOW)
+        importer = importer_for(FakeTapoClient(), supabase, tmp_path)
+
+        result = await importer.run([DEVICE], daily_days=30, hourly_days=10)
+
+        assert result["Geladeira"] == {SOURCE_DAILY: 20, SOURCE_HOURLY: 10 * 24 + 12}
+        timestamps = [datetime.fromisoformat(k[1]) for k in supabase.rows]
+        assert max(timestamps) < NOW
+        assert supabase.batches < len(supabase.rows) / 100
+
+    @pytest.mark.asyncio
+    async def test_live_start_as_returned_by_postgrest(self, tmp_path):
+        """Fração de segundo sem zeros finais e fuso: hora UTC sem timezone"""
+        supabase = FakeSupabase(first_live="2024-05-20T14:05:30.12+02:00")
+        importer = importer_for(FakeTapoClient(), supabase, tmp_path)
+
+        assert await importer._history_end(DEVICE["id"]) == NOW
+        assert parse_timestamp("2024-05-20T10:15:30.12") == datetime(
+            2024, 5, 20, 10, 15, 30, 120000
+        )
+
+    @pytest.mark.asyncio
+    async def test_rerun_is_idempotent_and_resumes(self, tmp_path):
+        """Reexecutar não duplica e não repete consultas já concluídas"""
+        supabase = FakeSupabase(first_live=NOW)
+        await importer_for(FakeTapoClient(), supabase, tmp_path).run(
+            [DEVICE], daily_days=30, hourly_days=10
+        )
+        rows = len(supabase.rows)
+
+        tapo = FakeTapoClient()
+        await importer_for(tapo, supabase, tmp_path).run(
+            [DEVICE], daily_days=30, hourly_days=10
+        )
+
+        assert len(supabase.rows) == rows
+        assert tapo.requests == [
+            ("hourly", datetime(2024, 5, 20), datetime(2024, 5, 20))
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failure_keeps_checkpoint(self, tmp_path):
+        """Falha no meio mantém o progresso e a próxima execução continua"""
+        supabase = FakeSupabase(first_live=NOW)
+        failing = FakeTapoClient(fail_from=datetime(2024, 5, 18))
+
+        result = await importer_for(failing, supabase, tmp_path).run(
+            [DEVICE], daily_days=30, hourly_days=10
+        )
+        assert "error" in result["Geladeira"]
+
+        tapo = FakeTapoClient()
+        await importer_for(tapo, supabase, tmp_path).run(
+            [DEVICE], daily_days=30, hourly_days=10
+        )
+
+        assert [r[1] for r in tapo.requests] == [datetime(2024, 5, 18)]
+        assert len([k for k in supabase.rows if k[2] == SOURCE_HOURLY]) == 10 * 24 + 12
@@ -0,0 +1,52 @@
+"""
+Testes para a distribuição de leituras ao vivo
+"""
+
+import pytest
+
+from src.services.live_stream import ReadingBroadcaster, TooManySubscribers
+
+
+class TestReadingBroadcaster:
+    """Testes de ReadingBroadcaster"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_with_device_filter(self):
+        """Cada assinante recebe só os dispositivos assinados"""
+        broadcaster = ReadingBroadcaster(max_pending=10, max_subscribers=10)
+        everything = broadcaster.subscribe()
+        only_two = broadcaster.subscribe([2])
+
+        broadcaster.publish({"device_id": 1, "power_watts": 10.0})
+        broadcaster.publish({"device_id": 2, "power_watts": 20.0})
+
+        assert (await everything.get(0.1))["device_id"] == 1
+        assert (await everything.get(0.1))["device_id"] == 2
+        assert (await only_two.get(0.1))["device_id"] == 2
+        assert await only_two.get(0.01) is None
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_drops_oldest(self):
+        """Fila cheia descarta as leituras mais antigas sem bloquear"""
+        broadcaster = ReadingBroadcaster(max_pending=2, max_subscribers=10)
+        subscription = broadcaster.subscribe()
+
+        for power in (1.0, 2.0, 3.0):
+            broadcaster.publish({"device_id": 1, "power_watts": power})
+
+        assert subscription.dropped == 1
+        assert (await subscription.get(0.1))["power_watts"] == 2.0
+        assert (await subscription.get(0.1))["power_watts"] == 3.0
+
+    def test_subscriber_limit(self):
+        """Acima do limite novas assinaturas são recusadas"""
+        broadcaster = ReadingBroadcaster(max_pending=2, max_subscribers=1)
+        subscription = broadcaster.subscribe()
+
+        with pytest.raises(TooManySubscribers):
+            broadcaster.subscribe()
+
+        broadcaster.unsubscribe(subscription)
+        broadcaster.unsubscribe(subscription)
+        assert broadcaster.stats()["subscribers"] == 0
+        broadcaster.subscribe()
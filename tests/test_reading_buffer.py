@@ -0,0 +1,64 @@
+"""
+Testes para o buffer de escrita em lote
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.reading_buffer import ReadingBuffer
+
+
+class RecordingWriter:
+    """Writer que registra os lotes e responde com ``results``"""
+
+    def __init__(self, results=None, error=None):
+        self.results = results
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, rows):
+        self.batches.append(list(rows))
+        if self.error:
+            raise self.error
+        return self.results if self.results is not None else [True] * len(rows)
+
+
+@pytest.mark.asyncio
+async def test_explicit_flush_sends_one_batch_and_resolves_futures():
+    writer = RecordingWriter(results=[True, False])
+    buffer = ReadingBuffer(writer, max_batch_size=10, flush_interval_seconds=60)
+
+    futures = [buffer.submit({"id": i}) for i in range(2)]
+    assert len(buffer) == 2 and not any(f.done() for f in futures)
+
+    assert await buffer.flush() == [True, False]
+    assert writer.batches == [[{"id": 0}, {"id": 1}]]
+    assert [await f for f in futures] == [True, False]
+    assert len(buffer) == 0 and await buffer.flush() == []
+
+
+@pytest.mark.asyncio
+async def test_size_and_time_triggers():
+    writer = RecordingWriter()
+    buffer = ReadingBuffer(writer, max_batch_size=2, flush_interval_seconds=0.01)
+
+    first = [buffer.submit({"id": i}) for i in range(2)]
+    assert await asyncio.gather(*first) == [True, True]
+
+    late = buffer.add({"id": 2})
+    assert await asyncio.wait_for(late, timeout=1) is True
+    assert [len(batch) for batch in writer.batches] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_writer_failure_and_short_results_fail_the_rows():
+    buffer = ReadingBuffer(RecordingWriter(error=RuntimeError("offline")))
+    future = buffer.submit({"id": 1})
+    assert await buffer.flush() == [False]
+    assert await future is False
+
+    buffer = ReadingBuffer(RecordingWriter(results=[True]))
+    futures = [buffer.submit({"id": i}) for i in range(2)]
+    await buffer.flush()
+    assert [await f for f in futures] == [True, False]
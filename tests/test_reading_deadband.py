@@ -0,0 +1,149 @@
+"""
+Testes para a compressão das leituras por banda morta
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from src.services.energy_service import readings_frame
+from src.services.reading_deadband import ReadingDeadband, expand_samples
+
+START = datetime(2024, 5, 20, 10)
+
+
+def reading(minute, power, energy=0.0, device_id=1):
+    return {
+        "device_id": device_id,
+        "timestamp": (START + timedelta(minutes=minute)).isoformat(),
+        "power_watts": power,
+        "energy_today_kwh": energy,
+        "data_source": "tapo_local",
+    }
+
+
+def make_deadband(**kwargs):
+    params = dict(tolerance_watts=1.0, tolerance_ratio=0.02, heartbeat_seconds=1800)
+    params.update(kwargs)
+    return ReadingDeadband(**params)
+
+
+def stored(deadband, readings):
+    return [row for r in readings for row in deadband.filter(r)]
+
+
+def test_flat_readings_are_suppressed_until_change():
+    deadband = make_deadband()
+    rows = stored(
+        deadband,
+        [reading(0, 0.5), reading(1, 0.8), reading(2, 0.4), reading(3, 60.0)],
+    )
+
+    assert [(r["timestamp"], r["samples"]) for r in rows] == [
+        (reading(0, 0)["timestamp"], 1),
+        (reading(2, 0)["timestamp"], 2),  # último valor mantido antes do degrau
+        (reading(3, 0)["timestamp"], 1),
+    ]
+    assert deadband.stats() == {"received": 4, "stored": 3, "suppressed_pending": 0}
+
+
+def test_heartbeat_and_new_day_force_storage():
+    deadband = make_deadband(heartbeat_seconds=600)
+    rows = stored(deadband, [reading(m, 10.0) for m in range(0, 25, 5)])
+
+    assert [(r["timestamp"][11:16], r["samples"]) for r in rows] == [
+        ("10:00", 1),
+        ("10:10", 2),
+        ("10:20", 2),
+    ]
+
+    midnight = {**reading(0, 10.0), "timestamp": datetime(2024, 5, 21).isoformat()}
+    assert deadband.filter(midnight)[-1]["samples"] == 1
+
+
+def test_switching_on_or_off_is_stored():
+    deadband = make_deadband()
+    readings = [
+        {**reading(m, 0.0), "device_on": on}
+        for m, on in enumerate([True, True, False, False])
+    ]
+
+    rows = stored(deadband, readings)
+
+    assert [(r["timestamp"][11:16], r["device_on"]) for r in rows] == [
+        ("10:00", True),
+        ("10:01", True),
+        ("10:02", False),
+    ]
+
+
+def test_outage_before_heartbeat_is_kept_as_gap():
+    deadband = make_deadband()
+    raw = [reading(m, 100.0) for m in range(0, 30, 5)] + [reading(240, 100.0)]
+
+    rows = stored(deadband, raw)
+
+    assert [(r["timestamp"][11:16], r["samples"]) for r in rows] == [
+        ("10:00", 1),
+        ("10:25", 5),
+        ("14:00", 1),
+    ]
+    full, rebuilt = readings_frame(raw), readings_frame(rows)
+    assert rebuilt["energy_kwh"].sum() == pytest.approx(full["energy_kwh"].sum())
+    assert rebuilt["gap_hours"].sum() == pytest.approx(full["gap_hours"].sum())
+    assert full["gap_hours"].sum() == pytest.approx(3 + 35 / 60)
+
+
+def test_flush_returns_held_readings_once():
+    deadband = make_deadband()
+    stored(deadband, [reading(m, 10.0) for m in range(4)])
+
+    assert [(r["timestamp"][11:16], r["samples"]) for r in deadband.flush()] == [
+        ("10:03", 3)
+    ]
+    assert deadband.flush() == []
+    assert deadband.filter(reading(5, 10.0)) == []  # banda a partir de 10:03
+
+
+def test_heartbeat_zero_stores_everything():
+    deadband = make_deadband(heartbeat_seconds=0)
+
+    assert len(stored(deadband, [reading(m, 10.0) for m in range(5)])) == 5
+
+
+def test_expand_samples_rebuilds_step_series():
+    frame = pd.DataFrame.from_records(
+        [
+            {**reading(0, 10.0, 1.0), "samples": 1},
+            {**reading(30, 10.4, 1.3), "samples": 3},
+        ]
+    )
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+
+    expanded = expand_samples(frame)
+
+    assert "samples" not in expanded.columns
+    assert list(expanded["timestamp"].dt.minute) == [0, 10, 20, 30]
+    assert list(expanded["power_watts"]) == [10.0, 10.0, 10.0, 10.4]
+    assert list(expanded["energy_today_kwh"].round(3)) == [1.0, 1.1, 1.2, 1.3]
+
+
+@pytest.mark.parametrize("counter", [True, False])
+def test_compression_keeps_computed_energy(counter):
+    raw = [
+        reading(m, power, energy=round(m * 0.002, 4) if counter else None)
+        for m, power in enumerate([50.0] * 20 + [120.0] * 20 + [50.0] * 20, start=1)
+    ]
+    deadband = make_deadband(heartbeat_seconds=900)
+    compressed = stored(deadband, raw) + [
+        {**raw[-1], "samples": deadband.tracks[1].held}
+    ]  # fechar o degrau pendente como no próximo ciclo
+
+    full = readings_frame(raw)
+    rebuilt = readings_frame(compressed)
+
+    assert len(compressed) < len(raw) / 3
+    assert rebuilt["energy_kwh"].sum() == pytest.approx(full["energy_kwh"].sum())
+    assert rebuilt["gap_hours"].sum() == 0
+    assert len(rebuilt) == len(full)
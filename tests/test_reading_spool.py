@@ -0,0 +1,83 @@
+"""
+Testes para o spool local de leituras
+"""
+
+import pytest
+
+from src.services.reading_spool import ReadingSpool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = ReadingSpool(str(tmp_path / "spool" / "readings.db"))
+    yield spool
+    spool.close()
+
+
+def rows(count):
+    return [{"device_id": 1, "power_watts": float(i)} for i in range(count)]
+
+
+def test_ack_removes_only_confirmed_entries(spool):
+    ids = spool.append_many(rows(3))
+
+    spool.ack([ids[0], ids[2]])
+
+    assert spool.peek(10) == [(ids[1], {"device_id": 1, "power_watts": 1.0})]
+    assert spool.stats()["depth"] == 1
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "readings.db")
+    first = ReadingSpool(path)
+    first.append_many(rows(2))
+    first.close()
+
+    reopened = ReadingSpool(path)
+    assert reopened.depth() == 2
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_drain_stops_at_failure_and_retries_later(spool):
+    spool.append_many(rows(5))
+    sent = []
+
+    async def flaky(batch):
+        sent.append(len(batch))
+        return [row["power_watts"] != 3.0 for row in batch]
+
+    assert await spool.drain(flaky, batch_size=2) == 3
+    assert sent == [2, 2]  # o lote com falha interrompe o reenvio
+    assert [row["power_watts"] for _, row in spool.peek(10)] == [3.0, 4.0]
+
+    async def healthy(batch):
+        return [True] * len(batch)
+
+    assert await spool.drain(healthy, batch_size=2) == 2
+    assert spool.depth() == 0
+    assert spool.stats()["replayed_total"] == 5
+
+
+@pytest.mark.asyncio
+async def test_rejected_entries_are_discarded_after_max_attempts(spool):
+    spool.append_many(rows(1))
+
+    async def rejecting(batch):
+        return [False] * len(batch)
+
+    for _ in range(3):
+        assert await spool.drain(rejecting, max_attempts=3) == 0
+
+    assert spool.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_drain_skips_entries_newer_than_min_age(spool):
+    spool.append_many(rows(1))
+
+    async def writer(batch):
+        return [True] * len(batch)
+
+    assert await spool.drain(writer, min_age_seconds=60) == 0
+    assert spool.depth() == 1
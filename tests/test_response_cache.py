@@ -0,0 +1,126 @@
+"""
+Testes para o cache de respostas da API
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.response_cache import MemoryCacheBackend, ResponseCache
+
+
+@pytest.fixture
+def cache():
+    """Cache em memória com TTL longo"""
+    return ResponseCache(MemoryCacheBackend(max_entries=2), default_ttl=60)
+
+
+class TestResponseCache:
+    """Testes de ResponseCache"""
+
+    @pytest.mark.asyncio
+    async def test_hit_after_miss(self, cache):
+        """A segunda consulta vem do cache"""
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return {"value": len(calls)}
+
+        first = await cache.get_or_set("readings", "a", loader)
+        second = await cache.get_or_set("readings", "a", loader)
+
+        assert first == second == {"value": 1}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_coalesced(self, cache):
+        """Requisições idênticas simultâneas compartilham uma consulta"""
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(
+            *(cache.get_or_set("readings", "a", loader) for _ in range(5))
+        )
+
+        assert results == ["ok"] * 5
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, cache):
+        """Exceções chegam a todos os que aguardavam e não ficam em cache"""
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("falhou")
+
+        results = await asyncio.gather(
+            cache.get_or_set("readings", "a", failing),
+            cache.get_or_set("readings", "a", failing),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert await cache.get_or_set("readings", "a", lambda: asyncio.sleep(0, "ok"))
+
+    @pytest.mark.asyncio
+    async def test_invalidate_namespace(self, cache):
+        """Invalidar um namespace não afeta os demais"""
+        await cache.get_or_set("readings", "a", lambda: asyncio.sleep(0, 1))
+        await cache.get_or_set("devices", "a", lambda: asyncio.sleep(0, 2))
+
+        await cache.invalidate("readings")
+
+        assert await cache.get_or_set("readings", "a", lambda: asyncio.sleep(0, 3)) == 3
+        assert await cache.get_or_set("devices", "a", lambda: asyncio.sleep(0, 4)) == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_is_not_stored(self, cache):
+        """Resultado calculado antes de uma invalidação não fica em cache"""
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "antigo"
+
+        pending = asyncio.ensure_future(cache.get_or_set("readings", "a", slow))
+        await asyncio.sleep(0)
+        await cache.invalidate("readings")
+
+        assert await pending == "antigo"
+        assert (
+            await cache.get_or_set("readings", "a", lambda: asyncio.sleep(0, "novo"))
+            == "novo"
+        )
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, cache):
+        """Acima de max_entries a entrada menos usada sai do cache"""
+        for name in ("a", "b", "c"):
+            await cache.get_or_set("readings", name, lambda: asyncio.sleep(0, name))
+
+        assert len(cache.backend) == 2
+        assert (
+            await cache.get_or_set("readings", "a", lambda: asyncio.sleep(0, "x"))
+            == "x"
+        )
+
+    @pytest.mark.asyncio
+    async def test_cached_decorator_keys_by_arguments(self, cache):
+        """O decorador diferencia chamadas pelos argumentos"""
+        calls = []
+
+        @cache.cached("readings")
+        async def endpoint(days: int = 7):
+            calls.append(days)
+            return {"days": days}
+
+        assert await endpoint(days=7) == {"days": 7}
+        assert await endpoint(days=7) == {"days": 7}
+        assert await endpoint(days=30) == {"days": 30}
+        assert calls == [7, 30]
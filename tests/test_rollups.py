@@ -0,0 +1,77 @@
+"""
+Testes para as consultas aos agregados em várias resoluções
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.integrations.supabase_client import PAGE_SIZE, supabase_client
+from src.services.rollups import bucket_start, choose_resolution, get_device_history
+from src.utils.config import settings
+
+SINCE = datetime(2024, 1, 1)
+
+
+@pytest.mark.parametrize(
+    "resolution, expected",
+    [
+        ("15m", datetime(2024, 3, 15, 10, 30)),
+        ("1h", datetime(2024, 3, 15, 10)),
+        ("1d", datetime(2024, 3, 15)),
+        ("1mo", datetime(2024, 3, 1)),
+    ],
+)
+def test_bucket_start(resolution, expected):
+    assert bucket_start(resolution, datetime(2024, 3, 15, 10, 44, 59, 999)) == expected
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        (timedelta(hours=6), "15m"),  # 24 buckets de 15 min
+        (timedelta(days=1), "1h"),
+        (timedelta(days=30), "1d"),
+        (timedelta(days=2 * 365), "1mo"),
+        (timedelta(minutes=30), "15m"),  # nenhuma atinge o mínimo: a mais fina
+    ],
+)
+def test_choose_resolution_coarsest_with_min_points(window, expected):
+    assert choose_resolution(SINCE, SINCE + window, min_points=24) == expected
+
+
+def test_choose_resolution_uses_setting_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "rollup_min_points", 2)
+
+    assert choose_resolution(SINCE, SINCE + timedelta(days=2)) == "1d"
+
+
+@pytest.mark.asyncio
+async def test_device_history_reads_every_page(monkeypatch):
+    buckets = [
+        {
+            "device_id": 1,
+            "bucket_start": (SINCE + timedelta(minutes=15 * i)).isoformat(),
+            "energy_delta_kwh": 0.01,
+        }
+        for i in range(PAGE_SIZE + 250)
+    ]
+    queries = []
+
+    async def select(table, filters=None, columns=None, order=None, limit=None, **_):
+        offset = dict(filters).get("offset", 0)
+        queries.append((table, order, offset))
+        return buckets[offset : offset + limit]
+
+    monkeypatch.setattr(supabase_client, "select", select)
+
+    history = await get_device_history(
+        1, SINCE, SINCE + timedelta(days=14), resolution="15m"
+    )
+
+    assert len(history["buckets"]) == PAGE_SIZE + 250
+    assert history["total_energy_kwh"] == pytest.approx(12.5)
+    assert queries == [
+        ("energy_rollups", "bucket_start.asc,device_id.asc", 0),
+        ("energy_rollups", "bucket_start.asc,device_id.asc", PAGE_SIZE),
+    ]
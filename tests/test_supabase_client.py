@@ -0,0 +1,55 @@
+"""
+Testes para o cliente compartilhado do Supabase
+"""
+
+import asyncio
+import threading
+
+from src.integrations.supabase_client import SupabaseClient
+
+
+def test_one_http_client_per_event_loop():
+    supabase = SupabaseClient(url="http://supabase.test", key="anon")
+
+    async def get_client():
+        return supabase._get_client()
+
+    async def same_loop():
+        return supabase._get_client() is supabase._get_client()
+
+    assert asyncio.run(same_loop())
+
+    # Um loop em outra thread não troca o cliente do loop principal
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        other = asyncio.run_coroutine_threadsafe(get_client(), loop).result()
+
+        async def main():
+            client = supabase._get_client()
+            assert client is not other
+            assert (
+                asyncio.run_coroutine_threadsafe(get_client(), loop).result() is other
+            )
+            await supabase.aclose()
+            assert client.is_closed and not other.is_closed
+
+        asyncio.run(main())
+        asyncio.run_coroutine_threadsafe(supabase.aclose(), loop).result()
+        assert other.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    # Clientes de loops encerrados são descartados
+    stale = asyncio.new_event_loop()
+    stale.run_until_complete(get_client())
+    stale.close()
+
+    async def after_close():
+        supabase._get_client()
+        return stale in supabase._clients
+
+    assert not asyncio.run(after_close())
@@ -0,0 +1,118 @@
+"""
+Testes para o contexto em memória do assistente
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services import system_context as context_module
+from src.services.system_context import SystemContextCache
+
+TODAY = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def daily_row(device_id, last, power, readings=10, energy=1.0):
+    return {
+        "device_id": device_id,
+        "day": last.date().isoformat(),
+        "last_timestamp": last.isoformat(),
+        "last_power_watts": power,
+        "readings_count": readings,
+        "energy_kwh": energy,
+    }
+
+
+@pytest.fixture
+def cache():
+    cache = SystemContextCache(max_staleness_seconds=60)
+    cache._roll_day(TODAY + timedelta(hours=12))
+    return cache
+
+
+def test_today_row_sets_last_reading_and_aggregates(cache):
+    last = TODAY + timedelta(hours=10)
+
+    assert cache.apply_rollup(daily_row(1, last, 85.0, readings=40, energy=2.5))
+
+    assert cache.device_state[1] == {
+        "power_watts": 85.0,
+        "last_reading_time": last,
+        "readings_today": 40,
+        "energy_today_kwh": 2.5,
+    }
+    assert cache.latest_reading_time == last
+    assert cache.readings_today == 40
+
+
+def test_previous_day_row_only_updates_last_reading(cache):
+    last = TODAY - timedelta(hours=1)
+
+    assert cache.apply_rollup(daily_row(1, last, 30.0, readings=90, energy=4.0))
+
+    state = cache.device_state[1]
+    assert (state["power_watts"], state["last_reading_time"]) == (30.0, last)
+    assert (state["readings_today"], state["energy_today_kwh"]) == (0, 0.0)
+
+
+def test_older_repeated_and_invalid_rows(cache):
+    newer = daily_row(1, TODAY + timedelta(hours=10), 85.0, readings=40)
+    cache.apply_rollup(newer)
+    snapshot = dict(cache.device_state[1])
+
+    assert not cache.apply_rollup(daily_row(1, TODAY + timedelta(hours=9), 10.0))
+    cache.apply_rollup(newer)
+    assert cache.device_state[1] == snapshot
+
+    assert not cache.apply_rollup({"device_id": 2, "last_timestamp": None})
+    assert not cache.apply_rollup({"last_timestamp": newer["last_timestamp"]})
+    assert 2 not in cache.device_state
+
+
+def test_timezone_aware_timestamp_is_stored_in_utc(cache):
+    row = daily_row(1, TODAY, 50.0)
+    row["last_timestamp"] = (TODAY + timedelta(hours=13)).isoformat() + "+03:00"
+
+    cache.apply_rollup(row)
+
+    assert cache.device_state[1]["last_reading_time"] == TODAY + timedelta(hours=10)
+
+
+class FakeSupabase:
+    """Carga inicial pela view e depois só as linhas a partir do cursor"""
+
+    def __init__(self, latest, updates):
+        self.latest = latest
+        self.updates = updates
+        self.cursors = []
+
+    async def select(self, table, *args, **kwargs):
+        return [{"id": 1, "name": "Geladeira"}]
+
+    async def get_latest_daily(self):
+        return self.latest
+
+    async def get_daily_rollup(self, updated_since=None):
+        self.cursors.append(updated_since)
+        return self.updates
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental_from_cursor(monkeypatch):
+    first = TODAY + timedelta(minutes=5)
+    later = TODAY + timedelta(minutes=20)
+    supabase = FakeSupabase(
+        latest=[daily_row(1, first, 40.0, readings=1)],
+        updates=[daily_row(1, later, 90.0, readings=4)],
+    )
+    monkeypatch.setattr(context_module, "supabase_client", supabase)
+    cache = SystemContextCache(max_staleness_seconds=60)
+
+    await cache.refresh()
+    await cache.refresh()  # dentro do limite: nenhuma consulta
+    assert supabase.cursors == []
+
+    await cache.refresh(force=True)
+    assert supabase.cursors == [first]
+    assert cache.device_state[1]["power_watts"] == 90.0
+    assert cache.devices == [{"id": 1, "name": "Geladeira"}]
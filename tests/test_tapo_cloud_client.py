@@ -0,0 +1,99 @@
+"""
+Testes para o limitador de requisições da TP-Link Cloud
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.integrations.tapo_cloud_client import CloudRateLimiter, TapoCloudClient
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Sessão aiohttp que responde na ordem de ``responses``"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posted_at = []
+
+    def post(self, url, **kwargs):
+        self.posted_at.append(time.monotonic())
+        return self.responses.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_spaced_and_concurrency_bounded():
+    limiter = CloudRateLimiter(max_concurrency=2, requests_per_second=50)
+    running = peak = 0
+    started = []
+
+    async def request():
+        nonlocal running, peak
+        async with limiter:
+            started.append(time.monotonic())
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+    await asyncio.gather(*(request() for _ in range(4)))
+
+    assert peak == 2
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert min(gaps) >= 0.015  # 1/50 s, com folga para o relógio
+
+
+@pytest.mark.asyncio
+async def test_back_off_blocks_new_requests():
+    limiter = CloudRateLimiter(requests_per_second=0)
+    limiter.back_off(0.1)
+    limiter.back_off(0.01)  # não encurta a suspensão em andamento
+
+    start = time.monotonic()
+    async with limiter:
+        waited = time.monotonic() - start
+
+    assert waited >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_get_device_info_retries_after_429():
+    client = TapoCloudClient("user@example.com", "secret", requests_per_second=0)
+    client.token = "token"
+    client.session = FakeSession(
+        [
+            FakeResponse(429, {"Retry-After": "0.05"}),
+            FakeResponse(200, body={"result": {"responseData": {"device_on": True}}}),
+        ]
+    )
+
+    assert await client.get_device_info("abc") == {"device_on": True}
+    first, second = client.session.posted_at
+    assert second - first >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_get_device_info_gives_up_after_max_retries():
+    client = TapoCloudClient("user@example.com", "secret", requests_per_second=0)
+    client.token = "token"
+    client.session = FakeSession([FakeResponse(429, {"Retry-After": "0"})] * 2)
+
+    assert await client.get_device_info("abc", max_retries=1) is None
+    assert len(client.session.posted_at) == 2
@@ -0,0 +1,37 @@
+"""
+Testes para a conversão de timestamps das leituras
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.utils.timestamps import parse_timestamp
+
+
+class TestParseTimestamp:
+    def test_trimmed_fraction_from_postgrest(self):
+        assert parse_timestamp("2024-05-20T10:15:30.12") == datetime(
+            2024, 5, 20, 10, 15, 30, 120000
+        )
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2024-05-20T12:15:30+02:00",
+            "2024-05-20T10:15:30Z",
+            datetime(2024, 5, 20, 7, 15, 30, tzinfo=timezone(timedelta(hours=-3))),
+        ],
+    )
+    def test_offsets_are_converted_to_utc(self, value):
+        assert parse_timestamp(value) == datetime(2024, 5, 20, 10, 15, 30)
+
+    def test_naive_values_are_kept(self):
+        naive = datetime(2024, 5, 20, 10, 15, 30)
+        assert parse_timestamp(naive) == naive
+        assert parse_timestamp("2024-05-20 10:15:30") == naive
+
+    @pytest.mark.parametrize("value", [None, "", "ontem"])
+    def test_invalid_values_raise(self, value):
+        with pytest.raises(ValueError):
+            parse_timestamp(value)